@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
-from app.schemas.achievement import AchievementCreate, AchievementOut
+from app.schemas.achievement import AchievementCreate, AchievementOut, AchievementRuleOut, UserAchievementOut
+from app.services.achievement_engine import achievement_engine
 from app.services.supabase_service import supabase_client
 
 router = APIRouter()
@@ -10,10 +11,14 @@ async def create_achievement(achievement: AchievementCreate):
     # Logic to create an achievement
     return {"id": "123", "name": achievement.name, "description": achievement.description}
 
-@router.get("/", response_model=List[AchievementOut])
+@router.get("/", response_model=List[AchievementRuleOut])
 async def list_achievements():
-    # Logic to list achievements
-    return []
+    """Achievement rules and the event types that can trigger them"""
+    return achievement_engine.list_rules()
+
+@router.get("/users/{user_id}", response_model=List[UserAchievementOut])
+async def list_user_achievements(user_id: str):
+    return await achievement_engine.user_achievements(user_id)
 
 @router.get("/{achievement_id}", response_model=AchievementOut)
 async def get_achievement(achievement_id: str):
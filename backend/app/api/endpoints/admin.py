@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import List
-from app.core.security import get_current_admin_user
+from app.core.fast_json import RowEncoder, fast_json_response
+from app.core.security import forget_user, get_current_admin_user
 from app.models.user import User
 from app.schemas.user import UserOut, UserCreate, UserUpdate
 import logging
@@ -20,8 +21,11 @@ SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 # Create a Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+USER_ROWS = RowEncoder(UserOut)
+
 @router.get("/users", response_model=List[UserOut])
 async def get_all_users(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_admin_user)
@@ -36,7 +40,7 @@ async def get_all_users(
             raise HTTPException(status_code=500, detail=f"Error fetching users: {response.error.message}")
         
         logger.info(f"Successfully fetched {len(response.data)} users")
-        return [UserOut(**user) for user in (response.data or [])]
+        return fast_json_response(request, USER_ROWS.rows(response.data or []))
     except Exception as e:
         logger.exception(f"Unexpected error in get_all_users: {str(e)}")
         raise HTTPException(status_code=503, detail=f"Error fetching users: {str(e)}")
@@ -74,6 +78,7 @@ async def update_user(
 ):
     logger.info(f"Updating user with ID: {user_id}")
     response = supabase.table("users").update(user_update.dict(exclude_unset=True)).eq("id", user_id).execute()
+    forget_user(user_id)
     if response.data:
         return UserOut(**response.data[0])
     raise HTTPException(status_code=404, detail="User not found")
@@ -86,6 +91,7 @@ async def delete_user(
     try:
         logger.info(f"Deleting user with ID: {user_id}")
         supabase.auth.admin.delete_user(user_id)
+        forget_user(user_id)
         return {"detail": "User deleted successfully"}
     except Exception as e:
         logger.exception(f"Error deleting user: {str(e)}")
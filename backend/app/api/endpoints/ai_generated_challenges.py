@@ -1,31 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter
 from typing import List
-from app.schemas.ai_generated_challenge import AIGeneratedChallengeCreate, AIGeneratedChallengeOut
-from app.services.supabase_service import supabase_client
+from app.schemas.ai_generated_challenge import (
+    AIGeneratedChallengeCreate,
+    AIGeneratedChallengeOut,
+    AIGenerationJob,
+    AIGenerationRequest
+)
+from app.services.ai_challenge_generator import ai_challenge_generator
 
 router = APIRouter()
 
+@router.post("/generate", response_model=AIGenerationJob, status_code=202)
+async def generate_ai_challenge(request: AIGenerationRequest):
+    """Queue a generation job; poll /jobs/{job_id} for the challenge"""
+    return ai_challenge_generator.submit(request.ai_prompt, request.difficulty.value)
+
+@router.get("/jobs/{job_id}", response_model=AIGenerationJob)
+async def get_generation_job(job_id: str):
+    return ai_challenge_generator.get_job(job_id)
+
 @router.post("/", response_model=AIGeneratedChallengeOut)
 async def create_ai_generated_challenge(challenge: AIGeneratedChallengeCreate):
-    # Logic to create an AI-generated challenge
-    return {"id": "123", "title": challenge.title, "description": challenge.description, "difficulty": challenge.difficulty}
+    return await ai_challenge_generator.create_challenge(challenge)
 
 @router.get("/", response_model=List[AIGeneratedChallengeOut])
-async def list_ai_generated_challenges():
-    # Logic to list AI-generated challenges
-    return []
+async def list_ai_generated_challenges(limit: int = 100):
+    return await ai_challenge_generator.list_challenges(limit)
 
 @router.get("/{challenge_id}", response_model=AIGeneratedChallengeOut)
 async def get_ai_generated_challenge(challenge_id: str):
-    # Logic to get a specific AI-generated challenge
-    return {"id": challenge_id, "title": "AI Challenge", "description": "Description here", "difficulty": "medium"}
+    return await ai_challenge_generator.get_challenge(challenge_id)
 
 @router.put("/{challenge_id}", response_model=AIGeneratedChallengeOut)
 async def update_ai_generated_challenge(challenge_id: str, challenge: AIGeneratedChallengeCreate):
-    # Logic to update an AI-generated challenge
-    return {"id": challenge_id, "title": challenge.title, "description": challenge.description, "difficulty": challenge.difficulty}
+    return await ai_challenge_generator.update_challenge(challenge_id, challenge)
 
 @router.delete("/{challenge_id}")
 async def delete_ai_generated_challenge(challenge_id: str):
-    # Logic to delete an AI-generated challenge
+    await ai_challenge_generator.delete_challenge(challenge_id)
     return {"message": "AI-generated challenge deleted successfully"}
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from app.schemas.user import UserCreate, UserOut, UserLogin
+from app.schemas.user import UserCreate, UserOut, UserLogin, Token, RefreshRequest
 from app.core.security import create_access_token, get_current_user
+from app.services.refresh_tokens import refresh_tokens
 from app.services.supabase_service import supabase_client
 from app.models.user import User
 from app.core.config import settings
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
 
 router = APIRouter()
 
@@ -37,7 +38,7 @@ async def register(user_in: UserCreate) -> Any:
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/login")
+@router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     try:
         result = supabase_client.auth.sign_in_with_password({
@@ -52,12 +53,25 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         access_token = create_access_token(
             data={"sub": str(result.user.id)}, expires_delta=access_token_expires
         )
-        return {"access_token": access_token, "token_type": "bearer"}
     except Exception as e:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    refresh_token = await refresh_tokens.issue(str(result.user.id))
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest):
+    """Trade a refresh token for a new access token and the next refresh token; the old one stops working"""
+    user_id, refresh_token = await refresh_tokens.rotate(request.refresh_token)
+    access_token = create_access_token(
+        data={"sub": user_id}, expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 @router.post("/logout")
-async def logout():
+async def logout(request: Optional[RefreshRequest] = None):
+    if request is not None:
+        # Ends this sign-in's refresh tokens too
+        await refresh_tokens.revoke(request.refresh_token)
     try:
         supabase_client.auth.sign_out()
         return {"detail": "Successfully logged out"}
@@ -1,14 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.schemas.challenge import ChallengeCreate, ChallengeOut
-from app.services.supabase_service import supabase_client
-from app.models.challenge import Challenge
+from fastapi import APIRouter, Depends, Query, Request
+from datetime import datetime
+from typing import Optional
+from app.core.fast_json import RowEncoder, fast_json_response
+from app.core.security import get_current_admin_user
+from app.models.user import User
+from app.schemas.challenge import ChallengeCreate, ChallengeOut, ChallengePage, ChallengeUpdate, DifficultyEnum
+from app.services.challenge_catalog import challenge_catalog
+from app.services.github_service import github_provisioner
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ChallengeOut])
-async def list_challenges():
-    # List challenges logic here
-    return []
+CHALLENGE_ROWS = RowEncoder(ChallengeOut)
 
-# Additional endpoints...
+@router.get("/", response_model=ChallengePage)
+async def list_challenges(
+    request: Request,
+    difficulty: Optional[DifficultyEnum] = None,
+    active_at: Optional[datetime] = None,
+    starts_after: Optional[datetime] = None,
+    starts_before: Optional[datetime] = None,
+    ends_after: Optional[datetime] = None,
+    ends_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Challenges by start time, filtered from the in-memory catalog.
+
+    `active_at` keeps challenges running at that moment; e.g. challenges
+    starting in the next 24h are `starts_after=now&starts_before=now+24h`.
+    """
+    challenges, next_cursor = await challenge_catalog.list_challenges(
+        difficulty, active_at, starts_after, starts_before, ends_after, ends_before, cursor, limit
+    )
+    return fast_json_response(request, {"challenges": CHALLENGE_ROWS.rows(challenges), "next_cursor": next_cursor})
+
+@router.post("/", response_model=ChallengeOut)
+async def create_challenge(challenge: ChallengeCreate, current_user: User = Depends(get_current_admin_user)):
+    return await challenge_catalog.create_challenge(challenge)
+
+@router.get("/{challenge_id}", response_model=ChallengeOut)
+async def get_challenge(challenge_id: str):
+    return await challenge_catalog.get_challenge(challenge_id)
+
+@router.put("/{challenge_id}", response_model=ChallengeOut)
+async def update_challenge(
+    challenge_id: str,
+    challenge: ChallengeUpdate,
+    current_user: User = Depends(get_current_admin_user)
+):
+    return await challenge_catalog.update_challenge(challenge_id, challenge)
+
+@router.post("/{challenge_id}/repos")
+async def provision_challenge_repos(
+    challenge_id: str,
+    per_team: bool = False,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Create the challenge's GitHub repository, and with `per_team` one per enrolled team; safe to repeat"""
+    return await github_provisioner.create_challenge_repo(challenge_id, per_team)
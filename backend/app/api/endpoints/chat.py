@@ -1,26 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from app.schemas.chat import ChatMessageCreate, ChatMessageOut
-from app.services.supabase_service import supabase_client
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from uuid import UUID
+from typing import Optional
+from pydantic import ValidationError
+from app.schemas.chat import ChatMessageCreate, ChatMessageOut, ChatMessagePage, ChatRoomType
+from app.services.chat_service import chat_service
 
 router = APIRouter()
 
 @router.post("/", response_model=ChatMessageOut)
 async def create_chat_message(message: ChatMessageCreate):
-    # Logic to create a chat message
-    return {"id": "123", "user_id": message.user_id, "content": message.content, "timestamp": "2023-05-01T12:00:00Z"}
+    """Post a message; viewers receive it over the room's WebSocket"""
+    return await chat_service.post_message(message)
 
-@router.get("/", response_model=List[ChatMessageOut])
-async def list_chat_messages():
-    # Logic to list chat messages
-    return []
+@router.get("/", response_model=ChatMessagePage)
+async def list_chat_messages(
+    room_type: ChatRoomType,
+    room_id: UUID,
+    before: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Page through a room's history, newest page first"""
+    messages, next_cursor = await chat_service.list_messages(room_type, room_id, before, limit)
+    return ChatMessagePage(messages=messages, next_cursor=next_cursor)
+
+@router.websocket("/ws/{room_type}/{room_id}")
+async def chat_room_socket(websocket: WebSocket, room_type: ChatRoomType, room_id: UUID):
+    """Live feed of a room. Frames sent to the client are JSON arrays of messages;
+    clients post by sending {"user_id": ..., "content": ...}."""
+    await websocket.accept()
+    room = await chat_service.subscribe(websocket, room_type, room_id)
+    try:
+        while True:
+            data = await websocket.receive_json()
+            try:
+                message = ChatMessageCreate(**data, room_type=room_type, room_id=room_id)
+            except (TypeError, ValidationError):
+                await websocket.send_json({"error": "Invalid message"})
+                continue
+            await chat_service.post_message(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_service.unsubscribe(websocket, room)
 
 @router.get("/{message_id}", response_model=ChatMessageOut)
 async def get_chat_message(message_id: str):
-    # Logic to get a specific chat message
-    return {"id": message_id, "user_id": "user123", "content": "Hello, world!", "timestamp": "2023-05-01T12:00:00Z"}
+    return await chat_service.get_message(message_id)
 
 @router.delete("/{message_id}")
 async def delete_chat_message(message_id: str):
-    # Logic to delete a chat message
+    await chat_service.delete_message(message_id)
     return {"message": "Chat message deleted successfully"}
@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
-from app.schemas.enrollment import EnrollmentCreate, EnrollmentOut
+from app.schemas.enrollment import EnrollmentCreate, EnrollmentOut, AdmissionStatus
+from app.services.enrollment_admission import enrollment_admission
 from app.services.supabase_service import supabase_client
 
 router = APIRouter()
 
 @router.post("/", response_model=EnrollmentOut)
 async def create_enrollment(enrollment: EnrollmentCreate):
-    # Logic to create an enrollment
-    return {"id": "123", "user_id": enrollment.user_id, "challenge_id": enrollment.challenge_id}
+    """Take a slot in the challenge, or a place on its waitlist once it is full"""
+    return await enrollment_admission.admit(enrollment.challenge_id, enrollment.user_id, enrollment.team_id)
+
+@router.get("/admission/{challenge_id}", response_model=AdmissionStatus)
+async def get_admission_status(challenge_id: str):
+    return await enrollment_admission.status(challenge_id)
 
 @router.get("/", response_model=List[EnrollmentOut])
 async def list_enrollments():
@@ -22,5 +27,5 @@ async def get_enrollment(enrollment_id: str):
 
 @router.delete("/{enrollment_id}")
 async def delete_enrollment(enrollment_id: str):
-    # Logic to delete an enrollment
+    await enrollment_admission.withdraw(enrollment_id)
     return {"message": "Enrollment deleted successfully"}
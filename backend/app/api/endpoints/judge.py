@@ -1,17 +1,66 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.ai_judge_service import evaluate_code_submission
-from typing import Any
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from app.core.security import get_current_admin_user, get_optional_current_user
+from app.models.user import User
+from app.services.ai_judge_service import evaluate_code_submission, stream_evaluation, RESULT
+from app.services.judge_dispatcher import judge_dispatcher
+from app.services.achievement_engine import achievement_engine, JUDGE_EVALUATED
+from typing import Any, Optional
+import json
 
 router = APIRouter()
 
+def _publish(current_user: Optional[User], evaluation: dict) -> None:
+    # Anonymous submissions are still judged; only signed-in users earn achievements
+    if current_user is not None:
+        score = evaluation.get("score")
+        achievement_engine.publish(
+            JUDGE_EVALUATED, current_user.id, score=score if isinstance(score, (int, float)) else None
+        )
+
 @router.post("/submit", response_model=dict)
-async def submit_code(file: UploadFile = File(...), language: str = "Python") -> Any:
+async def submit_code(
+    file: UploadFile = File(...),
+    language: str = "Python",
+    current_user: Optional[User] = Depends(get_optional_current_user)
+) -> Any:
     try:
         contents = await file.read()
         code = contents.decode('utf-8')
-        evaluation = evaluate_code_submission(code, language)
+        evaluation = await evaluate_code_submission(code, language)
         if "error" in evaluation:
             raise HTTPException(status_code=500, detail=evaluation["error"])
+        _publish(current_user, evaluation)
         return evaluation
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/submit/stream")
+async def submit_code_stream(
+    file: UploadFile = File(...),
+    language: str = "Python",
+    current_user: Optional[User] = Depends(get_optional_current_user)
+):
+    """Judge a submission, sending `partial` evaluations as server-sent events while the model replies, then a `result` or an `error`"""
+    try:
+        code = (await file.read()).decode('utf-8')
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Submission must be UTF-8 text")
+
+    async def events():
+        async for event in stream_evaluation(code, language):
+            if event['event'] == RESULT:
+                _publish(current_user, event['data'])
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Proxies must pass each event on as it is sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats", response_model=dict)
+async def judge_stats(current_user: User = Depends(get_current_admin_user)):
+    """How often judge requests were hedged, and each backend's win rate and circuit breaker"""
+    return judge_dispatcher.stats()
@@ -1,23 +1,68 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from ...core.fast_json import fast_json_response
+from ...core.security import get_current_admin_user
+from ...models.user import User
 from ...services.leaderboard_service import LeaderboardService
+from ...services.leaderboard_snapshots import leaderboard_snapshots
+from ...services.score_trajectory import score_trajectory_store
+from ...services.team_leaderboard import team_leaderboard
 from ...schemas.leaderboard import (
     ScoreHistoryCreate,
     ScoreUpdateResponse,
-    LeaderboardResponse
+    LeaderboardResponse,
+    ScoreRollbackRequest,
+    ScoreRollbackResponse,
+    ScoreTrajectory,
+    TeamBoard,
+    TeamStanding
 )
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 
 @router.get("/global", response_model=LeaderboardResponse)
-async def get_global_leaderboard():
-    """Get global leaderboard across all challenges"""
-    return await LeaderboardService.get_global_leaderboard_data()
+async def get_global_leaderboard(request: Request, at: Optional[datetime] = None):
+    """Get global leaderboard across all challenges; with `at`, as of the latest snapshot at or before it"""
+    if at is not None:
+        return fast_json_response(request, await leaderboard_snapshots.payload_at(None, at))
+    return fast_json_response(request, await LeaderboardService.get_global_leaderboard_payload())
 
 @router.get("/challenge/{challenge_id}", response_model=LeaderboardResponse)
-async def get_challenge_leaderboard(challenge_id: str):
-    """Get leaderboard for a specific challenge"""
-    return await LeaderboardService.get_challenge_leaderboard(challenge_id)
+async def get_challenge_leaderboard(request: Request, challenge_id: str, at: Optional[datetime] = None):
+    """Get leaderboard for a specific challenge; with `at`, as of the latest snapshot at or before it"""
+    if at is not None:
+        return fast_json_response(request, await leaderboard_snapshots.payload_at(challenge_id, at))
+    return fast_json_response(request, await LeaderboardService.get_challenge_leaderboard_payload(challenge_id))
+
+@router.get("/teams", response_model=TeamBoard)
+async def get_global_team_leaderboard(aggregation: Optional[str] = None, k: Optional[int] = Query(None, ge=1)):
+    """Teams ranked by their aggregate (sum, best_k or mean of member scores) summed over challenges"""
+    return await team_leaderboard.global_board(aggregation, k)
+
+@router.get("/challenge/{challenge_id}/teams", response_model=TeamBoard)
+async def get_challenge_team_leaderboard(
+    challenge_id: str,
+    aggregation: Optional[str] = None,
+    k: Optional[int] = Query(None, ge=1)
+):
+    """Teams in a challenge ranked by the sum, best_k or mean of their members' scores"""
+    return await team_leaderboard.challenge_board(challenge_id, aggregation, k)
+
+@router.get("/challenge/{challenge_id}/teams/{team_id}", response_model=TeamStanding)
+async def get_team_standing(
+    challenge_id: str,
+    team_id: str,
+    aggregation: Optional[str] = None,
+    k: Optional[int] = Query(None, ge=1)
+):
+    """A team's rank and score in a challenge, with its members' scores"""
+    return await team_leaderboard.team_standing(challenge_id, team_id, aggregation, k)
+
+@router.get("/challenge/{challenge_id}/history/{user_id}", response_model=ScoreTrajectory)
+async def get_score_history(challenge_id: str, user_id: str, points: int = Query(200, ge=3, le=2000)):
+    """A user's accepted scores in a challenge over time, downsampled to at most `points` points"""
+    return await score_trajectory_store.history(challenge_id, user_id, points)
 
 @router.post("/score", response_model=ScoreUpdateResponse)
 async def update_score(
@@ -47,3 +92,11 @@ async def delete_score(
         return await LeaderboardService.delete_score(user_id, date)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/scores/rollback", response_model=ScoreRollbackResponse)
+async def rollback_scores(
+    rollback: ScoreRollbackRequest,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Delete several users' scores recorded after a date; leaderboards drop just those rows"""
+    return await LeaderboardService.rollback_scores(rollback.user_ids, rollback.after, rollback.challenge_id)
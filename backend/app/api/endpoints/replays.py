@@ -1,26 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from app.schemas.replay import ReplayCreate, ReplayOut
-from app.services.supabase_service import supabase_client
+from app.services.replay_store import replay_store, parse_range_header
 
 router = APIRouter()
 
 @router.post("/", response_model=ReplayOut)
-async def create_replay(replay: ReplayCreate):
-    # Logic to create a replay
-    return {"id": "123", "challenge_id": replay.challenge_id, "user_id": replay.user_id, "replay_data": replay.replay_data}
+async def create_replay(request: Request, replay: ReplayCreate = Depends()):
+    """Upload a replay as the raw request body; it is streamed into the blob store chunk by chunk"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > replay_store.max_bytes:
+        raise HTTPException(status_code=413, detail=f"Replay exceeds {replay_store.max_bytes} bytes")
+    return await replay_store.store(replay.challenge_id, replay.user_id, request.stream())
 
 @router.get("/", response_model=List[ReplayOut])
-async def list_replays():
-    # Logic to list replays
-    return []
+async def list_replays(challenge_id: Optional[str] = None, user_id: Optional[str] = None):
+    return await replay_store.list_replays(challenge_id, user_id)
 
 @router.get("/{replay_id}", response_model=ReplayOut)
 async def get_replay(replay_id: str):
-    # Logic to get a specific replay
-    return {"id": replay_id, "challenge_id": "challenge456", "user_id": "user123", "replay_data": "Replay data here"}
+    return await replay_store.get(replay_id)
+
+@router.get("/{replay_id}/data")
+async def get_replay_data(replay_id: str, range: Optional[str] = Header(None)):
+    """Stream replay bytes, honouring a single HTTP Range"""
+    replay = await replay_store.get(replay_id)
+    manifest = await replay_store.load_manifest(replay_id)
+    size = manifest['size']
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f"\"{replay['content_hash']}\"",
+    }
+
+    byte_range = parse_range_header(range, size)
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1 if size else 0)
+
+    body = replay_store.iter_range(manifest, start, end) if size else iter(())
+    return StreamingResponse(
+        body,
+        status_code=status_code,
+        media_type="application/octet-stream",
+        headers=headers
+    )
+
+@router.get("/{replay_id}/state")
+async def get_replay_state(replay_id: str, t: int = Query(..., ge=0)):
+    """State of a binary-format replay at `t` milliseconds"""
+    return {"t": t, "state": await replay_store.state_at(replay_id, t)}
 
 @router.delete("/{replay_id}")
 async def delete_replay(replay_id: str):
-    # Logic to delete a replay
+    await replay_store.delete(replay_id)
     return {"message": "Replay deleted successfully"}
@@ -1,26 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Query
 from typing import List
-from app.schemas.skill_profile import SkillProfileCreate, SkillProfileOut
-from app.services.supabase_service import supabase_client
+from app.schemas.skill_profile import SkillProfileCreate, SkillProfileOut, SimilarProfile
+from app.services.skill_index import skill_profile_service
 
 router = APIRouter()
 
 @router.post("/", response_model=SkillProfileOut)
 async def create_skill_profile(profile: SkillProfileCreate):
-    # Logic to create a skill profile
-    return {"id": "123", "user_id": profile.user_id, "skills": profile.skills}
+    return await skill_profile_service.create(profile)
 
 @router.get("/{user_id}", response_model=SkillProfileOut)
 async def get_skill_profile(user_id: str):
-    # Logic to get a user's skill profile
-    return {"id": "123", "user_id": user_id, "skills": {"python": 8, "javascript": 7}}
+    return await skill_profile_service.get(user_id)
+
+@router.get("/{user_id}/similar", response_model=List[SimilarProfile])
+async def get_similar_profiles(user_id: str, k: int = Query(10, ge=1, le=100)):
+    """Users with the most similar skills (cosine similarity), best first"""
+    return await skill_profile_service.similar(user_id, k)
 
 @router.put("/{user_id}", response_model=SkillProfileOut)
 async def update_skill_profile(user_id: str, profile: SkillProfileCreate):
-    # Logic to update a skill profile
-    return {"id": "123", "user_id": user_id, "skills": profile.skills}
+    return await skill_profile_service.update(user_id, profile.skills)
 
 @router.delete("/{user_id}")
 async def delete_skill_profile(user_id: str):
-    # Logic to delete a skill profile
+    await skill_profile_service.delete(user_id)
     return {"message": "Skill profile deleted successfully"}
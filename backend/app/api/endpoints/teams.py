@@ -1,6 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query
 from typing import List
-from app.schemas.team import TeamCreate, TeamOut
+from app.core.security import get_current_admin_user
+from app.models.user import User
+from app.schemas.team import TeamCreate, TeamOut, TeamFormationResult
+from app.services.team_formation import team_formation_service
 
 router = APIRouter()
 
@@ -9,4 +12,13 @@ async def list_teams():
     # List teams logic here
     return []
 
+@router.post("/formation/{challenge_id}", response_model=TeamFormationResult)
+async def form_teams(
+    challenge_id: str,
+    team_size: int = Query(4, ge=2, le=50),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Place the challenge's unteamed enrollees into balanced teams of at most `team_size`"""
+    return await team_formation_service.form_teams(challenge_id, team_size)
+
 # Additional endpoints...
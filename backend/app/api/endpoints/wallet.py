@@ -1,26 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from app.core.security import get_current_admin_user
+from app.models.user import User
+from app.schemas.payout import PayoutResult, PayoutSchedule
 from app.schemas.wallet import WalletCreate, WalletOut, TransactionCreate, TransactionOut
-from app.services.supabase_service import supabase_client
+from app.services.payout_service import payout_service
+from app.services.wallet_ledger import wallet_ledger
 
 router = APIRouter()
 
 @router.post("/", response_model=WalletOut)
 async def create_wallet(wallet: WalletCreate):
-    # Logic to create a wallet
-    return {"id": "123", "user_id": wallet.user_id, "balance": 0}
+    return await wallet_ledger.create_wallet(wallet.user_id)
 
 @router.get("/{user_id}", response_model=WalletOut)
 async def get_wallet(user_id: str):
-    # Logic to get a user's wallet
-    return {"id": "123", "user_id": user_id, "balance": 1000}
+    """Wallet with its balance in minor units, from the latest snapshot plus the transactions since"""
+    return await wallet_ledger.get_wallet(user_id)
 
 @router.post("/transactions", response_model=TransactionOut)
-async def create_transaction(transaction: TransactionCreate):
-    # Logic to create a transaction
-    return {"id": "123", "wallet_id": transaction.wallet_id, "amount": transaction.amount, "type": transaction.type, "timestamp": "2023-05-01T12:00:00Z"}
+async def create_transaction(
+    transaction: TransactionCreate,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Append a transaction to the ledger; concurrent posts are committed together"""
+    return await wallet_ledger.post(transaction)
 
 @router.get("/transactions/{wallet_id}", response_model=List[TransactionOut])
-async def list_transactions(wallet_id: str):
-    # Logic to list transactions for a wallet
-    return []
+async def list_transactions(
+    wallet_id: str,
+    before: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    return await wallet_ledger.list_transactions(wallet_id, before, limit)
+
+@router.post("/payouts/{challenge_id}", response_model=PayoutResult)
+async def pay_out_challenge(
+    challenge_id: str,
+    schedule: PayoutSchedule,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Credit prizes from the challenge's final ranking; safe to rerun, resumes where it stopped"""
+    return await payout_service.run(challenge_id, schedule)
@@ -0,0 +1,207 @@
+import logging
+import math
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+READ = "read"
+WRITE = "write"
+JUDGE = "judge"
+
+# Route class -> (tokens a request costs, share of ADMISSION_MAX_IN_FLIGHT it may
+# fill). Lower shares are shed first as the server fills up, so reads keep
+# being served after judge submissions are already turned away
+ROUTE_CLASSES: Dict[str, Tuple[float, float]] = {
+    READ: (1, 1.0),
+    WRITE: (1, 0.75),
+    JUDGE: (5, 0.5),
+}
+# Sent with a 503; in-flight requests usually finish well within it
+SHED_RETRY_AFTER_SECONDS = 1
+# Resolved route templates kept per (method, path)
+ROUTE_CACHE_SIZE = 10000
+
+def route_class(method: str, path: str) -> str:
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return READ
+    if path.startswith("/judge/"):
+        return JUDGE
+    return WRITE
+
+class TokenBuckets:
+    """Token buckets by key, refilled lazily when taken from.
+
+    Only the ``max_keys`` most recently used buckets are kept; an evicted
+    key starts again with a full bucket, which errs on the side of admitting.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (tokens, when they were counted)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def wait(self, key: str, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available; 0 if they are now"""
+        tokens, at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - at) * self.rate)
+        if tokens >= cost:
+            return 0.0
+        return (cost - tokens) / self.rate
+
+    def take(self, key: str, cost: float, now: float) -> None:
+        tokens, at = self._buckets.pop(key, (self.burst, now))
+        self._buckets[key] = (min(self.burst, tokens + (now - at) * self.rate) - cost, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+class AdmissionControlMiddleware:
+    """Sheds excess HTTP load before it reaches the endpoints.
+
+    Each request is classed as a read, a write or a judge submission and
+    checked, cheapest first, against:
+
+    - the in-flight limit of its class, a share of ``ADMISSION_MAX_IN_FLIGHT``
+      (see ``ROUTE_CLASSES``), and ``ADMISSION_ROUTE_MAX_IN_FLIGHT`` for its
+      route; when full it gets a 503;
+    - the token bucket of its client IP and, when it carries a valid bearer
+      token, of its user; when empty it gets a 429.
+
+    Both answers carry ``Retry-After`` and are sent without touching the
+    endpoint, the database or the request body. Buckets and counters are per
+    worker process.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Optional[List[BaseRoute]] = None,
+        max_in_flight: int = settings.ADMISSION_MAX_IN_FLIGHT,
+        route_max_in_flight: int = settings.ADMISSION_ROUTE_MAX_IN_FLIGHT,
+        user_rate: float = settings.ADMISSION_USER_RATE,
+        user_burst: float = settings.ADMISSION_USER_BURST,
+        ip_rate: float = settings.ADMISSION_IP_RATE,
+        ip_burst: float = settings.ADMISSION_IP_BURST,
+        max_buckets: int = settings.ADMISSION_MAX_BUCKETS,
+        trust_forwarded: bool = settings.ADMISSION_TRUST_FORWARDED,
+        enabled: bool = settings.ADMISSION_ENABLED,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.app = app
+        # The application's route list, so per-route limits apply per path template
+        self.routes = routes or []
+        self.max_in_flight = max_in_flight
+        self.route_max_in_flight = route_max_in_flight
+        self.users = TokenBuckets(user_rate, user_burst, max_buckets)
+        self.ips = TokenBuckets(ip_rate, ip_burst, max_buckets)
+        self.trust_forwarded = trust_forwarded
+        self.enabled = enabled
+        self.clock = clock
+        self.in_flight = 0
+        self._class_in_flight: Dict[str, int] = defaultdict(int)
+        self._route_in_flight: Dict[str, int] = defaultdict(int)
+        self._route_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        klass = route_class(method, path)
+        cost, share = ROUTE_CLASSES[klass]
+        route = self._route(scope)
+        if (
+            self.in_flight >= self.max_in_flight
+            or self._class_in_flight[klass] >= self.max_in_flight * share
+            or self._route_in_flight.get(route, 0) >= self.route_max_in_flight
+        ):
+            await self._reject(scope, receive, send, 503, "Server is busy", SHED_RETRY_AFTER_SECONDS)
+            return
+
+        now = self.clock()
+        ip = self._client_ip(scope)
+        user = self._user(scope)
+        wait = self.ips.wait(ip, cost, now)
+        if user is not None:
+            wait = max(wait, self.users.wait(user, cost, now))
+        if wait > 0:
+            await self._reject(scope, receive, send, 429, "Too many requests", math.ceil(wait))
+            return
+        self.ips.take(ip, cost, now)
+        if user is not None:
+            self.users.take(user, cost, now)
+
+        self.in_flight += 1
+        self._class_in_flight[klass] += 1
+        self._route_in_flight[route] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self._class_in_flight[klass] -= 1
+            self._route_in_flight[route] -= 1
+            if not self._route_in_flight[route]:
+                del self._route_in_flight[route]
+
+    def _route(self, scope: Scope) -> str:
+        """The path template of the route a request is for, e.g. "GET /leaderboard/challenge/{challenge_id}" """
+        key = (scope["method"], scope["path"])
+        cached = self._route_cache.get(key)
+        if cached is not None:
+            self._route_cache.move_to_end(key)
+            return cached
+        # Paths no route serves share one limit, so random 404 probes cannot dodge it
+        template = "*"
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", template)
+                break
+        self._route_cache[key] = f"{scope['method']} {template}"
+        while len(self._route_cache) > ROUTE_CACHE_SIZE:
+            self._route_cache.popitem(last=False)
+        return self._route_cache[key]
+
+    def _client_ip(self, scope: Scope) -> str:
+        if self.trust_forwarded:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def _user(scope: Scope) -> Optional[str]:
+        """The user id of a valid bearer token; requests without one are limited by IP only"""
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                try:
+                    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+                except JWTError:
+                    return None
+                subject = payload.get("sub")
+                return str(subject) if subject is not None and payload.get("typ") != "refresh" else None
+        return None
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str, retry_after: int) -> None:
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, retry_after))}
+        )
+        await response(scope, receive, send)
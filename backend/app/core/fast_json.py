@@ -0,0 +1,95 @@
+import gzip
+from typing import Any, Dict, Iterable, List, Optional, Type, Union
+
+import orjson
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always offered
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+class RowEncoder:
+    """Shapes storage rows like a response model without building one model per row.
+
+    Each row is projected onto the model's fields, so columns the model
+    leaves out (password hashes, say) never reach the client, and missing
+    optional fields get their defaults. Values are not validated: rows must
+    already hold what the model would accept, as rows read from storage do.
+    orjson writes datetimes, UUIDs and enums natively.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = [
+            (name, None if field.is_required() else field.get_default(call_default_factory=True))
+            for name, field in model.model_fields.items()
+        ]
+
+    def rows(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        fields = self.fields
+        return [{name: row.get(name, default) for name, default in fields} for row in rows]
+
+class EncodedPayload:
+    """A JSON body encoded once; its compressed forms are made on first request and kept.
+
+    Hold on to one of these to cache a response: serving it again costs no
+    encoding and, after the first compressed request, no compression either.
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._compressed: Dict[str, bytes] = {}
+
+    @classmethod
+    def of(cls, content: Any) -> "EncodedPayload":
+        return cls(orjson.dumps(content))
+
+    def encoded(self, encoding: str) -> bytes:
+        compressed = self._compressed.get(encoding)
+        if compressed is None:
+            if encoding == "br":
+                compressed = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            else:
+                compressed = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+            self._compressed[encoding] = compressed
+        return compressed
+
+def _accepted_encoding(request: Request) -> Optional[str]:
+    """The best of br and gzip the client accepts, honouring q=0"""
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def fast_json_response(request: Request, content: Union[EncodedPayload, Any], status_code: int = 200) -> Response:
+    """A JSON response from already-shaped content, compressed when large and the client accepts it"""
+    payload = content if isinstance(content, EncodedPayload) else EncodedPayload.of(content)
+    if len(payload.body) < settings.FAST_RESPONSE_COMPRESS_MIN_BYTES:
+        return Response(payload.body, status_code=status_code, media_type="application/json")
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = _accepted_encoding(request)
+    if encoding is None:
+        return Response(payload.body, status_code=status_code, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(payload.encoded(encoding), status_code=status_code, media_type="application/json", headers=headers)
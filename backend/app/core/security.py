@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
+from app.core.shared_cache import shared_cache
 from app.services.supabase_service import supabase_client
 from app.models.user import User
 import logging
@@ -10,6 +12,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -18,6 +21,13 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def _principal_key(user_id: str) -> str:
+    return f"principal:{user_id}"
+
+def forget_user(user_id: str) -> None:
+    """Drop a user's cached principal after changing or deleting them"""
+    shared_cache.delete(_principal_key(user_id))
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,7 +37,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
-        if user_id is None:
+        # Refresh tokens are signed the same way but only work on /auth/refresh
+        if user_id is None or payload.get("typ") == "refresh":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
@@ -36,9 +47,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         logger.error("Supabase client is not initialized.")
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database service is unavailable")
 
+    # Every worker on the host shares the principal, so a user is loaded once per TTL, not once per worker
+    cached = shared_cache.get_json(_principal_key(user_id))
+    if cached is not None:
+        return User(**cached)
+
     try:
         response = supabase_client.table("users").select("*").eq("id", user_id).execute()
         if response.data:
+            shared_cache.set_json(_principal_key(user_id), response.data[0], settings.SHARED_CACHE_PRINCIPAL_TTL_SECONDS)
             return User(**response.data[0])
         else:
             raise credentials_exception
@@ -46,6 +63,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         logger.error(f"Error fetching user data: {e}")
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Error fetching user data")
 
+async def get_optional_current_user(token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """The signed-in user, or None when the request carries no token"""
+    if token is None:
+        return None
+    return await get_current_user(token)
+
 async def get_current_admin_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -0,0 +1,252 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import orjson
+
+from .config import settings
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; the cache then stays disabled
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AHLCACHE"
+VERSION = 1
+# magic, version, sets, ways, data bytes, write position, hits, misses
+HEADER = struct.Struct("<8sIIIQQQQ")
+HEADER_BYTES = 64
+# key hash (0 = empty), record position, record length, unused, expires at, last used
+SLOT = struct.Struct("<QQIIdd")
+# key hash, key length, value length; followed by the key and value bytes
+RECORD = struct.Struct("<QII")
+# Largest record, as a share of the data region, so one entry cannot flush the rest
+MAX_RECORD_SHARE = 4
+
+def default_path() -> str:
+    """Under /dev/shm where it exists, so the file is memory and never written back to disk"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "ahl-shared-cache")
+
+def _hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+class SharedCache:
+    """A byte cache shared by every worker process on the host, in one memory-mapped file.
+
+    The file holds a set-associative index (``SHARED_CACHE_SETS`` sets of
+    ``SHARED_CACHE_WAYS`` slots of fixed size) and a data region used as a
+    ring: records are appended and the oldest are overwritten as it wraps.
+    A key hashes to one set; a new key takes an empty or expired slot there,
+    else the least recently used one. A slot whose record the ring has since
+    overwritten is a miss. Hits on records in the older half of the ring
+    copy them to the head, so entries in use survive the wrap: eviction is
+    TTL, then approximately LRU.
+
+    Every operation holds an ``flock`` on the file (and a thread lock, which
+    ``flock`` does not provide within a process), so workers see one cache:
+    one copy of each entry, warmed once, with the same hit rate everywhere.
+    The file is opened per process on first use, so it is safe across fork.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        sets: int = settings.SHARED_CACHE_SETS,
+        ways: int = settings.SHARED_CACHE_WAYS,
+        data_bytes: int = settings.SHARED_CACHE_DATA_BYTES,
+        enabled: bool = settings.SHARED_CACHE_ENABLED,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = path or settings.SHARED_CACHE_PATH or default_path()
+        self.sets = sets
+        self.ways = ways
+        self.data_bytes = data_bytes
+        self.enabled = enabled and fcntl is not None
+        self.clock = clock
+        self.index_offset = HEADER_BYTES
+        self.data_offset = HEADER_BYTES + sets * ways * SLOT.size
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    # File
+
+    def _open(self) -> mmap.mmap:
+        if self._pid == os.getpid():
+            return self._map
+        # A forked child must not share the parent's open file, or flock would not exclude it
+        size = self.data_offset + self.data_bytes
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            # Only ever grown: a worker still mapping a longer file would fault on a shrunk one
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            mapped = mmap.mmap(fd, size)
+            magic, version, sets, ways, data_bytes = HEADER.unpack_from(mapped, 0)[:5]
+            if (magic, version, sets, ways, data_bytes) != (MAGIC, VERSION, self.sets, self.ways, self.data_bytes):
+                # New file, or one laid out for other settings: start empty
+                mapped[:self.data_offset] = bytes(self.data_offset)
+                HEADER.pack_into(mapped, 0, MAGIC, VERSION, self.sets, self.ways, self.data_bytes, 0, 0, 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd, self._map, self._pid = fd, mapped, os.getpid()
+        return mapped
+
+    def _locked(self, operation: Callable[[mmap.mmap], Any], default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        with self._lock:
+            try:
+                mapped = self._open()
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except OSError as e:
+                logger.error(f"Shared cache unavailable, disabling it: {str(e)}")
+                self.enabled = False
+                return default
+            try:
+                return operation(mapped)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # Layout helpers; callers hold the lock
+
+    def _slot_offset(self, key_hash: int, way: int) -> int:
+        return self.index_offset + ((key_hash % self.sets) * self.ways + way) * SLOT.size
+
+    def _header(self, mapped: mmap.mmap) -> list:
+        return list(HEADER.unpack_from(mapped, 0))
+
+    def _append(self, mapped: mmap.mmap, header: list, key_hash: int, key: bytes, value: bytes) -> int:
+        """Write a record at the head of the ring; returns its absolute position"""
+        length = RECORD.size + len(key) + len(value)
+        position = header[5]
+        offset = position % self.data_bytes
+        if offset + length > self.data_bytes:
+            # Records never wrap; skip to the start of the ring
+            position += self.data_bytes - offset
+            offset = 0
+        start = self.data_offset + offset
+        RECORD.pack_into(mapped, start, key_hash, len(key), len(value))
+        mapped[start + RECORD.size:start + length] = key + value
+        header[5] = position + length
+        return position
+
+    def _find(self, mapped: mmap.mmap, key_hash: int, key: bytes, now: float, write_position: int):
+        """(way, slot fields, value) of a live entry for `key`, clearing dead slots on the way"""
+        for way in range(self.ways):
+            offset = self._slot_offset(key_hash, way)
+            slot = SLOT.unpack_from(mapped, offset)
+            if slot[0] != key_hash:
+                continue
+            position, length, expires_at = slot[1], slot[2], slot[4]
+            if expires_at <= now or write_position > position + self.data_bytes:
+                mapped[offset:offset + SLOT.size] = bytes(SLOT.size)
+                continue
+            start = self.data_offset + position % self.data_bytes
+            record_hash, key_length, value_length = RECORD.unpack_from(mapped, start)
+            body = start + RECORD.size
+            if record_hash != key_hash or mapped[body:body + key_length] != key:
+                # Another key with the same 64-bit hash
+                continue
+            return way, slot, bytes(mapped[body + key_length:body + key_length + value_length])
+        return None
+
+    # Operations
+
+    def get(self, key: str) -> Optional[bytes]:
+        encoded = key.encode()
+        key_hash = _hash(encoded)
+
+        def operation(mapped: mmap.mmap) -> Optional[bytes]:
+            now = self.clock()
+            header = self._header(mapped)
+            found = self._find(mapped, key_hash, encoded, now, header[5])
+            if found is None:
+                header[7] += 1
+                HEADER.pack_into(mapped, 0, *header)
+                return None
+            way, slot, value = found
+            position = slot[1]
+            if header[5] - position > self.data_bytes // 2:
+                # Old enough to be overwritten soon; move it to the head
+                position = self._append(mapped, header, key_hash, encoded, value)
+            header[6] += 1
+            HEADER.pack_into(mapped, 0, *header)
+            SLOT.pack_into(mapped, self._slot_offset(key_hash, way), key_hash, position, slot[2], 0, slot[4], now)
+            return value
+
+        return self._locked(operation)
+
+    def set(self, key: str, value: bytes, ttl: float) -> bool:
+        """Store a value for `ttl` seconds; False if it is too large to share or the cache is off"""
+        encoded = key.encode()
+        key_hash = _hash(encoded)
+        length = RECORD.size + len(encoded) + len(value)
+        if length > self.data_bytes // MAX_RECORD_SHARE:
+            return False
+
+        def operation(mapped: mmap.mmap) -> bool:
+            now = self.clock()
+            header = self._header(mapped)
+            found = self._find(mapped, key_hash, encoded, now, header[5])
+            if found is not None:
+                way = found[0]
+            else:
+                # An empty slot, else the least recently used one
+                ways = [SLOT.unpack_from(mapped, self._slot_offset(key_hash, way)) for way in range(self.ways)]
+                way = min(range(self.ways), key=lambda w: (ways[w][0] != 0, ways[w][5]))
+            position = self._append(mapped, header, key_hash, encoded, value)
+            HEADER.pack_into(mapped, 0, *header)
+            SLOT.pack_into(mapped, self._slot_offset(key_hash, way), key_hash, position, length, 0, now + ttl, now)
+            return True
+
+        return self._locked(operation, False)
+
+    def delete(self, key: str) -> None:
+        encoded = key.encode()
+        key_hash = _hash(encoded)
+
+        def operation(mapped: mmap.mmap) -> None:
+            found = self._find(mapped, key_hash, encoded, self.clock(), self._header(mapped)[5])
+            if found is not None:
+                offset = self._slot_offset(key_hash, found[0])
+                mapped[offset:offset + SLOT.size] = bytes(SLOT.size)
+
+        self._locked(operation)
+
+    def clear(self) -> None:
+        def operation(mapped: mmap.mmap) -> None:
+            header = self._header(mapped)
+            mapped[self.index_offset:self.data_offset] = bytes(self.data_offset - self.index_offset)
+            header[6] = header[7] = 0
+            HEADER.pack_into(mapped, 0, *header)
+
+        self._locked(operation)
+
+    def stats(self) -> dict:
+        """Hits and misses across every worker since the cache was created"""
+        def operation(mapped: mmap.mmap) -> dict:
+            header = self._header(mapped)
+            return {'hits': header[6], 'misses': header[7]}
+
+        return self._locked(operation, {'hits': 0, 'misses': 0})
+
+    def get_json(self, key: str) -> Any:
+        value = self.get(key)
+        return orjson.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value: Any, ttl: float) -> bool:
+        return self.set(key, orjson.dumps(value), ttl)
+
+shared_cache = SharedCache()
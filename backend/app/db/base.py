@@ -6,3 +6,16 @@ from app.db.base_class import Base  # Import Base without causing circular impor
 from app.models.user import User
 from app.models.challenge import Challenge
 from app.models.team import Team
+from app.models.enrollment import Enrollment
+from app.models.score_history import ScoreHistory
+from app.models.chat_message import ChatMessage
+from app.models.replay import Replay
+from app.models.wallet import Wallet, WalletTransaction, WalletSnapshot
+from app.models.payout import PayoutRun
+from app.models.skill_profile import SkillProfile
+from app.models.lifecycle import SchedulerLease, ChallengeLifecycleEvent
+from app.models.achievement import UserAchievement, AchievementCounter
+from app.models.ai_generated_challenge import AIGeneratedChallenge, AIPromptCache
+from app.models.score_trajectory import ScorePoint, ScoreTrajectoryChunk
+from app.models.refresh_token import RefreshTokenFamily
+from app.models.team_score import TeamMemberScore, TeamScore
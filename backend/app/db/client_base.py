@@ -0,0 +1,92 @@
+from typing import Dict, List, Optional
+
+# Values per `in` filter when callers chunk large key lists; on Supabase the
+# filter travels in the request URL, which has to stay well below proxy limits
+IN_FILTER_CHUNK = 100
+
+# Rows per request when paging through a function's result. PostgREST caps
+# every response at the project's max-rows (1000 by default); keep this at or
+# below it, since a short page is taken as the last one
+RPC_PAGE_SIZE = 1000
+
+class LeaderboardQueriesMixin:
+    """Leaderboard helpers shared by every storage backend.
+
+    Backends only need to provide ``select``, ``insert``, ``delete`` and ``rpc``.
+    """
+
+    def get_global_leaderboard(self) -> Dict:
+        """Get global leaderboard data"""
+        return self.rpc('get_global_leaderboard')
+
+    def get_challenge_leaderboard(self, challenge_id: str) -> Dict:
+        """Get challenge-specific leaderboard data, all of it, in pages of RPC_PAGE_SIZE"""
+        rows = []
+        while True:
+            response = self.rpc(
+                'get_challenge_leaderboard',
+                {'challenge_id_param': challenge_id},
+                offset=len(rows),
+                limit=RPC_PAGE_SIZE
+            )
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < RPC_PAGE_SIZE:
+                response.data = rows
+                return response
+
+    def get_user_challenge_rank(self, challenge_id: str, user_id: str) -> Dict:
+        """Get user's rank in a specific challenge"""
+        return self.rpc(
+            'get_user_challenge_rank',
+            {
+                'challenge_id_param': challenge_id,
+                'user_id_param': user_id
+            }
+        )
+
+    def update_score(self, challenge_id: str, user_id: str, score: int) -> Dict:
+        """Update or insert a user's score"""
+        data = {
+            'challenge_id': challenge_id,
+            'user_id': user_id,
+            'score': score,
+        }
+        return self.insert('score_history', data)
+
+    def get_user_scores(self, user_id: str) -> Dict:
+        """Get all scores for a specific user"""
+        return self.select(
+            'score_history',
+            '*',
+            {'user_id': user_id}
+        )
+
+    def get_challenge_scores(self, challenge_id: str) -> Dict:
+        """Get all scores for a specific challenge"""
+        return self.select(
+            'score_history',
+            '*',
+            {'challenge_id': challenge_id}
+        )
+
+    def delete_scores_after_date(self, user_id: str, date: str) -> Dict:
+        """Delete scores for a user after a specific date"""
+        return self.delete(
+            'score_history',
+            {
+                'user_id': user_id,
+                'last_updated': {'gt': date}
+            }
+        )
+
+    def rollback_scores(self, user_ids: List[str], after: str, challenge_id: Optional[str] = None) -> Dict:
+        """Delete several users' scores after a date in one call; rows removed and score lost per user and challenge"""
+        return self.rpc(
+            'rollback_scores',
+            {
+                'user_ids': [str(user_id) for user_id in user_ids],
+                'after': after,
+                'challenge_id_param': challenge_id
+            }
+        )
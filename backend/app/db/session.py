@@ -1,13 +1,116 @@
 # app/db/session.py
 
-from sqlalchemy import create_engine
+from typing import AsyncIterator
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.config import settings
 from app.db.base_class import Base  # Import Base if necessary
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"  # Use SQLite for simplicity
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Async driver used for each backend named in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer; NORMAL sync is durable under WAL except on power loss.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+    "cache_size": -64000,  # KiB, i.e. 64 MB of page cache
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,
+}
+
+def get_async_url(url: str) -> URL:
+    """Swap the sync driver in a database URL for its async counterpart"""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername)
+
+def _is_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return _is_sqlite(url) and url.database in (None, "", ":memory:")
+
+def _engine_options(url: URL, is_async: bool) -> dict:
+    """Pool and driver options for the backend behind ``url``"""
+    options = {
+        "echo": settings.DB_ECHO,
+        "query_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            # In-memory databases live in a single connection; pool sizing does not apply
+            return options
+        if is_async:
+            # aiosqlite defaults to NullPool, which would reopen the file and
+            # rerun the pragmas on every checkout
+            options["poolclass"] = AsyncAdaptedQueuePool
+    else:
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = settings.DB_POOL_RECYCLE
+        if is_async and url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            }
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Create the sync engine, used by create_all and the SQL storage backend"""
+    parsed = make_url(url)
+    sync_engine = create_engine(parsed, **_engine_options(parsed, is_async=False))
+    if _is_sqlite(parsed) and not _is_memory_sqlite(parsed):
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+    return sync_engine
+
+def build_async_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Create the async engine handed out to request handlers through get_db"""
+    parsed = get_async_url(url)
+    engine = create_async_engine(parsed, **_engine_options(parsed, is_async=True))
+    if _is_sqlite(parsed) and not _is_memory_sqlite(parsed):
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+engine = build_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = build_async_engine()
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding one session per request"""
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
@@ -0,0 +1,387 @@
+import enum
+import uuid
+import logging
+from datetime import datetime, date
+from decimal import Decimal
+from functools import wraps
+from typing import Optional, Dict, Any, List, Union
+
+from fastapi import HTTPException
+from sqlalchemy import Table, select, insert, update, delete, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.types import DateTime, Uuid
+
+from .base import Base  # Registers every model on Base.metadata
+from .client_base import LeaderboardQueriesMixin
+from .session import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+# Same operator names as the Supabase backend's filters
+FILTER_OPERATORS = {
+    'eq': lambda column, value: column == value,
+    'neq': lambda column, value: column != value,
+    'gt': lambda column, value: column > value,
+    'gte': lambda column, value: column >= value,
+    'lt': lambda column, value: column < value,
+    'lte': lambda column, value: column <= value,
+    'in': lambda column, values: column.in_(values),
+}
+
+def handle_sql_errors(func):
+    """Decorator to turn storage errors into HTTP errors, like the Supabase backend does"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"SQL error in {func.__name__}: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database operation failed: {str(e)}"
+            )
+    return wrapper
+
+class SQLResponse:
+    """Result of a query, shaped like postgrest's ``APIResponse``"""
+
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+    def __repr__(self) -> str:
+        return f"SQLResponse(data={self.data!r}, count={self.count!r})"
+
+class SQLClient(LeaderboardQueriesMixin):
+    """Storage backend with the ``SupabaseClient`` surface, running on SQLAlchemy.
+
+    Rows go in and come out as plain dicts with JSON-friendly values (UUIDs and
+    datetimes as strings), so services work unchanged against either backend.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None):
+        self.engine = engine or default_engine
+        # Read-only functions build a SELECT, so callers can page through the result
+        self._rpc_queries = {
+            'get_global_leaderboard': self._rpc_get_global_leaderboard,
+            'get_challenge_leaderboard': self._rpc_get_challenge_leaderboard,
+            'get_user_challenge_rank': self._rpc_get_user_challenge_rank,
+        }
+        self._rpc_functions = {
+            'increment_achievement_counters': self._rpc_increment_achievement_counters,
+            'rollback_scores': self._rpc_rollback_scores,
+        }
+
+    def create_tables(self) -> None:
+        """Create all mapped tables and their indexes"""
+        Base.metadata.create_all(bind=self.engine)
+
+    @staticmethod
+    def _table(name: str) -> Table:
+        try:
+            return Base.metadata.tables[name]
+        except KeyError:
+            raise ValueError(f"Unknown table: {name}")
+
+    @staticmethod
+    def _coerce(column, value: Any) -> Any:
+        """Convert API-shaped values (strings) into what the column type expects"""
+        if isinstance(value, str):
+            if isinstance(column.type, Uuid):
+                return uuid.UUID(value)
+            if isinstance(column.type, DateTime):
+                return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return value
+
+    @staticmethod
+    def _serialize(value: Any) -> Any:
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return int(value) if value == value.to_integral_value() else float(value)
+        if isinstance(value, enum.Enum):
+            return value.value
+        return value
+
+    def _rows(self, result) -> List[Dict[str, Any]]:
+        return [
+            {key: self._serialize(value) for key, value in row._mapping.items()}
+            for row in result
+        ]
+
+    def _columns(self, table: Table, columns: str) -> list:
+        if columns.strip() == "*":
+            return [table]
+        return [table.c[name.strip()] for name in columns.split(",")]
+
+    def _values(self, table: Table, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: self._coerce(table.c[key], value) for key, value in data.items()}
+
+    def _conditions(self, table: Table, filters: Optional[Dict[str, Any]]) -> list:
+        """Equality and operator filters, see FILTER_OPERATORS"""
+        conditions = []
+        for key, value in (filters or {}).items():
+            column = table.c[key]
+            if not isinstance(value, dict):
+                value = {'eq': value}
+            for operator, operand in value.items():
+                if operator not in FILTER_OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                if operator == 'in':
+                    operand = [self._coerce(column, item) for item in operand]
+                else:
+                    operand = self._coerce(column, operand)
+                conditions.append(FILTER_OPERATORS[operator](column, operand))
+        return conditions
+
+    @handle_sql_errors
+    def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None
+    ) -> SQLResponse:
+        """Select data from a table, optionally ordered by a column and limited"""
+        sql_table = self._table(table)
+        query = select(*self._columns(sql_table, columns)).where(*self._conditions(sql_table, filters))
+
+        if order:
+            query = query.order_by(sql_table.c[order].desc() if desc else sql_table.c[order])
+        if limit is not None:
+            query = query.limit(limit)
+
+        with self.engine.connect() as conn:
+            return SQLResponse(self._rows(conn.execute(query)))
+
+    @handle_sql_errors
+    def insert(
+        self,
+        table: str,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]]
+    ) -> SQLResponse:
+        """Insert one row, or a list of rows in a single statement"""
+        sql_table = self._table(table)
+        rows = data if isinstance(data, list) else [data]
+        if not rows:
+            return SQLResponse([])
+
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                insert(sql_table).returning(sql_table),
+                [self._values(sql_table, row) for row in rows]
+            )
+            return SQLResponse(self._rows(result))
+
+    def _dialect_insert(self, table: Table):
+        """INSERT with the ON CONFLICT clauses of the engine's dialect"""
+        dialect = self.engine.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            raise ValueError(f"ON CONFLICT is not supported on {dialect}")
+        return dialect_insert(table)
+
+    @handle_sql_errors
+    def insert_ignore(
+        self,
+        table: str,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        on_conflict: Optional[str] = None
+    ) -> SQLResponse:
+        """Insert rows, skipping any that conflict with an existing unique key; returns the rows inserted"""
+        sql_table = self._table(table)
+        rows = data if isinstance(data, list) else [data]
+        if not rows:
+            return SQLResponse([])
+
+        index_elements = [name.strip() for name in on_conflict.split(",")] if on_conflict else None
+        query = self._dialect_insert(sql_table).on_conflict_do_nothing(index_elements=index_elements)
+        with self.engine.begin() as conn:
+            result = conn.execute(query.returning(sql_table), [self._values(sql_table, row) for row in rows])
+            return SQLResponse(self._rows(result))
+
+    @handle_sql_errors
+    def upsert(
+        self,
+        table: str,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]]
+    ) -> SQLResponse:
+        """Insert rows, updating those whose primary key already exists, in a single statement"""
+        sql_table = self._table(table)
+        rows = data if isinstance(data, list) else [data]
+        if not rows:
+            return SQLResponse([])
+
+        query = self._dialect_insert(sql_table)
+        keys = [column.name for column in sql_table.primary_key.columns]
+        query = query.on_conflict_do_update(
+            index_elements=keys,
+            set_={name: query.excluded[name] for name in rows[0] if name not in keys}
+        ).returning(sql_table)
+
+        with self.engine.begin() as conn:
+            result = conn.execute(query, [self._values(sql_table, row) for row in rows])
+            return SQLResponse(self._rows(result))
+
+    @handle_sql_errors
+    def update(
+        self,
+        table: str,
+        data: Dict[str, Any],
+        filters: Dict[str, Any]
+    ) -> SQLResponse:
+        """Update data in the rows matching equality or operator filters"""
+        sql_table = self._table(table)
+        query = (
+            update(sql_table)
+            .where(*self._conditions(sql_table, filters))
+            .values(**self._values(sql_table, data))
+            .returning(sql_table)
+        )
+
+        with self.engine.begin() as conn:
+            return SQLResponse(self._rows(conn.execute(query)))
+
+    @handle_sql_errors
+    def delete(
+        self,
+        table: str,
+        filters: Dict[str, Any]
+    ) -> SQLResponse:
+        """Delete the rows matching equality or operator filters"""
+        sql_table = self._table(table)
+        query = delete(sql_table).where(*self._conditions(sql_table, filters)).returning(sql_table)
+
+        with self.engine.begin() as conn:
+            return SQLResponse(self._rows(conn.execute(query)))
+
+    @handle_sql_errors
+    def rpc(
+        self,
+        function_name: str,
+        params: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> SQLResponse:
+        """Call one of the Postgres functions from db/supabase.sql, implemented in Python; optionally one page of its rows"""
+        if function_name in self._rpc_queries:
+            query = self._rpc_queries[function_name](**(params or {}))
+            if offset:
+                query = query.offset(offset)
+            if limit is not None:
+                query = query.limit(limit)
+            with self.engine.connect() as conn:
+                return SQLResponse(self._rows(conn.execute(query)))
+        if function_name not in self._rpc_functions:
+            raise ValueError(f"Unknown function: {function_name}")
+
+        with self.engine.begin() as conn:
+            return SQLResponse(self._rows(self._rpc_functions[function_name](conn, **(params or {}))))
+
+    # Postgres function equivalents
+
+    def _latest_challenge_scores(self, challenge_id: str):
+        """Latest score per user for a challenge, like the DISTINCT ON in get_challenge_leaderboard"""
+        scores = self._table('score_history')
+        ranked = (
+            select(
+                scores.c.user_id,
+                scores.c.score,
+                scores.c.last_updated,
+                func.row_number().over(
+                    partition_by=scores.c.user_id,
+                    order_by=scores.c.last_updated.desc()
+                ).label('recency')
+            )
+            .where(scores.c.challenge_id == challenge_id)
+            .subquery()
+        )
+        return (
+            select(ranked.c.user_id, ranked.c.score, ranked.c.last_updated)
+            .where(ranked.c.recency == 1)
+            .subquery()
+        )
+
+    def _rpc_get_global_leaderboard(self):
+        users = self._table('users')
+        scores = self._table('score_history')
+        total_score = func.coalesce(func.sum(scores.c.score), 0)
+        query = (
+            select(
+                users.c.username,
+                total_score.label('score'),
+                func.max(scores.c.last_updated).label('last_updated')
+            )
+            .select_from(users.outerjoin(scores, users.c.id == scores.c.user_id))
+            .group_by(users.c.username)
+            .order_by(total_score.desc())
+        )
+        return query
+
+    def _rpc_get_challenge_leaderboard(self, challenge_id_param: str):
+        users = self._table('users')
+        latest = self._latest_challenge_scores(challenge_id_param)
+        query = (
+            select(latest.c.user_id, users.c.username, latest.c.score, latest.c.last_updated)
+            .select_from(latest.join(users, users.c.id == latest.c.user_id))
+            # user_id breaks ties, so pages of the ranking never overlap
+            .order_by(latest.c.score.desc(), latest.c.user_id)
+        )
+        return query
+
+    def _rpc_get_user_challenge_rank(self, challenge_id_param: str, user_id_param: str):
+        scores = self._table('score_history')
+        latest = self._latest_challenge_scores(challenge_id_param)
+        ranked = select(
+            latest.c.user_id,
+            func.rank().over(order_by=latest.c.score.desc()).label('rank')
+        ).subquery()
+        return select(ranked.c.rank).where(
+            ranked.c.user_id == self._coerce(scores.c.user_id, user_id_param)
+        )
+
+    def _rpc_increment_achievement_counters(self, conn, counters: List[Dict[str, Any]]):
+        table = self._table('achievement_counters')
+        query = self._dialect_insert(table)
+        query = query.on_conflict_do_update(
+            index_elements=['user_id', 'name'],
+            set_={'value': table.c.value + query.excluded.value, 'updated_at': func.now()}
+        ).returning(table.c.user_id, table.c.name, table.c.value)
+        return conn.execute(query, [self._values(table, row) for row in counters])
+
+    def _rpc_rollback_scores(
+        self,
+        conn,
+        user_ids: List[str],
+        after: str,
+        challenge_id_param: Optional[str] = None
+    ):
+        scores = self._table('score_history')
+        conditions = [
+            scores.c.user_id.in_([self._coerce(scores.c.user_id, user_id) for user_id in user_ids]),
+            scores.c.last_updated > self._coerce(scores.c.last_updated, after),
+        ]
+        if challenge_id_param is not None:
+            conditions.append(scores.c.challenge_id == challenge_id_param)
+        # Summed before the delete, in the same transaction, as the Postgres function groups its RETURNING rows
+        removed = conn.execute(
+            select(
+                scores.c.user_id,
+                scores.c.challenge_id,
+                func.count().label('removed_rows'),
+                func.sum(scores.c.score).label('removed_score')
+            )
+            .where(*conditions)
+            .group_by(scores.c.user_id, scores.c.challenge_id)
+        ).all()
+        conn.execute(delete(scores).where(*conditions))
+        return removed
@@ -1,9 +1,10 @@
 from supabase import create_client, Client
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from ..core.config import settings
 import logging
 from functools import wraps
 from fastapi import HTTPException
+from .client_base import LeaderboardQueriesMixin
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +22,31 @@ def handle_supabase_errors(func):
             )
     return wrapper
 
-class SupabaseClient:
+# Filter values may be a plain value (equality) or a dict of operator -> value,
+# e.g. {'last_updated': {'gte': start, 'lt': end}}
+FILTER_OPERATORS = {
+    'eq': 'eq',
+    'neq': 'neq',
+    'gt': 'gt',
+    'gte': 'gte',
+    'lt': 'lt',
+    'lte': 'lte',
+    'in': 'in_',
+}
+
+def apply_filters(query, filters: Optional[Dict[str, Any]]):
+    """Apply equality and operator filters to a postgrest query"""
+    for key, value in (filters or {}).items():
+        if isinstance(value, dict):
+            for operator, operand in value.items():
+                if operator not in FILTER_OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                query = getattr(query, FILTER_OPERATORS[operator])(key, operand)
+        else:
+            query = query.eq(key, value)
+    return query
+
+class SupabaseClient(LeaderboardQueriesMixin):
     _instance = None
     _client: Optional[Client] = None
 
@@ -63,14 +88,18 @@ class SupabaseClient:
         self,
         table: str,
         columns: str = "*",
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None
     ) -> Dict:
-        """Select data from a table"""
-        query = self.client.from_(table).select(columns)
+        """Select data from a table, optionally ordered by a column and limited"""
+        query = apply_filters(self.client.from_(table).select(columns), filters)
 
-        if filters:
-            for key, value in filters.items():
-                query = query.eq(key, value)
+        if order:
+            query = query.order(order, desc=desc)
+        if limit is not None:
+            query = query.limit(limit)
 
         return query.execute()
 
@@ -78,11 +107,30 @@ class SupabaseClient:
     def insert(
         self,
         table: str,
-        data: Dict[str, Any]
+        data: Union[Dict[str, Any], List[Dict[str, Any]]]
     ) -> Dict:
-        """Insert data into a table"""
+        """Insert one row, or a list of rows in a single request"""
         return self.client.from_(table).insert(data).execute()
 
+    @handle_supabase_errors
+    def insert_ignore(
+        self,
+        table: str,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        on_conflict: Optional[str] = None
+    ) -> Dict:
+        """Insert rows, skipping those that hit an existing unique key (``on_conflict`` if not the primary key)"""
+        return self.client.from_(table).upsert(data, on_conflict=on_conflict or "", ignore_duplicates=True).execute()
+
+    @handle_supabase_errors
+    def upsert(
+        self,
+        table: str,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]]
+    ) -> Dict:
+        """Insert rows, updating those whose primary key already exists, in a single request"""
+        return self.client.from_(table).upsert(data).execute()
+
     @handle_supabase_errors
     def update(
         self,
@@ -90,13 +138,8 @@ class SupabaseClient:
         data: Dict[str, Any],
         filters: Dict[str, Any]
     ) -> Dict:
-        """Update data in a table"""
-        query = self.client.from_(table).update(data)
-
-        for key, value in filters.items():
-            query = query.eq(key, value)
-
-        return query.execute()
+        """Update data in the rows matching equality or operator filters"""
+        return apply_filters(self.client.from_(table).update(data), filters).execute()
 
     @handle_supabase_errors
     def delete(
@@ -104,79 +147,26 @@ class SupabaseClient:
         table: str,
         filters: Dict[str, Any]
     ) -> Dict:
-        """Delete data from a table"""
-        query = self.client.from_(table).delete()
-
-        for key, value in filters.items():
-            query = query.eq(key, value)
-
-        return query.execute()
+        """Delete the rows matching equality or operator filters"""
+        return apply_filters(self.client.from_(table).delete(), filters).execute()
 
     @handle_supabase_errors
     def rpc(
         self,
         function_name: str,
-        params: Optional[Dict[str, Any]] = None
+        params: Optional[Dict[str, Any]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
     ) -> Dict:
-        """Call a Postgres function"""
-        return self.client.rpc(function_name, params or {}).execute()
-
-    # Leaderboard specific methods
-    def get_global_leaderboard(self) -> Dict:
-        """Get global leaderboard data"""
-        return self.rpc('get_global_leaderboard')
-
-    def get_challenge_leaderboard(self, challenge_id: str) -> Dict:
-        """Get challenge-specific leaderboard data"""
-        return self.rpc(
-            'get_challenge_leaderboard',
-            {'challenge_id_param': challenge_id}
-        )
-
-    def get_user_challenge_rank(self, challenge_id: str, user_id: str) -> Dict:
-        """Get user's rank in a specific challenge"""
-        return self.rpc(
-            'get_user_challenge_rank',
-            {
-                'challenge_id_param': challenge_id,
-                'user_id_param': user_id
-            }
-        )
-
-    def update_score(self, challenge_id: str, user_id: str, score: int) -> Dict:
-        """Update or insert a user's score"""
-        data = {
-            'challenge_id': challenge_id,
-            'user_id': user_id,
-            'score': score,
-        }
-        return self.insert('score_history', data)
-
-    def get_user_scores(self, user_id: str) -> Dict:
-        """Get all scores for a specific user"""
-        return self.select(
-            'score_history',
-            '*',
-            {'user_id': user_id}
-        )
-
-    def get_challenge_scores(self, challenge_id: str) -> Dict:
-        """Get all scores for a specific challenge"""
-        return self.select(
-            'score_history',
-            '*',
-            {'challenge_id': challenge_id}
-        )
-
-    def delete_scores_after_date(self, user_id: str, date: str) -> Dict:
-        """Delete scores for a user after a specific date"""
-        return self.delete(
-            'score_history',
-            {
-                'user_id': user_id,
-                'last_updated': {'gt': date}
-            }
-        )
-
-# Create a singleton instance
-supabase = SupabaseClient()
+        """Call a Postgres function; optionally one page of the rows it returns"""
+        query = self.client.rpc(function_name, params or {})
+        if limit is not None:
+            query = query.range(offset, offset + limit - 1)
+        return query.execute()
+
+# Create a singleton instance for the configured backend
+if settings.DATABASE_BACKEND == "sql":
+    from .sql_client import SQLClient
+    supabase = SQLClient()
+else:
+    supabase = SupabaseClient()
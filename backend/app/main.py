@@ -1,8 +1,18 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
 from app.api.api import api_router
-from app.db.session import engine
+from app.db.session import engine, async_engine
 from app.db.base import Base  # This import registers all models
+from app.core.admission import AdmissionControlMiddleware
+from app.core.config import settings
+from app.services.achievement_engine import achievement_engine
+from app.services.ai_challenge_generator import ai_challenge_generator
+from app.services.chat_service import chat_service
+from app.services.enrollment_admission import enrollment_admission
+from app.services.github_service import github_provisioner
+from app.services.leaderboard_snapshots import leaderboard_snapshots
+from app.services.lifecycle_scheduler import lifecycle_scheduler
+from app.services.replay_store import replay_store
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -10,6 +20,55 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(title="AI Hacking League Backend")
 
 app.include_router(api_router)
+app.add_middleware(AdmissionControlMiddleware, routes=app.routes)
+
+@app.on_event("startup")
+async def start_lifecycle_scheduler():
+    if settings.SCHEDULER_ENABLED:
+        lifecycle_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_lifecycle_scheduler():
+    await lifecycle_scheduler.stop()
+
+@app.on_event("startup")
+async def start_replay_sweeper():
+    replay_store.start()
+
+@app.on_event("shutdown")
+async def stop_replay_sweeper():
+    await replay_store.stop()
+
+@app.on_event("startup")
+async def start_leaderboard_snapshots():
+    leaderboard_snapshots.start()
+
+@app.on_event("shutdown")
+async def stop_leaderboard_snapshots():
+    await leaderboard_snapshots.stop()
+
+@app.on_event("shutdown")
+async def flush_chat_messages():
+    await chat_service.close()
+
+@app.on_event("shutdown")
+async def flush_enrollments():
+    await enrollment_admission.close()
+    # Admissions flushed above publish their events; let them finish
+    await achievement_engine.drain()
+
+@app.on_event("shutdown")
+async def cancel_ai_generation_jobs():
+    await ai_challenge_generator.close()
+
+@app.on_event("shutdown")
+async def close_github_client():
+    await github_provisioner.client.close()
+
+@app.on_event("shutdown")
+async def close_database_pools():
+    await async_engine.dispose()
+    engine.dispose()
 
 @app.post("/token")
 async def token_redirect(request: Request):
@@ -0,0 +1,23 @@
+# app/models/achievement.py
+
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class UserAchievement(Base):
+    """An achievement rule a user has met; the primary key makes each award once-only"""
+    __tablename__ = "user_achievements"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    code = Column(String, primary_key=True)
+    awarded_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AchievementCounter(Base):
+    """Running per-user tally the achievement rules read, e.g. challenges scored"""
+    __tablename__ = "achievement_counters"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
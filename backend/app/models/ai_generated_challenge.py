@@ -0,0 +1,30 @@
+# app/models/ai_generated_challenge.py
+
+from sqlalchemy import Column, String, JSON, DateTime, Enum
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.db.base_class import Base  # Import Base directly from base_class.py
+from app.models.challenge import DifficultyEnum
+
+class AIGeneratedChallenge(Base):
+    __tablename__ = "ai_generated_challenges"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    title = Column(String, nullable=False)
+    description = Column(String, nullable=False)
+    difficulty = Column(Enum(DifficultyEnum), nullable=False)
+    ai_prompt = Column(String, nullable=False)
+    # None for challenges written by hand
+    model = Column(String, nullable=True)
+    # MinHash signature of the description, for near-duplicate detection
+    signature = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class AIPromptCache(Base):
+    """Which challenge a (normalized prompt, difficulty, model) produced, so it is generated once"""
+    __tablename__ = "ai_prompt_cache"
+
+    prompt_hash = Column(String, primary_key=True)
+    challenge_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
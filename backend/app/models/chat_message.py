@@ -0,0 +1,22 @@
+# app/models/chat_message.py
+
+from sqlalchemy import Column, String, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    room_type = Column(String, nullable=False)
+    room_id = Column(UUID(as_uuid=True), nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    content = Column(String, nullable=False)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # History pages walk a room backwards in time
+        Index("ix_chat_messages_room_timestamp", "room_type", "room_id", timestamp.desc()),
+    )
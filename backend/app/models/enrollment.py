@@ -0,0 +1,26 @@
+# app/models/enrollment.py
+
+from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class Enrollment(Base):
+    __tablename__ = "enrollments"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    challenge_id = Column(UUID(as_uuid=True), ForeignKey("challenges.id"), nullable=False)
+    # None for solo enrollees until they join or are placed in a team
+    team_id = Column(UUID(as_uuid=True), ForeignKey("teams.id"), nullable=True)
+    status = Column(String, nullable=False, default="enrolled")
+    score = Column(Float, nullable=True)
+    submitted_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_enrollments_challenge_user", "challenge_id", "user_id", unique=True),
+        Index("ix_enrollments_challenge_team", "challenge_id", "team_id"),
+    )
@@ -0,0 +1,27 @@
+# app/models/lifecycle.py
+
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+# Values of ChallengeLifecycleEvent.event
+OPEN_ENROLLMENTS = "open_enrollments"
+FREEZE_SCORES = "freeze_scores"
+FINAL_RANKING = "final_ranking"
+
+class SchedulerLease(Base):
+    """Which worker currently runs a singleton background job, and until when"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+class ChallengeLifecycleEvent(Base):
+    """A lifecycle transition that has fired; the primary key makes each fire at most once"""
+    __tablename__ = "challenge_lifecycle_events"
+
+    challenge_id = Column(UUID(as_uuid=True), primary_key=True)
+    event = Column(String, primary_key=True)
+    fired_at = Column(DateTime(timezone=True), server_default=func.now())
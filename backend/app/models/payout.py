@@ -0,0 +1,22 @@
+# app/models/payout.py
+
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, JSON
+from sqlalchemy.sql import func
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class PayoutRun(Base):
+    """Checkpoint of a challenge's prize payout, so an interrupted run can resume"""
+    __tablename__ = "payout_runs"
+
+    challenge_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default="running")
+    winners = Column(Integer, nullable=False, default=0)
+    # Number of winners, in payout order, whose credits are committed
+    posted = Column(Integer, nullable=False, default=0)
+    total_amount = Column(BigInteger, nullable=False, default=0)
+    participants = Column(Integer, nullable=False, default=0)
+    # The schedule and the [user_id, amount] list computed by the first run; reruns pay exactly these
+    schedule = Column(JSON, nullable=False)
+    payouts = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,17 @@
+# app/models/refresh_token.py
+
+from sqlalchemy import Column, String, DateTime, Boolean
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class RefreshTokenFamily(Base):
+    """A sign-in's chain of rotating refresh tokens; only the latest one (`current_jti`) is valid"""
+    __tablename__ = "refresh_token_families"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    current_jti = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
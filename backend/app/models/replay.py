@@ -0,0 +1,23 @@
+# app/models/replay.py
+
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class Replay(Base):
+    __tablename__ = "replays"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    challenge_id = Column(UUID(as_uuid=True), nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    # Replay bytes live in the blob store; this row only describes them
+    size = Column(BigInteger, nullable=False)
+    chunk_count = Column(Integer, nullable=False)
+    content_hash = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_replays_challenge_user", "challenge_id", "user_id"),
+    )
@@ -0,0 +1,24 @@
+# app/models/score_history.py
+
+from sqlalchemy import Column, String, Integer, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class ScoreHistory(Base):
+    __tablename__ = "score_history"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    challenge_id = Column(String, nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    score = Column(Integer, nullable=False)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Per-user lookups done by update_score and get_user_challenge_rank
+        Index("ix_score_history_challenge_user", "challenge_id", "user_id"),
+        # Challenge leaderboards read scores in descending order
+        Index("ix_score_history_challenge_score", "challenge_id", score.desc()),
+        # Global leaderboard aggregation and date-based deletes
+        Index("ix_score_history_user_updated", "user_id", "last_updated"),
+    )
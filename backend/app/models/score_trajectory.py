@@ -0,0 +1,45 @@
+# app/models/score_trajectory.py
+
+from sqlalchemy import Column, String, Integer, BigInteger, JSON, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class ScorePoint(Base):
+    """One accepted score, appended as it happens; compacted into chunks later"""
+    __tablename__ = "score_points"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    challenge_id = Column(String, nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    score = Column(Integer, nullable=False)
+    # Epoch milliseconds
+    recorded_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_score_points_challenge_user_recorded", "challenge_id", "user_id", "recorded_at"),
+    )
+
+class ScoreTrajectoryChunk(Base):
+    """A run of a user's scores in a challenge, stored as columns.
+
+    ``offsets`` are milliseconds after ``first_at`` and ``scores`` the scores,
+    one entry per point. ``preview_*`` is the same run downsampled, read
+    instead of the full columns when a history is too long to load whole.
+    """
+    __tablename__ = "score_trajectory_chunks"
+
+    challenge_id = Column(String, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    chunk = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+    first_at = Column(BigInteger, nullable=False)
+    last_at = Column(BigInteger, nullable=False)
+    # With last_at, the position of the last point, so readers can skip points not yet deleted
+    last_point_id = Column(String, nullable=False)
+    offsets = Column(JSON, nullable=False)
+    scores = Column(JSON, nullable=False)
+    preview_offsets = Column(JSON, nullable=False)
+    preview_scores = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
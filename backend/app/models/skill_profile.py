@@ -0,0 +1,16 @@
+# app/models/skill_profile.py
+
+from sqlalchemy import Column, JSON, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class SkillProfile(Base):
+    __tablename__ = "skill_profiles"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), unique=True, index=True, nullable=False)
+    # Skill name -> level, e.g. {"python": 8, "javascript": 7}
+    skills = Column(JSON, nullable=False, default=dict)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
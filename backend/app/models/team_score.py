@@ -0,0 +1,28 @@
+# app/models/team_score.py
+
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+class TeamMemberScore(Base):
+    """A team member's current score in a challenge, as last accepted"""
+    __tablename__ = "team_member_scores"
+
+    challenge_id = Column(String, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    team_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    score = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class TeamScore(Base):
+    """A team's aggregates in a challenge, enough for every supported aggregation"""
+    __tablename__ = "team_scores"
+
+    challenge_id = Column(String, primary_key=True)
+    team_id = Column(UUID(as_uuid=True), primary_key=True)
+    members = Column(Integer, nullable=False)
+    total = Column(BigInteger, nullable=False)
+    # Best member scores, highest first, up to TEAM_LEADERBOARD_MAX_K of them
+    top_scores = Column(JSON, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,45 @@
+# app/models/wallet.py
+
+from sqlalchemy import Column, String, BigInteger, Integer, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.db.base_class import Base  # Import Base directly from base_class.py
+
+# SQLite only autoincrements INTEGER PRIMARY KEY columns
+BigIntegerKey = BigInteger().with_variant(Integer, "sqlite")
+
+class Wallet(Base):
+    __tablename__ = "wallets"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), unique=True, index=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class WalletTransaction(Base):
+    """Append-only ledger entry. Amounts are positive integers in minor units; `type` gives the sign."""
+    __tablename__ = "wallet_transactions"
+
+    seq = Column(BigIntegerKey, primary_key=True, autoincrement=True)
+    id = Column(UUID(as_uuid=True), unique=True, nullable=False, default=uuid.uuid4)
+    wallet_id = Column(UUID(as_uuid=True), nullable=False)
+    amount = Column(BigInteger, nullable=False)
+    type = Column(String, nullable=False)
+    # Idempotency key: a transaction with a reference is only ever posted once
+    reference = Column(String, unique=True, nullable=True)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Balance reads fetch the transactions after a wallet's latest snapshot
+        Index("ix_wallet_transactions_wallet_seq", "wallet_id", "seq"),
+    )
+
+class WalletSnapshot(Base):
+    """Balance of a wallet including every transaction up to and including `seq`"""
+    __tablename__ = "wallet_snapshots"
+
+    wallet_id = Column(UUID(as_uuid=True), primary_key=True)
+    seq = Column(BigInteger, primary_key=True)
+    balance = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
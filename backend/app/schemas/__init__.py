@@ -1,10 +1,10 @@
 from .user import UserBase, UserCreate, UserOut
-from .challenge import ChallengeBase, ChallengeCreate, ChallengeOut, DifficultyEnum
-from .team import TeamBase, TeamCreate, TeamOut
-from .enrollment import EnrollmentBase, EnrollmentCreate, EnrollmentOut
-from .achievement import AchievementBase, AchievementCreate, AchievementOut
-from .chat import ChatMessageBase, ChatMessageCreate, ChatMessageOut
+from .challenge import ChallengeBase, ChallengeCreate, ChallengeOut, ChallengePage, DifficultyEnum
+from .team import TeamBase, TeamCreate, TeamOut, FormedTeam, TeamFormationResult
+from .enrollment import EnrollmentBase, EnrollmentCreate, EnrollmentOut, AdmissionStatus
+from .achievement import AchievementBase, AchievementCreate, AchievementOut, AchievementRuleOut, UserAchievementOut
+from .chat import ChatMessageBase, ChatMessageCreate, ChatMessageOut, ChatMessagePage, ChatRoomType
 from .replay import ReplayBase, ReplayCreate, ReplayOut
-from .wallet import WalletBase, WalletCreate, WalletOut, TransactionBase, TransactionCreate, TransactionOut
-from .skill_profile import SkillProfileBase, SkillProfileCreate, SkillProfileOut
+from .wallet import WalletBase, WalletCreate, WalletOut, TransactionBase, TransactionCreate, TransactionOut, TransactionType
+from .skill_profile import SkillProfileBase, SkillProfileCreate, SkillProfileOut, SimilarProfile
 from .ai_generated_challenge import AIGeneratedChallengeBase, AIGeneratedChallengeCreate, AIGeneratedChallengeOut
\ No newline at end of file
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class AchievementBase(BaseModel):
     name: str
@@ -20,3 +20,16 @@ class AchievementOut(AchievementBase):
 class AchievementUpdate(AchievementBase):
     name: Optional[str] = None
     description: Optional[str] = None
+
+class AchievementRuleOut(BaseModel):
+    code: str
+    name: str
+    description: str
+    # Event types that can trigger the rule
+    events: List[str]
+
+class UserAchievementOut(BaseModel):
+    code: str
+    name: str
+    description: str
+    awarded_at: datetime
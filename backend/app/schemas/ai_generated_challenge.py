@@ -15,7 +15,24 @@ class AIGeneratedChallengeCreate(AIGeneratedChallengeBase):
 
 class AIGeneratedChallengeOut(AIGeneratedChallengeBase):
     id: UUID
+    model: Optional[str] = None
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class AIGenerationRequest(BaseModel):
+    ai_prompt: str
+    difficulty: DifficultyEnum
+
+class AIGenerationJob(BaseModel):
+    id: str
+    # queued, running, done or failed
+    status: str
+    challenge_id: Optional[UUID] = None
+    # Served from the prompt cache without calling the model
+    cached: bool = False
+    # The model's challenge was a near-duplicate; challenge_id is the existing one
+    duplicate: bool = False
+    error: Optional[str] = None
+    created_at: datetime
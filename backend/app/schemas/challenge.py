@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class DifficultyEnum(str, Enum):
@@ -39,3 +39,8 @@ class ChallengeUpdate(ChallengeBase):
     max_participants: Optional[int] = None
     current_participants: Optional[int] = None
     github_repo_url: Optional[str] = None
+
+class ChallengePage(BaseModel):
+    challenges: List[ChallengeOut]
+    # Pass back as `cursor` to fetch the next page; None when there are no more matches
+    next_cursor: Optional[str] = None
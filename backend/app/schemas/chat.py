@@ -1,10 +1,18 @@
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
+from typing import List, Optional
+from enum import Enum
+
+class ChatRoomType(str, Enum):
+    challenge = "challenge"
+    team = "team"
 
 class ChatMessageBase(BaseModel):
     user_id: UUID
     content: str
+    room_type: ChatRoomType
+    room_id: UUID
 
 class ChatMessageCreate(ChatMessageBase):
     pass
@@ -14,4 +22,9 @@ class ChatMessageOut(ChatMessageBase):
     timestamp: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ChatMessagePage(BaseModel):
+    messages: List[ChatMessageOut]
+    # Pass back as `before` to fetch the next (older) page; None when history is exhausted
+    next_cursor: Optional[str] = None
@@ -18,6 +18,13 @@ class EnrollmentOut(EnrollmentBase):
     submitted_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
+    # Place in the queue while status is "waitlisted"
+    waitlist_position: Optional[int] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+class AdmissionStatus(BaseModel):
+    challenge_id: UUID
+    max_participants: Optional[int] = None
+    current_participants: int
+    waitlisted: int
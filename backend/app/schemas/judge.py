@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class CriterionScore(BaseModel):
+    name: str
+    score: Optional[float] = Field(None, ge=0, le=100)
+    feedback: Optional[str] = None
+
+class JudgeEvaluation(BaseModel):
+    """What the judge model is asked to reply with; while streaming, any field may still be missing"""
+    criteria: List[CriterionScore] = []
+    score: Optional[float] = Field(None, ge=0, le=100)
+    summary: Optional[str] = None
+    # False when the reply was cut short or had to be repaired to be read
+    complete: bool = True
@@ -3,6 +3,7 @@ from typing import List, Optional
 from datetime import datetime
 
 class LeaderboardEntry(BaseModel):
+    user_id: Optional[str] = None
     username: str
     score: int
     rank: int
@@ -10,10 +11,13 @@ class LeaderboardEntry(BaseModel):
 
 class GlobalLeaderboard(BaseModel):
     entries: List[LeaderboardEntry]
+    # When the snapshot was taken, for a point-in-time board
+    as_of: Optional[datetime] = None
 
 class ChallengeLeaderboard(BaseModel):
     challenge_id: str
     scores: List[LeaderboardEntry]
+    as_of: Optional[datetime] = None
 
 class LeaderboardResponse(BaseModel):
     success: bool
@@ -30,3 +34,57 @@ class ScoreUpdateResponse(BaseModel):
     message: str
     score: int
     rank: Optional[int]
+
+class ScoreTrajectory(BaseModel):
+    challenge_id: str
+    user_id: str
+    # Accepted scores stored; `timestamps` and `scores` are a downsample of them
+    total_points: int
+    # Epoch milliseconds
+    timestamps: List[int]
+    scores: List[float]
+
+class ScoreRollbackRequest(BaseModel):
+    user_ids: List[str]
+    after: datetime
+    # Only this challenge's scores; all challenges when omitted
+    challenge_id: Optional[str] = None
+
+class RemovedScores(BaseModel):
+    user_id: str
+    challenge_id: str
+    removed_rows: int
+    removed_score: int
+
+class ScoreRollbackResponse(BaseModel):
+    success: bool
+    deleted: int
+    removed: List[RemovedScores]
+
+class TeamBoardEntry(BaseModel):
+    team_id: str
+    name: Optional[str] = None
+    score: float
+    members: int
+    rank: int
+
+class TeamBoard(BaseModel):
+    # None for the global team board
+    challenge_id: Optional[str] = None
+    aggregation: str
+    teams: List[TeamBoardEntry]
+
+class TeamMemberScore(BaseModel):
+    user_id: str
+    score: int
+
+class TeamStanding(BaseModel):
+    challenge_id: str
+    team_id: str
+    name: Optional[str] = None
+    aggregation: str
+    score: float
+    rank: int
+    # Teams ranked in the challenge
+    teams: int
+    members: List[TeamMemberScore]
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+class PayoutTier(BaseModel):
+    """Prize per position for a band of the final ranking.
+
+    A band is either explicit positions (`rank_from`..`rank_to`) or the top
+    `top_percent` of participants. Each position is paid by the first tier
+    that covers it. Amounts are in minor units.
+    """
+    amount: int = Field(..., ge=0)
+    rank_from: Optional[int] = Field(None, ge=1)
+    rank_to: Optional[int] = Field(None, ge=1)
+    top_percent: Optional[float] = Field(None, gt=0, le=100)
+
+    @model_validator(mode="after")
+    def check_band(self):
+        if (self.top_percent is None) == (self.rank_from is None):
+            raise ValueError("Set either rank_from/rank_to or top_percent")
+        if self.rank_from is not None and self.rank_to is not None and self.rank_to < self.rank_from:
+            raise ValueError("rank_to must not be below rank_from")
+        return self
+
+class PayoutSchedule(BaseModel):
+    tiers: List[PayoutTier]
+
+class PayoutResult(BaseModel):
+    challenge_id: str
+    participants: int
+    winners: int
+    total_amount: int
+    posted: int
+    # Position the run continued from when a previous run was interrupted
+    resumed_from: int = 0
+    status: str
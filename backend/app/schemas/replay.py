@@ -5,14 +5,17 @@ from datetime import datetime
 class ReplayBase(BaseModel):
     challenge_id: UUID
     user_id: UUID
-    replay_data: str
 
 class ReplayCreate(ReplayBase):
     pass
 
 class ReplayOut(ReplayBase):
     id: UUID
+    # Size of the uncompressed replay; fetch the bytes from /replays/{id}/data
+    size: int
+    chunk_count: int
+    content_hash: str
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
@@ -13,4 +13,8 @@ class SkillProfileOut(SkillProfileBase):
     id: UUID
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SimilarProfile(BaseModel):
+    user_id: UUID
+    similarity: float
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class TeamBase(BaseModel):
     name: str
@@ -21,3 +21,16 @@ class TeamOut(TeamBase):
 class TeamUpdate(TeamBase):
     name: Optional[str] = None
     description: Optional[str] = None
+
+class FormedTeam(BaseModel):
+    team_id: UUID
+    name: str
+    user_ids: List[UUID]
+    total_skill: float
+
+class TeamFormationResult(BaseModel):
+    challenge_id: UUID
+    enrollees: int
+    # Strongest minus weakest team total skill
+    strength_spread: float
+    teams: List[FormedTeam]
@@ -32,3 +32,11 @@ class UserInDB(UserOut):
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    refresh_token: str
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
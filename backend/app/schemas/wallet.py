@@ -1,34 +1,44 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 from datetime import datetime
 from typing import Optional
+from enum import Enum
+
+# All amounts are integers in minor units (cents), never floats
+
+class TransactionType(str, Enum):
+    credit = "credit"
+    debit = "debit"
 
 class WalletBase(BaseModel):
     user_id: UUID
-    balance: float = 0.0
 
 class WalletCreate(WalletBase):
     pass
 
 class WalletOut(WalletBase):
     id: UUID
+    balance: int = 0
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 class TransactionBase(BaseModel):
     wallet_id: UUID
-    amount: float
-    type: str
+    amount: int = Field(..., gt=0, description="Amount in minor units")
+    type: TransactionType
 
 class TransactionCreate(TransactionBase):
-    pass
+    # Optional idempotency key; posting the same reference twice records one transaction
+    reference: Optional[str] = None
 
 class TransactionOut(TransactionBase):
     id: UUID
+    seq: int
+    reference: Optional[str] = None
     timestamp: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
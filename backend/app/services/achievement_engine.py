@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set
+
+from ..core.config import settings
+from ..db.supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+SCORE_IMPROVED = "score.improved"
+ENROLLMENT_ADMITTED = "enrollment.admitted"
+JUDGE_EVALUATED = "judge.evaluated"
+
+Counters = Dict[str, int]
+
+def _count_score(event: dict) -> Counters:
+    deltas = {'challenges_scored': 1} if event.get('previous') is None else {'improvements': 1}
+    if event.get('rank') == 1:
+        deltas['first_places'] = 1
+    return deltas
+
+def _count_enrollment(event: dict) -> Counters:
+    return {'enrollments': 1}
+
+def _count_submission(event: dict) -> Counters:
+    return {'submissions': 1}
+
+# How much each event type adds to the user's counters
+COUNTER_DELTAS: Dict[str, Callable[[dict], Counters]] = {
+    SCORE_IMPROVED: _count_score,
+    ENROLLMENT_ADMITTED: _count_enrollment,
+    JUDGE_EVALUATED: _count_submission,
+}
+
+class Rule:
+    """An achievement: awarded the first time ``condition(counters, event)`` holds after one of ``events``"""
+
+    def __init__(
+        self,
+        code: str,
+        name: str,
+        description: str,
+        events: List[str],
+        condition: Callable[[Counters, dict], bool]
+    ):
+        self.code = code
+        self.name = name
+        self.description = description
+        self.events = events
+        self.condition = condition
+
+DEFAULT_RULES = [
+    Rule("first_score", "First Blood", "Post a score in any challenge",
+         [SCORE_IMPROVED], lambda c, e: c.get('challenges_scored', 0) >= 1),
+    Rule("five_challenges", "Regular", "Post scores in five challenges",
+         [SCORE_IMPROVED], lambda c, e: c.get('challenges_scored', 0) >= 5),
+    Rule("personal_best", "Never Satisfied", "Beat your own best score ten times",
+         [SCORE_IMPROVED], lambda c, e: c.get('improvements', 0) >= 10),
+    Rule("podium", "Podium Finish", "Reach the top three of a challenge leaderboard",
+         [SCORE_IMPROVED], lambda c, e: e.get('rank') is not None and e['rank'] <= 3),
+    Rule("champion", "Champion", "Reach first place on a challenge leaderboard",
+         [SCORE_IMPROVED], lambda c, e: e.get('rank') == 1),
+    Rule("first_enrollment", "Enlisted", "Enroll in a challenge",
+         [ENROLLMENT_ADMITTED], lambda c, e: c.get('enrollments', 0) >= 1),
+    Rule("ten_enrollments", "Veteran", "Enroll in ten challenges",
+         [ENROLLMENT_ADMITTED], lambda c, e: c.get('enrollments', 0) >= 10),
+    Rule("first_submission", "Reviewed", "Have a submission evaluated by the judge",
+         [JUDGE_EVALUATED], lambda c, e: c.get('submissions', 0) >= 1),
+    Rule("top_marks", "Top Marks", "Get a judge score of 90 or more",
+         [JUDGE_EVALUATED], lambda c, e: (e.get('score') or 0) >= 90),
+]
+
+class AchievementEngine:
+    """Awards achievements as score, enrollment and judge events happen.
+
+    Each event adds to a few per-user counters and evaluates only the rules
+    registered for its type, so an award costs one small write and never a
+    scan of history. Counters are incremented in storage
+    (``increment_achievement_counters``) and the rules are checked against
+    the totals it returns, so events handled by different workers add up
+    rather than overwrite each other. The codes already awarded to recently
+    active users are cached to skip their rules.
+    """
+
+    def __init__(self, rules: Optional[List[Rule]] = None, storage=None, cache_size: int = settings.ACHIEVEMENT_CACHE_USERS):
+        self.rules = {rule.code: rule for rule in (rules if rules is not None else DEFAULT_RULES)}
+        self.rules_by_event: Dict[str, List[Rule]] = defaultdict(list)
+        for rule in self.rules.values():
+            for event_type in rule.events:
+                self.rules_by_event[event_type].append(rule)
+        self.storage = storage or supabase
+        self.cache_size = cache_size
+        self._awarded: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _awarded_codes(self, user_id: str) -> Set[str]:
+        awarded = self._awarded.get(user_id)
+        if awarded is None:
+            response = await asyncio.to_thread(self.storage.select, 'user_achievements', 'code', {'user_id': user_id})
+            # Another event for the user may have loaded it while we waited
+            awarded = self._awarded.setdefault(user_id, {row['code'] for row in (response.data or [])})
+            while len(self._awarded) > self.cache_size:
+                self._awarded.popitem(last=False)
+        self._awarded.move_to_end(user_id)
+        return awarded
+
+    async def emit(self, event_type: str, user_id, **event) -> List[dict]:
+        """Apply one event; returns the achievements it awarded"""
+        user_id = str(user_id)
+        rules = self.rules_by_event.get(event_type, [])
+        deltas = COUNTER_DELTAS[event_type](event) if event_type in COUNTER_DELTAS else {}
+        awarded = await self._awarded_codes(user_id)
+        pending_rules = [rule for rule in rules if rule.code not in awarded]
+
+        counters: Counters = {}
+        if deltas:
+            response = await asyncio.to_thread(
+                self.storage.rpc,
+                'increment_achievement_counters',
+                {'counters': [{'user_id': user_id, 'name': name, 'value': value} for name, value in deltas.items()]}
+            )
+            counters = {row['name']: row['value'] for row in (response.data or [])}
+
+        earned = [rule for rule in pending_rules if rule.condition(counters, event)]
+        if not earned:
+            return []
+        now = datetime.now(timezone.utc).isoformat()
+        awards = [{'user_id': user_id, 'code': rule.code, 'awarded_at': now} for rule in earned]
+        await asyncio.to_thread(self.storage.insert_ignore, 'user_achievements', awards)
+        awarded.update(rule.code for rule in earned)
+
+        for rule in earned:
+            logger.info(f"User {user_id} earned achievement {rule.code}")
+        return [self._describe(award) for award in awards]
+
+    def publish(self, event_type: str, user_id, **event) -> None:
+        """Apply an event in the background, so the caller does not wait on it"""
+        task = asyncio.create_task(self._emit_logged(event_type, user_id, event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        """Wait until every published event has been applied, e.g. on shutdown"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _emit_logged(self, event_type: str, user_id, event: dict) -> None:
+        try:
+            await self.emit(event_type, user_id, **event)
+        except Exception as e:
+            logger.error(f"Failed to process {event_type} event for user {user_id}: {str(e)}")
+
+    def _describe(self, award: dict) -> dict:
+        rule = self.rules[award['code']]
+        return {**award, 'name': rule.name, 'description': rule.description}
+
+    def list_rules(self) -> List[dict]:
+        return [
+            {'code': rule.code, 'name': rule.name, 'description': rule.description, 'events': rule.events}
+            for rule in self.rules.values()
+        ]
+
+    async def user_achievements(self, user_id: str) -> List[dict]:
+        response = await asyncio.to_thread(self.storage.select, 'user_achievements', '*', {'user_id': str(user_id)})
+        return [
+            self._describe(row) for row in sorted(response.data or [], key=lambda row: row['awarded_at'])
+            if row['code'] in self.rules
+        ]
+
+achievement_engine = AchievementEngine()
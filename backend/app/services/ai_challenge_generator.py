@@ -0,0 +1,280 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import openai
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..db.supabase_client import supabase
+from ..schemas.ai_generated_challenge import AIGeneratedChallengeCreate
+from .near_duplicates import MinHashLSH
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# (prompt, difficulty, model) -> {'title': ..., 'description': ...}
+Generate = Callable[[str, str, str], Awaitable[dict]]
+
+_openai_client: Optional[openai.AsyncOpenAI] = None
+
+async def openai_generate(prompt: str, difficulty: str, model: str) -> dict:
+    """Ask the model for one challenge as JSON"""
+    global _openai_client
+    if _openai_client is None:
+        # One client, so its connection pool is shared by every job
+        _openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    response = await _openai_client.chat.completions.create(
+        model=model,
+        response_format={"type": "json_object"},
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    f"You write {difficulty} AI hacking challenges. Reply with a JSON object "
+                    "with a short \"title\" and a self-contained \"description\"."
+                ),
+            },
+            {"role": "user", "content": prompt},
+        ]
+    )
+    generated = json.loads(response.choices[0].message.content)
+    return {'title': str(generated['title']), 'description': str(generated['description'])}
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+def prompt_hash(prompt: str, difficulty: str, model: str) -> str:
+    key = "\0".join((model, difficulty, normalize_prompt(prompt)))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+class AIChallengeGenerator:
+    """Generates challenges from prompts in background jobs, once per prompt and without near-duplicates.
+
+    A job is keyed by the hash of the normalized prompt, the difficulty and
+    the model. A key already in ``ai_prompt_cache`` is answered from it
+    without calling the model, and a second request for a key whose job is
+    still running gets that job. At most ``AI_GENERATION_CONCURRENCY`` model
+    calls run at once; other jobs wait queued.
+
+    Before a challenge is stored, its description's MinHash signature is
+    looked up in an LSH index of every stored challenge. A near-duplicate is
+    not stored: the job (and the prompt's cache entry) points at the existing
+    challenge instead. The index is loaded on first use and picks up rows
+    other workers stored every ``AI_DUPLICATE_INDEX_TTL_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        generate: Optional[Generate] = None,
+        storage=None,
+        model: str = settings.AI_MODEL,
+        concurrency: int = settings.AI_GENERATION_CONCURRENCY,
+        job_history: int = settings.AI_GENERATION_JOB_HISTORY,
+        threshold: float = settings.AI_DUPLICATE_THRESHOLD,
+        index_ttl: float = settings.AI_DUPLICATE_INDEX_TTL_SECONDS
+    ):
+        self.generate = generate or openai_generate
+        self.storage = storage or supabase
+        self.model = model
+        self.concurrency = concurrency
+        self.job_history = job_history
+        self.index_ttl = index_ttl
+        self.index = MinHashLSH(threshold=threshold)
+        self.jobs: "OrderedDict[str, dict]" = OrderedDict()
+        # prompt hash -> id of its queued or running job
+        self._inflight: Dict[str, str] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._index_lock: Optional[asyncio.Lock] = None
+        self._index_loaded_at: Optional[float] = None
+        self._index_seen_until: Optional[datetime] = None
+
+    # Jobs
+
+    def submit(self, prompt: str, difficulty: str) -> dict:
+        """Queue a generation job, or return the running one for the same prompt"""
+        key = prompt_hash(prompt, difficulty, self.model)
+        job_id = self._inflight.get(key)
+        if job_id is not None:
+            return self.jobs[job_id]
+
+        job = {
+            'id': str(uuid.uuid4()),
+            'status': QUEUED,
+            'challenge_id': None,
+            'cached': False,
+            'duplicate': False,
+            'error': None,
+            'created_at': datetime.now(timezone.utc),
+        }
+        self.jobs[job['id']] = job
+        while len(self.jobs) > self.job_history:
+            self.jobs.popitem(last=False)
+        self._inflight[key] = job['id']
+        task = asyncio.create_task(self._run(job, key, prompt, difficulty))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get_job(self, job_id: str) -> dict:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Generation job not found")
+        return job
+
+    async def _run(self, job: dict, key: str, prompt: str, difficulty: str) -> None:
+        try:
+            cached = await asyncio.to_thread(self._cached, key)
+            if cached is not None:
+                job.update(status=DONE, challenge_id=cached, cached=True)
+                return
+
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.concurrency)
+            async with self._slots:
+                job['status'] = RUNNING
+                generated = await self.generate(prompt, difficulty, self.model)
+            challenge, duplicate = await self._store({
+                'title': generated['title'],
+                'description': generated['description'],
+                'difficulty': difficulty,
+                'ai_prompt': prompt,
+                'model': self.model,
+            })
+            await asyncio.to_thread(
+                self.storage.insert_ignore, 'ai_prompt_cache', {'prompt_hash': key, 'challenge_id': challenge['id']}
+            )
+            job.update(status=DONE, challenge_id=challenge['id'], duplicate=duplicate)
+        except Exception as e:
+            logger.error(f"AI challenge generation job {job['id']} failed: {str(e)}")
+            job.update(status=FAILED, error=str(e))
+        finally:
+            self._inflight.pop(key, None)
+
+    def _cached(self, key: str) -> Optional[str]:
+        """The challenge a prompt produced before, if it still exists"""
+        entry = self.storage.select('ai_prompt_cache', 'challenge_id', {'prompt_hash': key})
+        if not entry.data:
+            return None
+        challenge_id = str(entry.data[0]['challenge_id'])
+        if self.storage.select('ai_generated_challenges', 'id', {'id': challenge_id}).data:
+            return challenge_id
+        self.storage.delete('ai_prompt_cache', {'prompt_hash': key})
+        return None
+
+    async def close(self) -> None:
+        """Cancel queued and running jobs, e.g. on shutdown"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # Near-duplicate index
+
+    async def _refresh_index(self) -> None:
+        if self._index_lock is None:
+            self._index_lock = asyncio.Lock()
+        async with self._index_lock:
+            if self._index_loaded_at is not None and time.monotonic() - self._index_loaded_at < self.index_ttl:
+                return
+            rows, seen_until = await asyncio.to_thread(self._load_signatures, self._index_seen_until)
+            for row in rows:
+                self.index.add(str(row['id']), row['signature'])
+            self._index_seen_until = seen_until
+            self._index_loaded_at = time.monotonic()
+
+    def _load_signatures(self, since: Optional[datetime]) -> Tuple[List[dict], datetime]:
+        # Overlap the previous read, in case a row committed late with an earlier timestamp
+        now = datetime.now(timezone.utc)
+        filters = {}
+        if since is not None:
+            filters['created_at'] = {'gte': (since - timedelta(seconds=self.index_ttl)).isoformat()}
+        response = self.storage.select('ai_generated_challenges', 'id,signature', filters)
+        return response.data or [], now
+
+    async def _store(self, challenge: dict) -> Tuple[dict, bool]:
+        """Insert a challenge unless a near-duplicate exists; returns the stored or existing row"""
+        await self._refresh_index()
+        signature = self.index.signature(challenge['description'])
+        while True:
+            match = self.index.nearest(signature)
+            if match is None:
+                break
+            existing = await asyncio.to_thread(self.storage.select, 'ai_generated_challenges', '*', {'id': match[0]})
+            if existing.data:
+                logger.info(f"Generated challenge is a near-duplicate ({match[1]:.2f}) of {match[0]}")
+                return existing.data[0], True
+            # Deleted by another worker
+            self.index.remove(match[0])
+
+        row = {'id': str(uuid.uuid4()), **challenge, 'signature': signature}
+        # Indexed before the insert, so a concurrent job cannot store the same challenge
+        self.index.add(row['id'], signature)
+        try:
+            response = await asyncio.to_thread(self.storage.insert, 'ai_generated_challenges', row)
+        except Exception:
+            self.index.remove(row['id'])
+            raise
+        return response.data[0], False
+
+    # Challenges
+
+    async def create_challenge(self, challenge: AIGeneratedChallengeCreate) -> dict:
+        """Store a hand-written challenge; 409 if it is a near-duplicate of a stored one"""
+        stored, duplicate = await self._store({
+            'title': challenge.title,
+            'description': challenge.description,
+            'difficulty': challenge.difficulty.value,
+            'ai_prompt': challenge.ai_prompt,
+            'model': None,
+        })
+        if duplicate:
+            raise HTTPException(status_code=409, detail=f"Near-duplicate of challenge {stored['id']}")
+        return stored
+
+    async def update_challenge(self, challenge_id: str, challenge: AIGeneratedChallengeCreate) -> dict:
+        await self._refresh_index()
+        signature = self.index.signature(challenge.description)
+        match = self.index.nearest(signature)
+        if match is not None and match[0] != challenge_id:
+            raise HTTPException(status_code=409, detail=f"Near-duplicate of challenge {match[0]}")
+        response = await asyncio.to_thread(
+            self.storage.update,
+            'ai_generated_challenges',
+            {**challenge.model_dump(mode='json'), 'signature': signature},
+            {'id': challenge_id}
+        )
+        if not response.data:
+            raise HTTPException(status_code=404, detail="AI-generated challenge not found")
+        self.index.add(challenge_id, signature)
+        return response.data[0]
+
+    async def get_challenge(self, challenge_id: str) -> dict:
+        response = await asyncio.to_thread(self.storage.select, 'ai_generated_challenges', '*', {'id': challenge_id})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="AI-generated challenge not found")
+        return response.data[0]
+
+    async def list_challenges(self, limit: int = 100) -> List[dict]:
+        response = await asyncio.to_thread(
+            self.storage.select, 'ai_generated_challenges', '*', order='created_at', desc=True, limit=limit
+        )
+        return response.data or []
+
+    async def delete_challenge(self, challenge_id: str) -> None:
+        await self.get_challenge(challenge_id)
+        await asyncio.to_thread(self.storage.delete, 'ai_prompt_cache', {'challenge_id': challenge_id})
+        await asyncio.to_thread(self.storage.delete, 'ai_generated_challenges', {'id': challenge_id})
+        self.index.remove(challenge_id)
+
+ai_challenge_generator = AIChallengeGenerator()
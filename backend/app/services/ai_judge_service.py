@@ -1,37 +1,80 @@
-import openai
+import hashlib
+import logging
+from typing import AsyncIterator, Optional
+
 from app.core.config import settings
-from cachetools import TTLCache, cached
-import json
+from app.core.shared_cache import shared_cache
+from app.services.judge_dispatcher import Stream, judge_dispatcher
+from app.services.judge_output import PartialJSON, to_evaluation
 
-openai.api_key = settings.OPENAI_API_KEY
+logger = logging.getLogger(__name__)
 
-# Cache for evaluations, max 1000 items, TTL of 1 hour
-evaluation_cache = TTLCache(maxsize=1000, ttl=3600)
+# Events of a streamed evaluation
+PARTIAL = "partial"
+RESULT = "result"
+ERROR = "error"
 
-@cached(evaluation_cache)
-def evaluate_code_submission(code: str, language: str = "Python") -> dict:
-    prompt = f"""
+JUDGE_PROMPT = """
 You are an AI code reviewer proficient in {language}. Evaluate the following code submission based on the following criteria:
-1. Functionality (40%): How well does the solution solve the given problem?
-2. Innovation (30%): Does the solution present novel approaches or creative use of AI technologies?
-3. Efficiency (20%): How optimized and performant is the code?
-4. Code Quality (10%): Is the code well-structured, readable, and following best practices?
+1. functionality (40%): How well does the solution solve the given problem?
+2. innovation (30%): Does the solution present novel approaches or creative use of AI technologies?
+3. efficiency (20%): How optimized and performant is the code?
+4. code_quality (10%): Is the code well-structured, readable, and following best practices?
 
-Provide a score out of 100 and detailed feedback for each criterion.
+Reply with a JSON object only, criteria first, in this shape:
+{{"criteria": [{{"name": "functionality", "score": <0-100>, "feedback": "..."}}, ...], "score": <overall 0-100>, "summary": "..."}}
 
 Code Submission:
 {code}
 """
+
+def _cache_key(code: str, language: str) -> str:
+    return "judge:" + hashlib.sha256(f"{language}\0{code}".encode()).hexdigest()
+
+async def stream_evaluation(code: str, language: str = "Python", stream: Optional[Stream] = None) -> AsyncIterator[dict]:
+    """Judge a submission as the model replies: `partial` evaluations as criteria arrive, then a `result` or an `error`.
+
+    The request goes through the judge dispatcher, which hedges it across
+    backends. The reply is parsed while it streams and repaired where it is
+    malformed or cut short, so whatever the model did say is kept instead of
+    failing the submission. Only complete evaluations are cached, shared by
+    every worker for SHARED_CACHE_JUDGE_TTL_SECONDS.
+    """
+    key = _cache_key(code, language)
+    cached = shared_cache.get_json(key)
+    if cached is not None:
+        yield {'event': RESULT, 'data': cached}
+        return
+
+    parser = PartialJSON()
+    last = None
     try:
-        response = openai.ChatCompletion.create(
-            model=settings.AI_MODEL,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        evaluation = response['choices'][0]['message']['content']
-        return json.loads(evaluation)
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse AI response as JSON."}
+        async for chunk in (stream or judge_dispatcher.stream)(JUDGE_PROMPT.format(language=language, code=code), settings.AI_MODEL):
+            parser.feed(chunk)
+            partial = to_evaluation(parser.value, False)
+            if partial is not None and partial != last:
+                last = partial
+                yield {'event': PARTIAL, 'data': partial.model_dump()}
     except Exception as e:
-        return {"error": str(e)}
+        logger.error(f"Judge reply failed after {len(parser.out)} characters: {str(e)}")
+        if last is None:
+            yield {'event': ERROR, 'data': {'error': str(e)}}
+            return
+
+    parser.close()
+    evaluation = to_evaluation(parser.value, not parser.repaired)
+    if evaluation is None or (not evaluation.criteria and evaluation.score is None):
+        yield {'event': ERROR, 'data': {'error': "Failed to parse AI response as JSON."}}
+        return
+    result = evaluation.model_dump()
+    if evaluation.complete:
+        shared_cache.set_json(key, result, settings.SHARED_CACHE_JUDGE_TTL_SECONDS)
+    yield {'event': RESULT, 'data': result}
+
+async def evaluate_code_submission(code: str, language: str = "Python", stream: Optional[Stream] = None) -> dict:
+    """The final evaluation of a submission, or {"error": ...}"""
+    outcome = {'error': "The judge returned no evaluation"}
+    async for event in stream_evaluation(code, language, stream):
+        if event['event'] != PARTIAL:
+            outcome = event['data']
+    return outcome
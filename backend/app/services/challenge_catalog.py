@@ -0,0 +1,214 @@
+import asyncio
+import base64
+import bisect
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..db.supabase_client import supabase
+from ..schemas.challenge import ChallengeCreate, ChallengeUpdate, DifficultyEnum
+
+logger = logging.getLogger(__name__)
+
+# Open-ended windows: a missing start is "always started", a missing end "never ends"
+NO_START = np.iinfo(np.int64).min
+NO_END = np.iinfo(np.int64).max
+
+def _timestamp(value, missing: int) -> int:
+    """Storage datetime -> UTC epoch microseconds"""
+    if value is None:
+        return missing
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1_000_000)
+
+def encode_cursor(start: int, challenge_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{start}|{challenge_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        start, challenge_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return int(start), challenge_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+class IntervalIndex:
+    """Challenges of one group ordered by (start, id), with their windows as numpy arrays.
+
+    A start-time bound is a binary search over the sorted starts; end-time
+    bounds and "active at" are then one vectorized comparison over that slice.
+    """
+
+    def __init__(self, keys: List[Tuple[int, str]], ends: List[int], rows: List[int]):
+        self.keys = keys
+        self.starts = np.array([start for start, _ in keys], dtype=np.int64)
+        self.ends = np.array(ends, dtype=np.int64)
+        self.rows = np.array(rows, dtype=np.int64)
+
+    def query(
+        self,
+        after: Optional[Tuple[int, str]] = None,
+        start_from: Optional[int] = None,
+        start_to: Optional[int] = None,
+        end_from: Optional[int] = None,
+        end_to: Optional[int] = None,
+        active_at: Optional[int] = None,
+        limit: int = 50
+    ) -> List[int]:
+        """Catalog rows matching every given bound, in (start, id) order, after the cursor key"""
+        low = 0
+        if after is not None:
+            low = bisect.bisect_right(self.keys, after)
+        if start_from is not None:
+            low = max(low, int(np.searchsorted(self.starts, start_from, side="left")))
+        high = len(self.keys)
+        if start_to is not None:
+            high = int(np.searchsorted(self.starts, start_to, side="left"))
+        if active_at is not None:
+            high = min(high, int(np.searchsorted(self.starts, active_at, side="right")))
+        if low >= high:
+            return []
+
+        mask = np.ones(high - low, dtype=bool)
+        ends = self.ends[low:high]
+        if end_from is not None:
+            mask &= ends >= end_from
+        if end_to is not None:
+            mask &= ends < end_to
+        if active_at is not None:
+            mask &= ends > active_at
+        return self.rows[low:high][mask][:limit].tolist()
+
+class CatalogSnapshot:
+    """All challenges plus an interval index over everything and one per difficulty"""
+
+    def __init__(self, challenges: List[dict]):
+        keyed = sorted(
+            ((_timestamp(row['start_time'], NO_START), str(row['id'])), row)
+            for row in challenges
+        )
+        self.challenges = [row for _, row in keyed]
+        self.by_id: Dict[str, int] = {key[1]: position for position, (key, _) in enumerate(keyed)}
+        self.built_at = time.monotonic()
+
+        # The None key is every challenge; one without a difficulty is only in that one
+        groups: Dict[Optional[str], List[int]] = {None: list(range(len(keyed)))}
+        for position, (_, row) in enumerate(keyed):
+            if row['difficulty'] is not None:
+                groups.setdefault(row['difficulty'], []).append(position)
+        self.indexes = {
+            difficulty: IntervalIndex(
+                [keyed[position][0] for position in positions],
+                [_timestamp(keyed[position][1]['end_time'], NO_END) for position in positions],
+                positions
+            )
+            for difficulty, positions in groups.items()
+        }
+
+    def key_of(self, position: int) -> Tuple[int, str]:
+        row = self.challenges[position]
+        return _timestamp(row['start_time'], NO_START), str(row['id'])
+
+class ChallengeCatalog:
+    """Challenge catalog served from memory.
+
+    The catalog is built from the ``challenges`` table on first use and
+    rebuilt after a create or update through this service, or once it is
+    ``CHALLENGE_CATALOG_TTL_SECONDS`` old (to pick up writes made by other
+    workers, and participant counts).
+    """
+
+    def __init__(self, storage=None, ttl: float = settings.CHALLENGE_CATALOG_TTL_SECONDS):
+        self.storage = storage or supabase
+        self.ttl = ttl
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._build_lock = asyncio.Lock()
+        # Bumped by every invalidation, so a build that raced a write is not cached
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+        self._generation += 1
+
+    async def snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.built_at < self.ttl:
+            return snapshot
+        async with self._build_lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot.built_at >= self.ttl:
+                generation = self._generation
+                response = await asyncio.to_thread(self.storage.select, 'challenges', '*')
+                snapshot = await asyncio.to_thread(CatalogSnapshot, response.data or [])
+                if generation == self._generation:
+                    self._snapshot = snapshot
+                logger.info(f"Built challenge catalog with {len(snapshot.challenges)} challenges")
+        return snapshot
+
+    async def list_challenges(
+        self,
+        difficulty: Optional[DifficultyEnum] = None,
+        active_at: Optional[datetime] = None,
+        starts_after: Optional[datetime] = None,
+        starts_before: Optional[datetime] = None,
+        ends_after: Optional[datetime] = None,
+        ends_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[dict], Optional[str]]:
+        """One page of challenges ordered by start time; windows are [start, end)"""
+        snapshot = await self.snapshot()
+        index = snapshot.indexes.get(DifficultyEnum(difficulty).value if difficulty else None)
+        if index is None:
+            return [], None
+
+        def bound(value: Optional[datetime]) -> Optional[int]:
+            return _timestamp(value, 0) if value is not None else None
+
+        positions = index.query(
+            after=decode_cursor(cursor) if cursor else None,
+            start_from=bound(starts_after),
+            start_to=bound(starts_before),
+            end_from=bound(ends_after),
+            end_to=bound(ends_before),
+            active_at=bound(active_at),
+            limit=limit
+        )
+        page = [snapshot.challenges[position] for position in positions]
+        next_cursor = encode_cursor(*snapshot.key_of(positions[-1])) if len(positions) == limit else None
+        return page, next_cursor
+
+    async def get_challenge(self, challenge_id: str) -> dict:
+        snapshot = await self.snapshot()
+        position = snapshot.by_id.get(str(challenge_id))
+        if position is None:
+            raise HTTPException(status_code=404, detail="Challenge not found")
+        return snapshot.challenges[position]
+
+    async def create_challenge(self, challenge: ChallengeCreate) -> dict:
+        response = await asyncio.to_thread(
+            self.storage.insert, 'challenges', {**challenge.model_dump(mode="json"), 'current_participants': 0}
+        )
+        self.invalidate()
+        return response.data[0]
+
+    async def update_challenge(self, challenge_id: str, challenge: ChallengeUpdate) -> dict:
+        data = challenge.model_dump(mode="json", exclude_unset=True)
+        if not data:
+            raise HTTPException(status_code=400, detail="No fields to update")
+        # Set explicitly so the lifecycle scheduler's rescan sees the change on every backend
+        data['updated_at'] = datetime.now(timezone.utc).isoformat()
+        response = await asyncio.to_thread(self.storage.update, 'challenges', data, {'id': challenge_id})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Challenge not found")
+        self.invalidate()
+        return response.data[0]
+
+challenge_catalog = ChallengeCatalog()
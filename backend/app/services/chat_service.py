@@ -0,0 +1,287 @@
+import asyncio
+import base64
+import json
+import logging
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, WebSocket
+
+from ..core.config import settings
+from ..db.supabase_client import supabase
+from ..schemas.chat import ChatMessageCreate, ChatRoomType
+
+logger = logging.getLogger(__name__)
+
+# Attempts to store a batch before falling back to storing its messages one by one
+PERSIST_ATTEMPTS = 3
+PERSIST_RETRY_DELAY = 0.5
+
+def encode_cursor(timestamp: datetime) -> str:
+    return base64.urlsafe_b64encode(timestamp.isoformat().encode()).decode()
+
+def decode_cursor(cursor: str) -> datetime:
+    try:
+        return _parse_timestamp(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _parse_timestamp(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def _from_row(row: dict) -> dict:
+    """Storage row -> in-memory message"""
+    return {
+        'id': str(row['id']),
+        'room_type': row['room_type'],
+        'room_id': str(row['room_id']),
+        'user_id': str(row['user_id']),
+        'content': row['content'],
+        'timestamp': _parse_timestamp(row['timestamp']),
+    }
+
+def _to_row(message: dict) -> dict:
+    """In-memory message -> storage row / wire format"""
+    return {**message, 'timestamp': message['timestamp'].isoformat()}
+
+class ChatRoom:
+    """Recent history, live viewers and pending writes of one challenge or team room.
+
+    ``history`` holds the newest messages in chronological order. ``has_older``
+    tells whether storage has messages that fell out of (or never made it into)
+    the buffer, so pages can be served from memory whenever it is False.
+    """
+
+    def __init__(self, room_type: str, room_id: str, history_size: int):
+        self.room_type = room_type
+        self.room_id = room_id
+        self.history: Deque[dict] = deque(maxlen=history_size)
+        self.has_older = False
+        self.loaded = False
+        self.load_lock = asyncio.Lock()
+        self.viewers: Set[WebSocket] = set()
+        self.pending: asyncio.Queue = asyncio.Queue()
+        self.broadcaster: Optional[asyncio.Task] = None
+
+    @property
+    def idle(self) -> bool:
+        # A running broadcaster may hold a batch it has taken off the queue but not yet stored
+        broadcasting = self.broadcaster is not None and not self.broadcaster.done()
+        return not self.viewers and self.pending.empty() and not broadcasting
+
+    def append(self, message: dict) -> None:
+        if len(self.history) == self.history.maxlen:
+            self.has_older = True
+        self.history.append(message)
+
+    def remove(self, message_id: str) -> None:
+        kept = [message for message in self.history if message['id'] != message_id]
+        if len(kept) != len(self.history):
+            self.history = deque(kept, maxlen=self.history.maxlen)
+
+class ChatService:
+    """Chat rooms backed by storage, with in-memory history and batched WebSocket fan-out.
+
+    Each room has a broadcaster task while messages are queued. It waits
+    ``CHAT_FLUSH_INTERVAL_MS`` to collect a batch, sends the batch to every
+    viewer as a single frame and persists it with a single insert, then exits
+    once the queue is empty.
+    History is per process: with several workers, each one serves the
+    messages it has seen plus whatever is in storage.
+    """
+
+    def __init__(
+        self,
+        history_size: int = settings.CHAT_HISTORY_SIZE,
+        max_rooms: int = settings.CHAT_MAX_ROOMS,
+        batch_size: int = settings.CHAT_BATCH_SIZE,
+        flush_interval: float = settings.CHAT_FLUSH_INTERVAL_MS / 1000,
+        storage=None
+    ):
+        self.history_size = history_size
+        self.max_rooms = max_rooms
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.storage = storage or supabase
+        self.rooms: "OrderedDict[Tuple[str, str], ChatRoom]" = OrderedDict()
+
+    async def _room(self, room_type: ChatRoomType, room_id) -> ChatRoom:
+        key = (ChatRoomType(room_type).value, str(room_id))
+        room = self.rooms.get(key)
+        if room is None:
+            room = self.rooms[key] = ChatRoom(key[0], key[1], self.history_size)
+            self._evict()
+        else:
+            self.rooms.move_to_end(key)
+
+        if not room.loaded:
+            async with room.load_lock:
+                if not room.loaded:
+                    await self._load_history(room)
+        return room
+
+    def _evict(self) -> None:
+        """Drop least recently used rooms that nobody is watching and that have nothing left to store"""
+        # The most recent room is the one being opened
+        for key in list(self.rooms)[:-1]:
+            if len(self.rooms) <= self.max_rooms:
+                return
+            if self.rooms[key].idle:
+                del self.rooms[key]
+
+    async def _load_history(self, room: ChatRoom) -> None:
+        response = await asyncio.to_thread(
+            self.storage.select,
+            'chat_messages',
+            '*',
+            {'room_type': room.room_type, 'room_id': room.room_id},
+            order='timestamp',
+            desc=True,
+            limit=self.history_size
+        )
+        rows = [_from_row(row) for row in (response.data or [])]
+        # Messages posted while the load was in flight are already in the buffer
+        posted = list(room.history)
+        room.history.clear()
+        room.history.extend(reversed(rows))
+        for message in posted:
+            room.append(message)
+        room.has_older = room.has_older or len(rows) == self.history_size
+        room.loaded = True
+
+    async def post_message(self, message: ChatMessageCreate) -> dict:
+        """Add a message to its room and queue it for fan-out and persistence"""
+        room = await self._room(message.room_type, message.room_id)
+        record = {
+            'id': str(uuid.uuid4()),
+            'room_type': room.room_type,
+            'room_id': room.room_id,
+            'user_id': str(message.user_id),
+            'content': message.content,
+            'timestamp': datetime.now(timezone.utc),
+        }
+        room.append(record)
+        room.pending.put_nowait(record)
+        if room.broadcaster is None or room.broadcaster.done():
+            room.broadcaster = asyncio.create_task(self._broadcast(room))
+        return record
+
+    async def list_messages(
+        self,
+        room_type: ChatRoomType,
+        room_id,
+        before: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Return up to ``limit`` messages older than the ``before`` cursor, oldest first"""
+        room = await self._room(room_type, room_id)
+        cutoff = decode_cursor(before) if before else None
+
+        page = [
+            message for message in room.history
+            if cutoff is None or message['timestamp'] < cutoff
+        ][-limit:]
+
+        if len(page) < limit and room.has_older:
+            # The buffer ran out; continue from storage below its oldest entry
+            storage_cutoff = page[0]['timestamp'] if page else cutoff
+            if storage_cutoff is None and room.history:
+                storage_cutoff = room.history[0]['timestamp']
+            filters = {'room_type': room.room_type, 'room_id': room.room_id}
+            if storage_cutoff is not None:
+                filters['timestamp'] = {'lt': storage_cutoff.isoformat()}
+            response = await asyncio.to_thread(
+                self.storage.select,
+                'chat_messages',
+                '*',
+                filters,
+                order='timestamp',
+                desc=True,
+                limit=limit - len(page)
+            )
+            page = [_from_row(row) for row in reversed(response.data or [])] + page
+
+        next_cursor = encode_cursor(page[0]['timestamp']) if len(page) == limit else None
+        return page, next_cursor
+
+    async def get_message(self, message_id: str) -> dict:
+        response = await asyncio.to_thread(self.storage.select, 'chat_messages', '*', {'id': message_id})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Chat message not found")
+        return _from_row(response.data[0])
+
+    async def delete_message(self, message_id: str) -> None:
+        response = await asyncio.to_thread(self.storage.delete, 'chat_messages', {'id': message_id})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Chat message not found")
+        deleted = _from_row(response.data[0])
+        room = self.rooms.get((deleted['room_type'], deleted['room_id']))
+        if room:
+            room.remove(deleted['id'])
+
+    async def subscribe(self, websocket: WebSocket, room_type: ChatRoomType, room_id) -> ChatRoom:
+        room = await self._room(room_type, room_id)
+        room.viewers.add(websocket)
+        return room
+
+    def unsubscribe(self, websocket: WebSocket, room: ChatRoom) -> None:
+        room.viewers.discard(websocket)
+
+    async def _broadcast(self, room: ChatRoom) -> None:
+        """Broadcaster loop for one room: collect a batch, fan it out, persist it; ends when the queue is empty"""
+        while not room.pending.empty():
+            batch = [room.pending.get_nowait()]
+            await asyncio.sleep(self.flush_interval)
+            while len(batch) < self.batch_size and not room.pending.empty():
+                batch.append(room.pending.get_nowait())
+
+            rows = [_to_row(message) for message in batch]
+            await self._fan_out(room, json.dumps(rows))
+            await self._persist(room, rows)
+
+    async def _persist(self, room: ChatRoom, rows: List[dict]) -> None:
+        """Store a batch, retrying transient failures; rows are keyed by id, so a retry never duplicates"""
+        for attempt in range(PERSIST_ATTEMPTS):
+            try:
+                await asyncio.to_thread(self.storage.insert_ignore, 'chat_messages', rows)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Failed to persist {len(rows)} chat messages for room {room.room_id} "
+                    f"(attempt {attempt + 1}): {str(e)}"
+                )
+                await asyncio.sleep(PERSIST_RETRY_DELAY)
+        # Keep one bad message from losing the rest of the batch
+        for row in rows:
+            try:
+                await asyncio.to_thread(self.storage.insert_ignore, 'chat_messages', row)
+            except Exception as e:
+                logger.error(f"Dropping chat message {row['id']} for room {room.room_id}: {str(e)}")
+
+    async def close(self) -> None:
+        """Fan out and store every queued message, e.g. on shutdown"""
+        broadcasters = [
+            room.broadcaster for room in self.rooms.values()
+            if room.broadcaster is not None and not room.broadcaster.done()
+        ]
+        await asyncio.gather(*broadcasters, return_exceptions=True)
+
+    async def _fan_out(self, room: ChatRoom, payload: str) -> None:
+        viewers = list(room.viewers)
+        if not viewers:
+            return
+        results = await asyncio.gather(
+            *(viewer.send_text(payload) for viewer in viewers),
+            return_exceptions=True
+        )
+        for viewer, result in zip(viewers, results):
+            if isinstance(result, Exception):
+                room.viewers.discard(viewer)
+
+chat_service = ChatService()
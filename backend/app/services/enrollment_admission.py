@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+from .achievement_engine import achievement_engine, ENROLLMENT_ADMITTED
+
+logger = logging.getLogger(__name__)
+
+ENROLLED = "enrolled"
+WAITLISTED = "waitlisted"
+
+# Failed flushes in a row before the background flusher backs off until the next change
+FLUSH_ATTEMPTS = 3
+FLUSH_RETRY_DELAY = 0.5
+
+class ChallengeSlots:
+    """Admission state of one challenge: the reservation counter and the waitlist"""
+
+    def __init__(self, challenge_id: str, capacity: Optional[int]):
+        self.challenge_id = challenge_id
+        # None means unlimited
+        self.capacity = capacity
+        self.admitted = 0
+        # user_id -> enrollment_id, for enrolled and waitlisted users
+        self.members: Dict[str, str] = {}
+        self.waitlist: Deque[Tuple[str, str]] = deque()
+
+    def has_room(self) -> bool:
+        return self.capacity is None or self.admitted < self.capacity
+
+class EnrollmentAdmission:
+    """Hands out challenge slots from an in-memory counter, with a waitlist once full.
+
+    A challenge's capacity and existing enrollments are loaded on its first
+    admission. After that, admitting is a check-and-increment on the event
+    loop with no awaits in between, so concurrent requests can never
+    oversubscribe and no request waits on the database. New enrollments,
+    promotions off the waitlist and withdrawals are flushed to storage in
+    batches by a background task, together with ``current_participants``.
+    Every write is idempotent, so a failed flush is simply retried. If a
+    batch of new enrollments fails, its rows are retried one by one; a row
+    that still fails on its own ``FLUSH_ATTEMPTS`` times is dropped and its
+    slot given back, so one bad row never holds up the others.
+
+    The counter lives in this process, so a challenge's enrollments must be
+    served by a single worker.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.ENROLLMENT_BATCH_SIZE,
+        flush_interval: float = settings.ENROLLMENT_FLUSH_INTERVAL_MS / 1000,
+        storage=None,
+        achievements=None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.storage = storage or supabase
+        self.achievements = achievements or achievement_engine
+        self._challenges: Dict[str, ChallengeSlots] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        # Writes not yet in storage
+        self._pending: Dict[str, dict] = {}
+        # enrollment_id -> (challenge_id, user_id) of stored rows taken off the waitlist
+        self._promoted: Dict[str, Tuple[str, str]] = {}
+        self._withdrawn: Set[str] = set()
+        self._dirty: Set[str] = set()
+        # enrollment_id -> failed single-row inserts so far
+        self._insert_failures: Dict[str, int] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def _slots(self, challenge_id: str) -> ChallengeSlots:
+        slots = self._challenges.get(challenge_id)
+        if slots is not None:
+            return slots
+        lock = self._load_locks.setdefault(challenge_id, asyncio.Lock())
+        async with lock:
+            if challenge_id not in self._challenges:
+                self._challenges[challenge_id] = await asyncio.to_thread(self._load, challenge_id)
+            self._load_locks.pop(challenge_id, None)
+        return self._challenges[challenge_id]
+
+    def _load(self, challenge_id: str) -> ChallengeSlots:
+        challenge = self.storage.select('challenges', 'id,max_participants', {'id': challenge_id})
+        if not challenge.data:
+            raise HTTPException(status_code=404, detail="Challenge not found")
+        slots = ChallengeSlots(challenge_id, challenge.data[0]['max_participants'])
+
+        enrollments = self.storage.select(
+            'enrollments', 'id,user_id,status', {'challenge_id': challenge_id}, order='created_at'
+        )
+        for row in enrollments.data or []:
+            slots.members[row['user_id']] = row['id']
+            if row['status'] == WAITLISTED:
+                slots.waitlist.append((row['id'], row['user_id']))
+            else:
+                slots.admitted += 1
+        return slots
+
+    async def admit(self, challenge_id: str, user_id: str, team_id: Optional[str] = None) -> dict:
+        """Enroll the user if a slot is free, otherwise put them on the waitlist"""
+        slots = await self._slots(str(challenge_id))
+        user_id = str(user_id)
+        if user_id in slots.members:
+            raise HTTPException(status_code=400, detail="User is already enrolled in this challenge")
+
+        enrollment_id = str(uuid.uuid4())
+        if slots.has_room():
+            slots.admitted += 1
+            status = ENROLLED
+            self._dirty.add(slots.challenge_id)
+        else:
+            slots.waitlist.append((enrollment_id, user_id))
+            status = WAITLISTED
+        slots.members[user_id] = enrollment_id
+
+        now = datetime.now(timezone.utc).isoformat()
+        row = {
+            'id': enrollment_id,
+            'user_id': user_id,
+            'challenge_id': slots.challenge_id,
+            'team_id': str(team_id) if team_id else None,
+            'status': status,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self._pending[enrollment_id] = row
+        self._schedule_flush()
+        return self._with_position(slots, row)
+
+    async def withdraw(self, enrollment_id: str) -> dict:
+        """Remove an enrollment; a freed slot goes to the head of the waitlist"""
+        row = self._pending.get(enrollment_id)
+        if row is None:
+            response = await asyncio.to_thread(self.storage.select, 'enrollments', '*', {'id': enrollment_id})
+            if not response.data or enrollment_id in self._withdrawn:
+                raise HTTPException(status_code=404, detail="Enrollment not found")
+            row = response.data[0]
+
+        slots = await self._slots(row['challenge_id'])
+        if slots.members.get(row['user_id']) != enrollment_id:
+            raise HTTPException(status_code=404, detail="Enrollment not found")
+        del slots.members[row['user_id']]
+
+        if enrollment_id in self._pending:
+            del self._pending[enrollment_id]
+            self._insert_failures.pop(enrollment_id, None)
+        else:
+            self._withdrawn.add(enrollment_id)
+            self._promoted.pop(enrollment_id, None)
+
+        if any(entry[0] == enrollment_id for entry in slots.waitlist):
+            slots.waitlist = deque(entry for entry in slots.waitlist if entry[0] != enrollment_id)
+        else:
+            slots.admitted -= 1
+            self._dirty.add(slots.challenge_id)
+            self._promote(slots)
+        self._schedule_flush()
+        return row
+
+    def _promote(self, slots: ChallengeSlots) -> None:
+        while slots.waitlist and slots.has_room():
+            enrollment_id, user_id = slots.waitlist.popleft()
+            slots.admitted += 1
+            if enrollment_id in self._pending:
+                self._pending[enrollment_id]['status'] = ENROLLED
+            else:
+                self._promoted[enrollment_id] = (slots.challenge_id, user_id)
+
+    async def status(self, challenge_id: str) -> dict:
+        slots = await self._slots(str(challenge_id))
+        return {
+            'challenge_id': slots.challenge_id,
+            'max_participants': slots.capacity,
+            'current_participants': slots.admitted,
+            'waitlisted': len(slots.waitlist),
+        }
+
+    @staticmethod
+    def _with_position(slots: ChallengeSlots, row: dict) -> dict:
+        position = None
+        if row['status'] == WAITLISTED:
+            position = next(
+                (i + 1 for i, (enrollment_id, _) in enumerate(slots.waitlist) if enrollment_id == row['id']),
+                None
+            )
+        return {**row, 'waitlist_position': position}
+
+    # Batched writes
+
+    def _schedule_flush(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        failures = 0
+        while self._pending or self._promoted or self._withdrawn or self._dirty:
+            if self.flush_interval and len(self._pending) < self.batch_size:
+                await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                failures = 0
+                if self._insert_failures:
+                    await asyncio.sleep(FLUSH_RETRY_DELAY)
+            except Exception as e:
+                failures += 1
+                if failures >= FLUSH_ATTEMPTS:
+                    # Storage is down; the next admission or withdrawal starts a new flusher
+                    logger.error(f"Failed to flush enrollments {failures} times, pausing: {str(e)}")
+                    return
+                logger.warning(f"Failed to flush enrollments, retrying: {str(e)}")
+                await asyncio.sleep(max(self.flush_interval, FLUSH_RETRY_DELAY))
+
+    async def flush(self) -> None:
+        """Write up to one batch of pending enrollments and all queued status changes"""
+        inserts = list(islice(self._pending.values(), self.batch_size))
+        promoted, withdrawn = dict(self._promoted), list(self._withdrawn)
+        counts = {
+            challenge_id: self._challenges[challenge_id].admitted
+            for challenge_id in self._dirty
+        }
+        for row in inserts:
+            del self._pending[row['id']]
+        self._promoted.clear()
+        self._withdrawn.clear()
+        self._dirty.clear()
+
+        try:
+            rejected = await asyncio.to_thread(self._write, inserts, list(promoted), withdrawn, counts)
+        except Exception:
+            # Put everything back for the next attempt; newer changes win
+            for row in inserts:
+                self._pending.setdefault(row['id'], row)
+            self._promoted.update(promoted)
+            self._withdrawn.update(withdrawn)
+            self._dirty.update(counts)
+            raise
+
+        rejected_ids = {row['id'] for row in rejected}
+        for row in inserts:
+            if row['id'] not in rejected_ids:
+                self._insert_failures.pop(row['id'], None)
+        for row in rejected:
+            attempts = self._insert_failures.get(row['id'], 0) + 1
+            if attempts < FLUSH_ATTEMPTS:
+                self._insert_failures[row['id']] = attempts
+                self._pending.setdefault(row['id'], row)
+            else:
+                logger.error(f"Dropping enrollment {row['id']} of user {row['user_id']} after {attempts} failed inserts")
+                self._insert_failures.pop(row['id'], None)
+                self._release(row)
+
+        # Only announce admissions once they are stored
+        admitted = [
+            (row['challenge_id'], row['user_id']) for row in inserts
+            if row['status'] == ENROLLED and row['id'] not in rejected_ids
+        ]
+        for challenge_id, user_id in admitted + list(promoted.values()):
+            self.achievements.publish(ENROLLMENT_ADMITTED, user_id, challenge_id=challenge_id)
+
+    def _release(self, row: dict) -> None:
+        """Give back the slot of an enrollment that could not be stored"""
+        slots = self._challenges.get(row['challenge_id'])
+        if slots is None or slots.members.get(row['user_id']) != row['id']:
+            return
+        del slots.members[row['user_id']]
+        # It may have been promoted while its insert was in flight
+        self._promoted.pop(row['id'], None)
+        if any(entry[0] == row['id'] for entry in slots.waitlist):
+            slots.waitlist = deque(entry for entry in slots.waitlist if entry[0] != row['id'])
+        else:
+            slots.admitted -= 1
+            self._dirty.add(slots.challenge_id)
+            self._promote(slots)
+
+    def _write(
+        self, inserts: List[dict], promoted: List[str], withdrawn: List[str], counts: Dict[str, int]
+    ) -> List[dict]:
+        """Store one flush; returns the new enrollments that could not be inserted even on their own"""
+        rejected = self._insert(inserts)
+        for start in range(0, len(promoted), IN_FILTER_CHUNK):
+            self.storage.update(
+                'enrollments',
+                {'status': ENROLLED},
+                {'id': {'in': promoted[start:start + IN_FILTER_CHUNK]}}
+            )
+        for enrollment_id in withdrawn:
+            self.storage.delete('enrollments', {'id': enrollment_id})
+        for challenge_id, admitted in counts.items():
+            self.storage.update('challenges', {'current_participants': admitted}, {'id': challenge_id})
+        return rejected
+
+    def _insert(self, rows: List[dict]) -> List[dict]:
+        """Insert new enrollments, one by one if the batch fails; returns the rows that failed alone"""
+        if not rows:
+            return []
+        # Skipping existing rows makes a retry after a partly applied flush harmless
+        try:
+            self.storage.insert_ignore('enrollments', rows)
+            return []
+        except Exception as e:
+            if len(rows) == 1:
+                logger.warning(f"Failed to insert enrollment {rows[0]['id']}: {str(e)}")
+                return rows
+            logger.warning(f"Failed to insert {len(rows)} enrollments together, retrying one by one: {str(e)}")
+        return [row for row in rows if self._insert([row])]
+
+    async def close(self) -> None:
+        """Flush everything still pending, e.g. on shutdown"""
+        if self._flusher is not None and not self._flusher.done():
+            await self._flusher
+        failures = 0
+        while (self._pending or self._promoted or self._withdrawn or self._dirty) and failures < FLUSH_ATTEMPTS:
+            try:
+                await self.flush()
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Failed to flush enrollments on close: {str(e)}")
+                await asyncio.sleep(FLUSH_RETRY_DELAY)
+        if self._pending or self._promoted or self._withdrawn or self._dirty:
+            logger.error(
+                f"Gave up flushing enrollments: {len(self._pending)} new, {len(self._promoted)} promoted, "
+                f"{len(self._withdrawn)} withdrawn"
+            )
+
+enrollment_admission = EnrollmentAdmission()
@@ -1,8 +1,284 @@
-import requests
-from app.core.config import settings
-
-# Define functions to interact with GitHub API
-# For example:
-def create_challenge_repo(challenge_id: str, title: str) -> str:
-    # Logic to create a GitHub repository
-    return "https://github.com/your-org/" + title
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+from ..schemas.challenge import ChallengeUpdate
+from .challenge_catalog import challenge_catalog
+
+logger = logging.getLogger(__name__)
+
+# Wait before retrying a 5xx or a dropped connection, doubled on every attempt
+RETRY_BACKOFF_SECONDS = 1.0
+# Largest wait for a rate-limit reset or Retry-After that we honour as given
+MAX_RATE_LIMIT_WAIT_SECONDS = 3600
+# Wait after a rate-limit rejection that names no reset time, as GitHub recommends
+DEFAULT_RATE_LIMIT_WAIT_SECONDS = 60
+
+def repo_name(*parts: str) -> str:
+    """A valid repository name from free text, e.g. ("Prompt Golf!", "a1b2c3d4") -> prompt-golf-a1b2c3d4"""
+    slug = "-".join(re.sub(r"[^a-z0-9]+", "-", part.lower()).strip("-") for part in parts if part)
+    return slug[:100].strip("-") or "repo"
+
+class GitHubClient:
+    """GitHub REST client that queues requests instead of failing on rate limits.
+
+    All requests share one pooled ``httpx.AsyncClient``. The client tracks
+    ``X-RateLimit-Remaining`` / ``X-RateLimit-Reset`` from every response and
+    counts its own in-flight requests against the remaining quota; once it is
+    spent, new requests wait for the reset instead of being sent. A 403 or
+    429 that says the limit was hit (primary or secondary, via
+    ``Retry-After``) pauses every request the same way and is then retried.
+
+    GET responses with an ETag are kept (LRU, ``GITHUB_ETAG_CACHE_SIZE``)
+    and revalidated with ``If-None-Match``; GitHub does not count a 304
+    against the rate limit. 5xx responses and transport errors are retried
+    with exponential backoff, up to ``GITHUB_MAX_RETRIES`` times.
+    """
+
+    def __init__(
+        self,
+        token: str = settings.GITHUB_TOKEN,
+        base_url: str = settings.GITHUB_API_URL,
+        max_connections: int = settings.GITHUB_MAX_CONNECTIONS,
+        max_retries: int = settings.GITHUB_MAX_RETRIES,
+        etag_cache_size: int = settings.GITHUB_ETAG_CACHE_SIZE,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ):
+        self.token = token
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.etag_cache_size = etag_cache_size
+        self.transport = transport
+        self.clock = clock
+        self.sleep = sleep
+        self._client: Optional[httpx.AsyncClient] = None
+        # path -> (etag, status code, body) of the last GET
+        self._etags: "OrderedDict[str, Tuple[str, int, Any]]" = OrderedDict()
+        # None until the first response tells us the quota
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
+        self._paused_until = 0.0
+        self._quota_lock: Optional[asyncio.Lock] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+            }
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=30,
+                limits=httpx.Limits(max_connections=self.max_connections),
+                transport=self.transport
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # Rate limits
+
+    async def _acquire(self) -> None:
+        """Wait until a request may be sent without exceeding the known quota"""
+        if self._quota_lock is None:
+            self._quota_lock = asyncio.Lock()
+        # Requests queue on the lock, so they leave in order once the quota is back
+        async with self._quota_lock:
+            while True:
+                now = self.clock()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._remaining is not None and self._remaining <= 0 and now < self._reset_at:
+                    wait = self._reset_at - now
+                else:
+                    break
+                logger.info(f"GitHub rate limit reached, waiting {wait:.1f}s")
+                await self.sleep(min(wait, MAX_RATE_LIMIT_WAIT_SECONDS))
+            if self._remaining is not None:
+                if self.clock() >= self._reset_at:
+                    # A new window; the next response says how much of it is left
+                    self._remaining = None
+                else:
+                    self._remaining -= 1
+
+    def _track(self, response: httpx.Response) -> bool:
+        """Record the quota from a response; True if it was rejected by a rate limit"""
+        headers = response.headers
+        if "x-ratelimit-remaining" in headers:
+            remaining = int(headers["x-ratelimit-remaining"])
+            reset_at = float(headers.get("x-ratelimit-reset", self._reset_at))
+            if self._remaining is not None and reset_at == self._reset_at:
+                # Same window: requests sent after this one was answered are not in its count yet
+                remaining = min(remaining, self._remaining)
+            self._remaining, self._reset_at = remaining, reset_at
+        if response.status_code not in (403, 429):
+            return False
+        if "retry-after" in headers:
+            self._paused_until = self.clock() + min(float(headers["retry-after"]), MAX_RATE_LIMIT_WAIT_SECONDS)
+            return True
+        if self._remaining is not None and self._remaining <= 0:
+            if self._reset_at <= self.clock():
+                self._paused_until = self.clock() + DEFAULT_RATE_LIMIT_WAIT_SECONDS
+            return True
+        # A plain 403 (permissions) is not a rate limit
+        return False
+
+    # Requests
+
+    async def request(self, method: str, path: str, json: Optional[dict] = None) -> Tuple[int, Any]:
+        """Send a request; returns (status code, decoded JSON body or None)"""
+        attempt = 0
+        while True:
+            await self._acquire()
+            headers = {}
+            cached = self._etags.get(path) if method == "GET" else None
+            if cached is not None:
+                headers["If-None-Match"] = cached[0]
+            try:
+                response = await self._http().request(method, path, json=json, headers=headers)
+            except httpx.TransportError as e:
+                response, error = None, str(e)
+            else:
+                error = f"HTTP {response.status_code}"
+                if self._track(response):
+                    # Queued until the limit resets; this is not a failed attempt
+                    continue
+                if response.status_code < 500:
+                    return self._result(method, path, response, cached)
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise HTTPException(status_code=502, detail=f"GitHub {method} {path} failed: {error}")
+            delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logger.warning(f"GitHub {method} {path} failed ({error}), retrying in {delay:.1f}s")
+            await self.sleep(delay)
+
+    def _result(self, method: str, path: str, response: httpx.Response, cached) -> Tuple[int, Any]:
+        if response.status_code == 304 and cached is not None:
+            self._etags.move_to_end(path)
+            return cached[1], cached[2]
+        body = response.json() if response.content else None
+        if method == "GET" and response.status_code == 200 and "etag" in response.headers:
+            self._etags[path] = (response.headers["etag"], response.status_code, body)
+            self._etags.move_to_end(path)
+            while len(self._etags) > self.etag_cache_size:
+                self._etags.popitem(last=False)
+        return response.status_code, body
+
+class GitHubProvisioner:
+    """Creates challenge and team repositories in the GitHub organization.
+
+    Provisioning is idempotent: an existing repository (checked with a
+    conditional GET, or reported by a 422 on create) is returned as is, so
+    bulk runs can simply be repeated after a failure. Bulk provisioning runs
+    at most ``GITHUB_CONCURRENCY`` repositories at once.
+    """
+
+    def __init__(
+        self,
+        client: Optional[GitHubClient] = None,
+        org: str = settings.GITHUB_ORG,
+        concurrency: int = settings.GITHUB_CONCURRENCY,
+        storage=None,
+        catalog=None
+    ):
+        self.client = client or GitHubClient()
+        self.org = org
+        self.concurrency = concurrency
+        self.storage = storage or supabase
+        self.catalog = catalog or challenge_catalog
+
+    async def provision_repo(self, name: str, description: str = "", private: bool = True) -> dict:
+        """The organization's repository called `name`, created if it does not exist yet"""
+        status, body = await self.client.request("GET", f"/repos/{self.org}/{name}")
+        if status == 200:
+            return body
+        status, body = await self.client.request("POST", f"/orgs/{self.org}/repos", json={
+            'name': name,
+            'description': description[:350],
+            'private': private,
+            'auto_init': True,
+        })
+        if status == 201:
+            logger.info(f"Created GitHub repository {self.org}/{name}")
+            return body
+        if status == 422:
+            # Created concurrently, e.g. by an earlier run whose response was lost
+            status, body = await self.client.request("GET", f"/repos/{self.org}/{name}")
+            if status == 200:
+                return body
+        message = body.get('message') if isinstance(body, dict) else body
+        raise HTTPException(status_code=502, detail=f"Failed to create repository {name}: {status} {message}")
+
+    async def provision_many(self, repos: List[dict]) -> List[dict]:
+        """Provision {'name', 'description'} specs concurrently; each result has 'html_url' or 'error'"""
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def provision(spec: dict) -> dict:
+            async with slots:
+                try:
+                    repo = await self.provision_repo(spec['name'], spec.get('description', ""))
+                    return {**spec, 'html_url': repo['html_url'], 'error': None}
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    logger.error(f"Failed to provision repository {spec['name']}: {detail}")
+                    return {**spec, 'html_url': None, 'error': detail}
+
+        return list(await asyncio.gather(*(provision(spec) for spec in repos)))
+
+    async def create_challenge_repo(self, challenge_id: str, per_team: bool = False) -> dict:
+        """Provision a challenge's repository, and with `per_team` one per team enrolled in it"""
+        challenge = await self.catalog.get_challenge(challenge_id)
+        challenge_id = str(challenge['id'])
+        name = repo_name(challenge['title'], challenge_id[:8])
+        specs = [{'name': name, 'description': challenge.get('description') or "", 'team_id': None}]
+
+        if per_team:
+            enrollments = await asyncio.to_thread(
+                self.storage.select, 'enrollments', 'team_id', {'challenge_id': challenge_id}
+            )
+            team_ids = sorted({str(row['team_id']) for row in (enrollments.data or []) if row['team_id']})
+            teams = []
+            for start in range(0, len(team_ids), IN_FILTER_CHUNK):
+                response = await asyncio.to_thread(
+                    self.storage.select, 'teams', 'id,name', {'id': {'in': team_ids[start:start + IN_FILTER_CHUNK]}}
+                )
+                teams += response.data or []
+            specs += [
+                {
+                    'name': repo_name(name, team['name'] or str(team['id'])[:8]),
+                    'description': f"{challenge['title']}: {team['name']}",
+                    'team_id': str(team['id']),
+                }
+                for team in teams
+            ]
+
+        results = await self.provision_many(specs)
+        challenge_repo = results[0]
+        if challenge_repo['html_url'] and challenge_repo['html_url'] != challenge.get('github_repo_url'):
+            await self.catalog.update_challenge(challenge_id, ChallengeUpdate(github_repo_url=challenge_repo['html_url']))
+        return {
+            'challenge_id': challenge_id,
+            'github_repo_url': challenge_repo['html_url'],
+            'repos': results,
+        }
+
+github_provisioner = GitHubProvisioner()
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+
+import openai
+from fastapi import HTTPException
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# (prompt, model) -> the reply's text as it arrives
+Stream = Callable[[str, str], AsyncIterator[str]]
+
+# Marks the end of an attempt's output in its queue
+_END = object()
+
+_openai_clients: Dict[Optional[str], openai.AsyncOpenAI] = {}
+
+def openai_stream(base_url: Optional[str] = None) -> Stream:
+    """A Stream from an OpenAI-compatible API; one client per base URL, shared by every request"""
+
+    async def stream(prompt: str, model: str) -> AsyncIterator[str]:
+        if base_url not in _openai_clients:
+            _openai_clients[base_url] = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=base_url)
+        response = await _openai_clients[base_url].chat.completions.create(
+            model=model,
+            response_format={"type": "json_object"},
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    return stream
+
+class CircuitBreaker:
+    """Stops calls to a backend after consecutive failures.
+
+    ``failures`` failures in a row open the breaker; after ``reset_seconds``
+    it lets one trial call through (half open), which closes it on success
+    and opens it again on failure.
+    """
+
+    def __init__(self, failures: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_failures = failures
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        return HALF_OPEN if self.clock() - self.opened_at >= self.reset_seconds else OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self.trial:
+            self.trial = True
+            return True
+        return False
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.trial or self.failures >= self.max_failures:
+            self.opened_at = self.clock()
+        self.trial = False
+
+    def release(self) -> None:
+        """A call was cancelled before it succeeded or failed; a half-open breaker may try again"""
+        self.trial = False
+
+class JudgeBackend:
+    """A model behind a Stream, with its circuit breaker and recent time-to-first-output"""
+
+    def __init__(
+        self,
+        name: str,
+        stream: Stream,
+        model: str,
+        breaker: Optional[CircuitBreaker] = None,
+        window: int = settings.JUDGE_LATENCY_WINDOW
+    ):
+        self.name = name
+        self.stream = stream
+        self.model = model
+        self.breaker = breaker or CircuitBreaker(settings.JUDGE_BREAKER_FAILURES, settings.JUDGE_BREAKER_RESET_SECONDS)
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.wins = 0
+        self.calls = 0
+        self.errors = 0
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+def backends_from_settings() -> List[JudgeBackend]:
+    entries = [entry.strip() for entry in settings.JUDGE_BACKENDS.split(",") if entry.strip()] or [settings.AI_MODEL]
+    backends = []
+    for entry in entries:
+        model, _, base_url = entry.partition("@")
+        backends.append(JudgeBackend(entry, openai_stream(base_url or None), model))
+    return backends
+
+class _Attempt:
+    """One backend's reply, pumped into a queue so the dispatcher can wait on several at once"""
+
+    def __init__(self, backend: JudgeBackend, prompt: str, clock: Callable[[], float]):
+        self.backend = backend
+        self.started = clock()
+        self.first: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.settled = False
+        backend.calls += 1
+        self.task = asyncio.create_task(self._pump(prompt))
+
+    def _put(self, item) -> None:
+        if not self.first.done():
+            self.first.set_result(item)
+        self.queue.put_nowait(item)
+
+    async def _pump(self, prompt: str) -> None:
+        stream = self.backend.stream(prompt, self.backend.model)
+        try:
+            async for chunk in stream:
+                self._put(chunk)
+            self._put(_END)
+        except Exception as e:
+            self._put(e)
+        finally:
+            await stream.aclose()
+
+class JudgeDispatcher:
+    """Sends each judge request to the first available backend and hedges when it is slow.
+
+    If the primary has produced no output by the ``JUDGE_HEDGE_PERCENTILE``
+    percentile of its recent times to first output, the same request goes
+    to the next backend whose circuit breaker is closed. The first attempt
+    to start answering wins and the other is cancelled; an attempt that
+    fails before answering hands over to the next backend at once. Replies
+    stream on from the winner, so partial results are not held back.
+
+    ``stats()`` reports how often requests were hedged and how often each
+    backend won.
+    """
+
+    def __init__(
+        self,
+        backends: Optional[List[JudgeBackend]] = None,
+        percentile: float = settings.JUDGE_HEDGE_PERCENTILE,
+        min_samples: int = settings.JUDGE_HEDGE_MIN_SAMPLES,
+        default_delay: float = settings.JUDGE_HEDGE_DEFAULT_DELAY_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self._backends = backends
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.clock = clock
+        self.requests = 0
+        self.hedged = 0
+
+    @property
+    def backends(self) -> List[JudgeBackend]:
+        # Built on first use, so importing this module never creates API clients
+        if self._backends is None:
+            self._backends = backends_from_settings()
+        return self._backends
+
+    def hedge_delay(self, backend: JudgeBackend) -> float:
+        if len(backend.latencies) < self.min_samples:
+            return self.default_delay
+        return backend.percentile(self.percentile)
+
+    def _fail(self, attempt: _Attempt, error: Optional[BaseException]) -> None:
+        attempt.settled = True
+        attempt.backend.errors += 1
+        attempt.backend.breaker.failure()
+        logger.warning(f"Judge backend {attempt.backend.name} failed: {error or 'empty reply'}")
+
+    async def stream(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        """The reply of whichever backend answers first; each backend uses its own model"""
+        self.requests += 1
+        waiting = deque(self.backends)
+        attempts: List[_Attempt] = []
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            while waiting:
+                backend = waiting.popleft()
+                if backend.breaker.allow():
+                    attempts.append(_Attempt(backend, prompt, self.clock))
+                    return True
+            return False
+
+        winner: Optional[_Attempt] = None
+        try:
+            launch()
+            while winner is None:
+                if not attempts:
+                    if last_error is not None:
+                        raise HTTPException(status_code=502, detail=f"Judge backends failed: {str(last_error)}")
+                    raise HTTPException(status_code=503, detail="No judge backend available")
+                timeout = None
+                if not hedged and waiting:
+                    primary = attempts[0]
+                    timeout = max(0.0, primary.started + self.hedge_delay(primary.backend) - self.clock())
+                done, _ = await asyncio.wait([attempt.first for attempt in attempts], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = launch()
+                    self.hedged += hedged
+                    continue
+                for attempt in list(attempts):
+                    if not attempt.first.done():
+                        continue
+                    first = attempt.first.result()
+                    if isinstance(first, str):
+                        winner = winner or attempt
+                        continue
+                    # Failed before answering: the next backend takes over right away
+                    attempts.remove(attempt)
+                    last_error = first if isinstance(first, BaseException) else last_error
+                    self._fail(attempt, first if isinstance(first, BaseException) else None)
+                    if not attempts:
+                        launch()
+
+            winner.backend.wins += 1
+            winner.backend.latencies.append(self.clock() - winner.started)
+            while True:
+                item = await winner.queue.get()
+                if item is _END:
+                    winner.settled = True
+                    winner.backend.breaker.success()
+                    return
+                if isinstance(item, BaseException):
+                    self._fail(winner, item)
+                    raise item
+                yield item
+        finally:
+            # The losing attempt, or every attempt if the caller stopped reading
+            for attempt in attempts:
+                attempt.task.cancel()
+                if not attempt.settled:
+                    attempt.backend.breaker.release()
+
+    def stats(self) -> dict:
+        """Hedging rate and, per backend, win rate, breaker state and latencies"""
+        return {
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+            'backends': [
+                {
+                    'name': backend.name,
+                    'calls': backend.calls,
+                    'wins': backend.wins,
+                    'win_rate': backend.wins / self.requests if self.requests else 0.0,
+                    'errors': backend.errors,
+                    'breaker': backend.breaker.state,
+                    'p50_first_output_seconds': backend.percentile(50),
+                    'hedge_delay_seconds': self.hedge_delay(backend),
+                }
+                for backend in self.backends
+            ],
+        }
+
+judge_dispatcher = JudgeDispatcher()
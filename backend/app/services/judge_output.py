@@ -0,0 +1,267 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ..schemas.judge import CriterionScore, JudgeEvaluation
+
+# Criteria the judge scores, with their weight in the overall score
+CRITERIA = {
+    "functionality": 0.4,
+    "innovation": 0.3,
+    "efficiency": 0.2,
+    "code_quality": 0.1,
+}
+CLOSERS = {'{': '}', '[': ']'}
+# States of an open object or array: what may come next
+KEY, COLON, VALUE, COMMA = "key", "colon", "value", "comma"
+LITERALS = {'true': 'true', 'false': 'false', 'null': 'null', 'True': 'true', 'False': 'false', 'None': 'null'}
+NUMBER = re.compile(r"-?\d+(\.\d+)?([eE][-+]?\d+)?")
+ESCAPE = re.compile(r'\\(["\\/bfnrt]|u[0-9a-fA-F]{4})')
+LEADING_NUMBER = re.compile(r"\s*(-?\d+(\.\d+)?)")
+
+class PartialJSON:
+    """Reads a JSON object as it streams in, tolerating what language models get wrong.
+
+    Text is scanned once, chunk by chunk, into a cleaned copy of the object.
+    ``value`` is the object so far: cut after its last complete value (or in
+    the middle of a string value, which is closed) with its open objects and
+    arrays closed. Prose or code fences around the object are skipped, and
+    trailing commas, missing or stray punctuation, Python literals and raw
+    newlines in strings are repaired; ``repaired`` tells whether any were.
+    """
+
+    def __init__(self):
+        self.out: List[str] = []
+        self.stack: List[List[str]] = []  # [opener, state]
+        self.started = False
+        self.done = False
+        self.repaired = False
+        self.in_string = False
+        self.string_is_key = False
+        self.escape = ""
+        self.token = ""
+        self.cut: Optional[Tuple[int, str]] = None
+
+    # Scanning
+
+    def _closers(self) -> str:
+        return "".join(CLOSERS[opener] for opener, _ in reversed(self.stack))
+
+    def _mark_cut(self) -> None:
+        self.cut = (len(self.out), self._closers())
+
+    def _expects_value(self) -> bool:
+        return not self.stack or self.stack[-1][1] == VALUE
+
+    def _value_done(self) -> None:
+        if self.stack:
+            self.stack[-1][1] = COMMA
+            self._mark_cut()
+        else:
+            self.done = True
+
+    def _end_token(self) -> None:
+        token, self.token = self.token, ""
+        if token in LITERALS:
+            self.out.append(LITERALS[token])
+        elif NUMBER.fullmatch(token):
+            self.out.append(token)
+        else:
+            self.repaired = True
+            self.out.append("null")
+        self._value_done()
+
+    def _string_char(self, c: str) -> None:
+        if self.escape:
+            self.escape += c
+            # \uXXXX is complete after four hex digits, any other escape after one character
+            if self.escape[1] != 'u' or len(self.escape) == 6:
+                if ESCAPE.fullmatch(self.escape):
+                    self.out.append(self.escape)
+                else:
+                    # Not JSON: keep the backslash as text
+                    self.out.append(json.dumps(self.escape)[1:-1])
+                    self.repaired = True
+                self.escape = ""
+        elif c == '\\':
+            self.escape = c
+        elif c == '"':
+            self.out.append(c)
+            self.in_string = False
+            if self.string_is_key:
+                self.stack[-1][1] = COLON
+            else:
+                self._value_done()
+        elif c < ' ':
+            self.out.append(json.dumps(c)[1:-1])
+        else:
+            self.out.append(c)
+
+    def _char(self, c: str) -> None:
+        if self.in_string:
+            self._string_char(c)
+            return
+        if self.token:
+            if c not in ',:}] \t\r\n':
+                self.token += c
+                return
+            self._end_token()
+        if c in ' \t\r\n':
+            return
+        if not self.started:
+            # Anything before the object, like a code fence or a preamble
+            if c == '{':
+                self.started = True
+                self.out.append(c)
+                self.stack.append([c, KEY])
+                self._mark_cut()
+            return
+        state = self.stack[-1][1]
+        if c in '{[':
+            if not self._expects_value():
+                self.repaired = True
+                return
+            self.out.append(c)
+            self.stack.append([c, KEY if c == '{' else VALUE])
+            self._mark_cut()
+        elif c in '}]':
+            opener = self.stack[-1][0]
+            if CLOSERS[opener] != c:
+                self.repaired = True
+                return
+            if self.out[-1] == ',':
+                self.out.pop()
+                self.repaired = True
+            elif state == COLON:
+                self.out.append(':null')
+                self.repaired = True
+            elif state == VALUE and opener == '{':
+                self.out.append('null')
+                self.repaired = True
+            self.out.append(c)
+            self.stack.pop()
+            self._value_done()
+        elif c == ',':
+            if state == COMMA:
+                self.out.append(c)
+                self.stack[-1][1] = KEY if self.stack[-1][0] == '{' else VALUE
+            else:
+                self.repaired = True
+        elif c == ':':
+            if state == COLON:
+                self.out.append(c)
+                self.stack[-1][1] = VALUE
+            else:
+                self.repaired = True
+        elif c == '"':
+            if state not in (KEY, VALUE):
+                self.repaired = True
+                return
+            self.in_string = True
+            self.string_is_key = state == KEY
+            self.out.append(c)
+        elif state == VALUE:
+            self.token = c
+        else:
+            self.repaired = True
+
+    def feed(self, text: str) -> None:
+        for c in text:
+            if self.done:
+                break
+            self._char(c)
+
+    def close(self) -> None:
+        """The text is complete: a number or literal at its very end is a whole value"""
+        if self.token and not self.in_string:
+            self._end_token()
+        if not self.done:
+            self.repaired = True
+
+    # Reading
+
+    @property
+    def value(self) -> Any:
+        """The object read so far, or None before it starts"""
+        if not self.started:
+            return None
+        if self.done:
+            text = "".join(self.out)
+        elif self.in_string and not self.string_is_key:
+            # Show a string value as far as it has arrived
+            text = "".join(self.out) + '"' + self._closers()
+        else:
+            length, closers = self.cut
+            text = "".join(self.out[:length]) + closers
+        return json.loads(text)
+
+def _score(value: Any) -> Optional[float]:
+    """A 0-100 score from a number or text like "85/100"; None if there is none"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        match = LEADING_NUMBER.match(value)
+        value = float(match.group(1)) if match else None
+    if isinstance(value, (int, float)) and 0 <= value <= 100:
+        return float(value)
+    return None
+
+def _criterion_name(name: Any) -> str:
+    return "_".join(str(name).lower().split())
+
+def _criteria(value: Any) -> List[CriterionScore]:
+    """Criteria as a list of objects, or as an object keyed by name"""
+    if isinstance(value, dict):
+        value = [
+            {'name': name, **(entry if isinstance(entry, dict) else {'score': entry})}
+            for name, entry in value.items()
+        ]
+    criteria = []
+    for entry in value if isinstance(value, list) else []:
+        if not isinstance(entry, dict) or entry.get('name') is None:
+            continue
+        feedback = entry.get('feedback')
+        criteria.append(CriterionScore(
+            name=_criterion_name(entry['name']),
+            score=_score(entry.get('score')),
+            feedback=str(feedback) if feedback is not None else None,
+        ))
+    return criteria
+
+def weighted_score(criteria: List[CriterionScore]) -> Optional[float]:
+    """The overall score from the criteria's weights, once every criterion is scored"""
+    scores = {criterion.name: criterion.score for criterion in criteria}
+    if any(scores.get(name) is None for name in CRITERIA):
+        return None
+    return round(sum(scores[name] * weight for name, weight in CRITERIA.items()), 2)
+
+def to_evaluation(value: Any, complete: bool) -> Optional[JudgeEvaluation]:
+    """Map a (possibly partial or repaired) judge reply onto the schema; None if nothing in it fits"""
+    if not isinstance(value, dict):
+        return None
+    criteria = _criteria(value.get('criteria'))
+    score = _score(value.get('score'))
+    summary = value.get('summary')
+    if score is None:
+        score = weighted_score(criteria)
+    try:
+        return JudgeEvaluation(
+            criteria=criteria,
+            score=score,
+            summary=str(summary) if summary is not None else None,
+            complete=complete and score is not None,
+        )
+    except ValidationError:
+        return None
+
+def parse_evaluation(text: str) -> Optional[JudgeEvaluation]:
+    """A whole judge reply, repaired where needed; None if no evaluation can be read from it"""
+    parser = PartialJSON()
+    parser.feed(text)
+    parser.close()
+    evaluation = to_evaluation(parser.value, not parser.repaired)
+    if evaluation is None or (not evaluation.criteria and evaluation.score is None):
+        return None
+    return evaluation
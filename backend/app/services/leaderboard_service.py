@@ -7,14 +7,48 @@ from ..schemas.leaderboard import (
     LeaderboardResponse,
     GlobalLeaderboard,
     ChallengeLeaderboard,
-    LeaderboardEntry
+    LeaderboardEntry,
+    ScoreRollbackResponse
 )
+from ..core.config import settings
+from ..core.fast_json import EncodedPayload, RowEncoder
+from ..core.shared_cache import shared_cache
 from ..db.supabase_client import supabase
+from ..models.lifecycle import FREEZE_SCORES
+from .achievement_engine import achievement_engine, SCORE_IMPROVED
+from .score_trajectory import score_trajectory_store
+from .team_leaderboard import team_leaderboard
 import logging
 
 logger = logging.getLogger(__name__)
 
+ENTRY_ROWS = RowEncoder(LeaderboardEntry)
+# Shared cache keys of the serialized boards
+GLOBAL_BOARD_KEY = "leaderboard:global"
+CHALLENGE_BOARD_KEY = "leaderboard:challenge:{}"
+
+# Challenges known to be frozen; a freeze is never lifted, so this only grows
+_frozen_challenges: set = set()
+
 class LeaderboardService:
+    @staticmethod
+    def freeze(challenge_id: str) -> None:
+        """Stop accepting scores for a challenge in this worker (the lifecycle scheduler stores it for the others)"""
+        _frozen_challenges.add(str(challenge_id))
+
+    @staticmethod
+    def is_frozen(challenge_id: str) -> bool:
+        """Whether the challenge's freeze_scores transition has fired"""
+        challenge_id = str(challenge_id)
+        if challenge_id in _frozen_challenges:
+            return True
+        response = supabase.select(
+            'challenge_lifecycle_events', 'event', {'challenge_id': challenge_id, 'event': FREEZE_SCORES}
+        )
+        if response.data:
+            _frozen_challenges.add(challenge_id)
+        return bool(response.data)
+
     @staticmethod
     async def get_global_leaderboard_data() -> LeaderboardResponse:
         """Fetch global leaderboard data"""
@@ -64,6 +98,7 @@ class LeaderboardService:
 
             scores = [
                 LeaderboardEntry(
+                    user_id=entry.get('user_id'),
                     username=entry['username'],
                     score=entry['score'],
                     rank=idx + 1,
@@ -86,10 +121,68 @@ class LeaderboardService:
                 detail=f"Failed to fetch challenge leaderboard: {str(e)}"
             )
 
+    @staticmethod
+    def _ranked_payload(rows: List[dict], key: str, extra: dict) -> EncodedPayload:
+        for idx, row in enumerate(rows):
+            row['rank'] = idx + 1
+        return EncodedPayload.of({'success': True, 'data': {**extra, key: ENTRY_ROWS.rows(rows), 'as_of': None}})
+
+    @staticmethod
+    def _shared_payload(key: str, build) -> EncodedPayload:
+        """A board serialized by any worker within SHARED_CACHE_LEADERBOARD_TTL_SECONDS, else `build()`, shared"""
+        body = shared_cache.get(key)
+        if body is not None:
+            return EncodedPayload(body)
+        payload = build()
+        shared_cache.set(key, payload.body, settings.SHARED_CACHE_LEADERBOARD_TTL_SECONDS)
+        return payload
+
+    @staticmethod
+    def invalidate_boards(challenge_ids) -> None:
+        """Drop the serialized global board and those of `challenge_ids` in every worker"""
+        shared_cache.delete(GLOBAL_BOARD_KEY)
+        for challenge_id in challenge_ids:
+            shared_cache.delete(CHALLENGE_BOARD_KEY.format(challenge_id))
+
+    @staticmethod
+    async def get_global_leaderboard_payload() -> EncodedPayload:
+        """The global leaderboard as JSON bytes shaped like `LeaderboardResponse`, without a model per entry"""
+        try:
+            def build() -> EncodedPayload:
+                rows = supabase.get_global_leaderboard().data or []
+                return LeaderboardService._ranked_payload(rows, 'entries', {})
+
+            return LeaderboardService._shared_payload(GLOBAL_BOARD_KEY, build)
+        except Exception as e:
+            logger.error(f"Failed to fetch global leaderboard: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to fetch global leaderboard: {str(e)}"
+            )
+
+    @staticmethod
+    async def get_challenge_leaderboard_payload(challenge_id: str) -> EncodedPayload:
+        """A challenge's leaderboard as JSON bytes shaped like `LeaderboardResponse`, without a model per entry"""
+        try:
+            def build() -> EncodedPayload:
+                rows = supabase.get_challenge_leaderboard(challenge_id).data or []
+                return LeaderboardService._ranked_payload(rows, 'scores', {'challenge_id': challenge_id})
+
+            return LeaderboardService._shared_payload(CHALLENGE_BOARD_KEY.format(challenge_id), build)
+        except Exception as e:
+            logger.error(f"Failed to fetch challenge leaderboard: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to fetch challenge leaderboard: {str(e)}"
+            )
+
     @staticmethod
     async def update_score(score_data: ScoreHistoryCreate) -> ScoreUpdateResponse:
         """Update user's score for a challenge"""
         try:
+            if LeaderboardService.is_frozen(score_data.challenge_id):
+                raise HTTPException(status_code=409, detail="Scores for this challenge are frozen")
+
             # First, try to get existing score
             existing_score = supabase.select(
                 'score_history',
@@ -136,12 +229,25 @@ class LeaderboardService:
                     detail="Failed to update score"
                 )
 
+            LeaderboardService.invalidate_boards([score_data.challenge_id])
+
             # Get updated rank
             new_rank = LeaderboardService._calculate_rank(
                 score_data.challenge_id,
                 score_data.user_id
             )
 
+            await score_trajectory_store.record(score_data.challenge_id, score_data.user_id, score_data.score)
+            await team_leaderboard.record(score_data.challenge_id, score_data.user_id, score_data.score)
+            achievement_engine.publish(
+                SCORE_IMPROVED,
+                score_data.user_id,
+                challenge_id=score_data.challenge_id,
+                score=score_data.score,
+                previous=existing_score.data[0]['score'] if existing_score.data else None,
+                rank=new_rank
+            )
+
             return ScoreUpdateResponse(
                 success=True,
                 message="Score updated successfully",
@@ -149,6 +255,8 @@ class LeaderboardService:
                 rank=new_rank
             )
 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Failed to update score: {str(e)}")
             raise HTTPException(
@@ -193,28 +301,37 @@ class LeaderboardService:
             )
 
     @staticmethod
-    async def delete_score(user_id: str, date: datetime) -> dict:
-        """Delete a user's score after a specific date"""
+    async def rollback_scores(
+        user_ids: List[str],
+        after: datetime,
+        challenge_id: Optional[str] = None
+    ) -> ScoreRollbackResponse:
+        """Delete several users' scores recorded after a date, in one statement"""
         try:
-            response = supabase.delete(
-                'score_history',
-                {
-                    'user_id': user_id,
-                    'last_updated': {'gt': date.isoformat()}
-                }
+            response = supabase.rollback_scores(user_ids, after.isoformat(), challenge_id)
+            removed = response.data or []
+            LeaderboardService.invalidate_boards({row['challenge_id'] for row in removed})
+            for rolled_back in sorted({row['challenge_id'] for row in removed}):
+                await team_leaderboard.rebuild(rolled_back)
+            return ScoreRollbackResponse(
+                success=True,
+                deleted=sum(row['removed_rows'] for row in removed),
+                removed=removed
             )
-
-            if not response.data:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Failed to delete score"
-                )
-
-            return {"message": "Score deleted successfully"}
-
         except Exception as e:
-            logger.error(f"Failed to delete score: {str(e)}")
+            logger.error(f"Failed to roll back scores: {str(e)}")
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to roll back scores: {str(e)}"
+            )
+
+    @staticmethod
+    async def delete_score(user_id: str, date: datetime) -> dict:
+        """Delete a user's score after a specific date"""
+        result = await LeaderboardService.rollback_scores([user_id], date)
+        if not result.deleted:
             raise HTTPException(
                 status_code=400,
-                detail=f"Failed to delete score: {str(e)}"
+                detail="Failed to delete score"
             )
+        return {"message": "Score deleted successfully"}
@@ -0,0 +1,227 @@
+import asyncio
+import bisect
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..core.fast_json import EncodedPayload, RowEncoder
+from ..db.supabase_client import supabase
+from ..schemas.leaderboard import ChallengeLeaderboard, GlobalLeaderboard, LeaderboardEntry, LeaderboardResponse
+
+logger = logging.getLogger(__name__)
+
+GLOBAL = "global"
+
+SCHEMA = pa.schema([
+    ('rank', pa.int32()),
+    ('user_id', pa.string()),
+    ('username', pa.string()),
+    ('score', pa.int64()),
+    ('last_updated', pa.timestamp('ms', tz='UTC')),
+])
+# Global boards have no user ids, so reading one skips that column
+CHALLENGE_COLUMNS = ['rank', 'user_id', 'username', 'score', 'last_updated']
+GLOBAL_COLUMNS = ['rank', 'username', 'score', 'last_updated']
+
+# Encoded responses kept; snapshots never change, so they never go stale
+PAYLOAD_CACHE_SIZE = 64
+
+_SAFE_ID = re.compile(r"[\w-]+")
+_ENTRY_ROWS = RowEncoder(LeaderboardEntry)
+
+def _epoch_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+def _timestamp(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+class LeaderboardSnapshots:
+    """Immutable point-in-time leaderboards, one Parquet file per board and moment.
+
+    The global board and every running challenge's board are written every
+    ``LEADERBOARD_SNAPSHOT_INTERVAL_SECONDS``, named by the interval
+    boundary, and each challenge's final board is written at its end. Files
+    are created with a hard link from a temporary file, so a snapshot is
+    never overwritten: a second worker taking the same one is a no-op.
+
+    "The ranking at time T" is the latest snapshot taken at or before T. It
+    is found by file name and read memory-mapped, projecting only the
+    columns the response needs.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.LEADERBOARD_SNAPSHOT_PATH,
+        interval: int = settings.LEADERBOARD_SNAPSHOT_INTERVAL_SECONDS,
+        storage=None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.interval = interval
+        self.storage = storage or supabase
+        self.clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self._payloads: "OrderedDict[str, EncodedPayload]" = OrderedDict()
+
+    def _dir(self, challenge_id: Optional[str]) -> str:
+        if challenge_id is None:
+            return os.path.join(self.path, GLOBAL)
+        if not _SAFE_ID.fullmatch(challenge_id):
+            raise HTTPException(status_code=404, detail="Snapshot not found")
+        return os.path.join(self.path, "challenges", challenge_id)
+
+    # Writing
+
+    def _write(self, challenge_id: Optional[str], taken_at_ms: int, rows: List[dict]) -> bool:
+        """Store a board as ranked; False if this snapshot already exists"""
+        directory = self._dir(challenge_id)
+        final_path = os.path.join(directory, f"{taken_at_ms:013d}.parquet")
+        if os.path.exists(final_path):
+            return False
+        table = pa.Table.from_pydict({
+            'rank': list(range(1, len(rows) + 1)),
+            'user_id': [str(row['user_id']) if row.get('user_id') else None for row in rows],
+            'username': [row['username'] for row in rows],
+            'score': [int(row['score']) for row in rows],
+            'last_updated': [_timestamp(row.get('last_updated')) for row in rows],
+        }, schema=SCHEMA)
+
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_path, compression='zstd')
+            os.link(tmp_path, final_path)
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp_path)
+        return True
+
+    def snapshot_challenge(self, challenge_id: str, taken_at_ms: int) -> bool:
+        rows = self.storage.get_challenge_leaderboard(str(challenge_id)).data or []
+        return self._write(str(challenge_id), taken_at_ms, rows)
+
+    def snapshot_global(self, taken_at_ms: int) -> bool:
+        rows = self.storage.get_global_leaderboard().data or []
+        return self._write(None, taken_at_ms, rows)
+
+    def take_due(self) -> int:
+        """Snapshot the global board and every challenge running now at the current interval boundary; returns how many were written"""
+        now_ms = int(self.clock() * 1000)
+        taken_at_ms = now_ms - now_ms % (self.interval * 1000)
+        written = int(self.snapshot_global(taken_at_ms))
+        challenges = self.storage.select('challenges', 'id,start_time,end_time').data or []
+        for challenge in challenges:
+            start, end = _timestamp(challenge.get('start_time')), _timestamp(challenge.get('end_time'))
+            if start is not None and _epoch_ms(start) > now_ms:
+                continue
+            if end is not None and _epoch_ms(end) < taken_at_ms:
+                # Ended; its final board was taken at the end
+                continue
+            try:
+                written += self.snapshot_challenge(str(challenge['id']), taken_at_ms)
+            except Exception as e:
+                logger.error(f"Failed to snapshot leaderboard of challenge {challenge['id']}: {str(e)}")
+        return written
+
+    async def snapshot_final(self, challenge: dict) -> None:
+        """Snapshot a challenge's board as of its end"""
+        end = _timestamp(challenge.get('end_time'))
+        taken_at_ms = _epoch_ms(end) if end is not None else int(self.clock() * 1000)
+        await asyncio.to_thread(self.snapshot_challenge, str(challenge['id']), taken_at_ms)
+
+    async def _snapshot_loop(self) -> None:
+        while True:
+            now = self.clock()
+            await asyncio.sleep(self.interval - now % self.interval)
+            try:
+                await asyncio.to_thread(self.take_due)
+            except Exception as e:
+                logger.error(f"Leaderboard snapshot failed: {str(e)}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._snapshot_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # Reading
+
+    def _find(self, challenge_id: Optional[str], at: datetime) -> Tuple[str, datetime]:
+        """Path and time of the latest snapshot taken at or before `at`"""
+        directory = self._dir(challenge_id)
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith(".parquet"))
+        except FileNotFoundError:
+            names = []
+        index = bisect.bisect_right(names, f"{_epoch_ms(at):013d}.parquet") - 1
+        if index < 0:
+            raise HTTPException(status_code=404, detail="No leaderboard snapshot at or before that time")
+        taken_at = datetime.fromtimestamp(int(names[index].split(".")[0]) / 1000, tz=timezone.utc)
+        return os.path.join(directory, names[index]), taken_at
+
+    def _read(self, challenge_id: Optional[str], at: datetime) -> Tuple[datetime, List[dict]]:
+        path, taken_at = self._find(challenge_id, at)
+        columns = GLOBAL_COLUMNS if challenge_id is None else CHALLENGE_COLUMNS
+        return taken_at, pq.read_table(path, columns=columns, memory_map=True).to_pylist()
+
+    def _encode(self, challenge_id: Optional[str], at: datetime) -> EncodedPayload:
+        path, taken_at = self._find(challenge_id, at)
+        payload = self._payloads.get(path)
+        if payload is not None:
+            self._payloads.move_to_end(path)
+            return payload
+        _, rows = self._read(challenge_id, taken_at)
+        if challenge_id is None:
+            data = {'entries': _ENTRY_ROWS.rows(rows), 'as_of': taken_at}
+        else:
+            data = {'challenge_id': challenge_id, 'scores': _ENTRY_ROWS.rows(rows), 'as_of': taken_at}
+        payload = EncodedPayload.of({'success': True, 'data': data})
+        self._payloads[path] = payload
+        while len(self._payloads) > PAYLOAD_CACHE_SIZE:
+            self._payloads.popitem(last=False)
+        return payload
+
+    async def payload_at(self, challenge_id: Optional[str], at: datetime) -> EncodedPayload:
+        """Like `challenge_at` (or `global_at` without a challenge) as JSON bytes, encoded once per snapshot"""
+        return await asyncio.to_thread(self._encode, str(challenge_id) if challenge_id is not None else None, at)
+
+    async def challenge_at(self, challenge_id: str, at: datetime) -> LeaderboardResponse:
+        """The challenge's ranking as of the latest snapshot taken at or before `at`"""
+        taken_at, rows = await asyncio.to_thread(self._read, str(challenge_id), at)
+        return LeaderboardResponse(
+            success=True,
+            data=ChallengeLeaderboard(
+                challenge_id=str(challenge_id),
+                scores=[LeaderboardEntry(**row) for row in rows],
+                as_of=taken_at
+            )
+        )
+
+    async def global_at(self, at: datetime) -> LeaderboardResponse:
+        """The global ranking as of the latest snapshot taken at or before `at`"""
+        taken_at, rows = await asyncio.to_thread(self._read, None, at)
+        return LeaderboardResponse(
+            success=True,
+            data=GlobalLeaderboard(entries=[LeaderboardEntry(**row) for row in rows], as_of=taken_at)
+        )
+
+leaderboard_snapshots = LeaderboardSnapshots()
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+from ..models.lifecycle import FINAL_RANKING, FREEZE_SCORES, OPEN_ENROLLMENTS
+from .challenge_catalog import challenge_catalog
+from .leaderboard_service import LeaderboardService
+from .leaderboard_snapshots import leaderboard_snapshots
+from .timer_wheel import Timer, TimerWheel
+
+logger = logging.getLogger(__name__)
+
+# Same-moment transitions fire in this order
+EVENTS = (OPEN_ENROLLMENTS, FREEZE_SCORES, FINAL_RANKING)
+
+LEASE_NAME = "challenge_lifecycle"
+# A transition whose claim failed (storage error, not a conflict) is retried this much later
+CLAIM_RETRY_MS = 5000
+
+Hook = Callable[[dict], Awaitable[None]]
+
+def _epoch_ms(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+def lifecycle_deadlines(challenge: dict, freeze_minutes: int) -> List[Tuple[str, int]]:
+    """(event, epoch ms) for each transition a challenge's times imply"""
+    start, end = _epoch_ms(challenge.get('start_time')), _epoch_ms(challenge.get('end_time'))
+    deadlines = []
+    if start is not None:
+        deadlines.append((OPEN_ENROLLMENTS, start))
+    if end is not None:
+        freeze = end - freeze_minutes * 60_000
+        deadlines.append((FREEZE_SCORES, max(freeze, start) if start is not None else freeze))
+        deadlines.append((FINAL_RANKING, end))
+    return deadlines
+
+class LifecycleScheduler:
+    """Fires challenge lifecycle hooks at start, leaderboard freeze and end.
+
+    The deadlines of every challenge that has not finished live in a
+    hierarchical timer wheel, loaded from the ``challenges`` table, so the
+    database is not polled per deadline. Challenges created or changed later
+    are picked up by a periodic scan of recently written rows.
+
+    Only the worker holding the ``scheduler_leases`` row runs the wheel; the
+    lease is renewed while it runs, and another worker takes over once it
+    lapses. Each transition is recorded in ``challenge_lifecycle_events``
+    before its hooks run, so it fires at most once across workers and
+    restarts, and transitions missed while no worker was leader are fired on
+    the next load.
+    """
+
+    def __init__(
+        self,
+        storage=None,
+        tick_ms: int = settings.SCHEDULER_TICK_MS,
+        lease_seconds: int = settings.SCHEDULER_LEASE_SECONDS,
+        rescan_seconds: int = settings.SCHEDULER_RESCAN_SECONDS,
+        catch_up_hours: int = settings.SCHEDULER_CATCH_UP_HOURS,
+        freeze_minutes: int = settings.LEADERBOARD_FREEZE_MINUTES,
+        clock: Callable[[], float] = time.time
+    ):
+        self.storage = storage or supabase
+        self.tick_ms = tick_ms
+        self.lease_seconds = lease_seconds
+        self.rescan_seconds = rescan_seconds
+        self.catch_up_hours = catch_up_hours
+        self.freeze_minutes = freeze_minutes
+        self.clock = clock
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.hooks: Dict[str, List[Hook]] = defaultdict(list)
+        self.wheel: Optional[TimerWheel] = None
+        self._timers: Dict[str, List[Timer]] = {}
+        self._challenges: Dict[str, dict] = {}
+        self._last_scan: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def on(self, event: str, hook: Optional[Hook] = None):
+        """Register an async ``hook(challenge)`` for an event; usable as a decorator"""
+        if event not in EVENTS:
+            raise ValueError(f"Unknown lifecycle event: {event}")
+        if hook is None:
+            return lambda fn: self.on(event, fn)
+        self.hooks[event].append(hook)
+        return hook
+
+    @property
+    def is_leader(self) -> bool:
+        return self.wheel is not None
+
+    def _now(self) -> datetime:
+        return datetime.fromtimestamp(self.clock(), timezone.utc)
+
+    # Lease
+
+    def _acquire_lease(self) -> bool:
+        """Renew our lease, take over an expired one, or create it; True if we hold it"""
+        now = self._now()
+        lease = {'holder': self.holder, 'expires_at': (now + timedelta(seconds=self.lease_seconds)).isoformat()}
+        if self.storage.update('scheduler_leases', lease, {'name': LEASE_NAME, 'holder': self.holder}).data:
+            return True
+        if self.storage.update(
+            'scheduler_leases', lease, {'name': LEASE_NAME, 'expires_at': {'lt': now.isoformat()}}
+        ).data:
+            return True
+        if self.storage.select('scheduler_leases', 'name', {'name': LEASE_NAME}).data:
+            return False
+        try:
+            self.storage.insert('scheduler_leases', {'name': LEASE_NAME, **lease})
+            return True
+        except Exception:
+            # Another worker created it first
+            return False
+
+    def _release_lease(self) -> None:
+        self.storage.update(
+            'scheduler_leases',
+            {'expires_at': self._now().isoformat()},
+            {'name': LEASE_NAME, 'holder': self.holder}
+        )
+
+    # Loading
+
+    def _load(self) -> None:
+        """Build the wheel from every challenge that ended within the catch-up window or later"""
+        now = self._now()
+        self.wheel = TimerWheel(int(self.clock() * 1000), self.tick_ms)
+        self._timers.clear()
+        self._challenges.clear()
+        self._last_scan = now
+        cutoff = (now - timedelta(hours=self.catch_up_hours)).isoformat()
+        by_id = {}
+        # Open-ended challenges (no end_time) are found by their start
+        for column in ('end_time', 'start_time'):
+            response = self.storage.select('challenges', '*', {column: {'gte': cutoff}})
+            by_id.update({str(row['id']): row for row in (response.data or [])})
+        challenges = list(by_id.values())
+        fired = self._fired([str(challenge['id']) for challenge in challenges])
+        for challenge in challenges:
+            self._schedule(challenge, fired)
+        logger.info(f"Lifecycle scheduler loaded {self.wheel.pending} transitions of {len(challenges)} challenges")
+
+    def _fired(self, challenge_ids: List[str]) -> set:
+        fired = set()
+        for start in range(0, len(challenge_ids), IN_FILTER_CHUNK):
+            response = self.storage.select(
+                'challenge_lifecycle_events',
+                'challenge_id,event',
+                {'challenge_id': {'in': challenge_ids[start:start + IN_FILTER_CHUNK]}}
+            )
+            fired.update((row['challenge_id'], row['event']) for row in (response.data or []))
+        return fired
+
+    def _schedule(self, challenge: dict, fired: set) -> None:
+        challenge_id = str(challenge['id'])
+        for timer in self._timers.pop(challenge_id, []):
+            self.wheel.cancel(timer)
+        self._challenges[challenge_id] = challenge
+        timers = []
+        for event, deadline in lifecycle_deadlines(challenge, self.freeze_minutes):
+            if (challenge_id, event) not in fired:
+                timers.append(self.wheel.schedule(deadline, (deadline, EVENTS.index(event), challenge_id, event)))
+        if timers:
+            self._timers[challenge_id] = timers
+
+    def _rescan(self) -> None:
+        """Reschedule challenges created or updated since the last scan"""
+        since = (self._last_scan - timedelta(seconds=self.lease_seconds)).isoformat()
+        self._last_scan = self._now()
+        changed = {}
+        for column in ('created_at', 'updated_at'):
+            response = self.storage.select('challenges', '*', {column: {'gte': since}})
+            changed.update({str(row['id']): row for row in (response.data or [])})
+        if not changed:
+            return
+        fired = self._fired(list(changed))
+        for challenge in changed.values():
+            self._schedule(challenge, fired)
+
+    # Firing
+
+    def _claim(self, challenge_id: str, event: str) -> bool:
+        """Record the transition; False if some worker already fired it.
+
+        Storage errors propagate: only an existing row means the transition fired.
+        """
+        response = self.storage.insert_ignore(
+            'challenge_lifecycle_events', {'challenge_id': challenge_id, 'event': event}
+        )
+        return bool(response.data)
+
+    async def fire_due(self) -> int:
+        """Run the hooks of every transition that is due; returns how many fired"""
+        now_ms = int(self.clock() * 1000)
+        due = sorted(self.wheel.advance(now_ms), key=lambda item: item[:2])
+        fired = 0
+        for item in due:
+            _, _, challenge_id, event = item
+            challenge = self._challenges.get(challenge_id, {'id': challenge_id})
+            try:
+                claimed = await asyncio.to_thread(self._claim, challenge_id, event)
+            except Exception as e:
+                logger.error(f"Failed to record {event} of challenge {challenge_id}, retrying: {str(e)}")
+                self._timers.setdefault(challenge_id, []).append(self.wheel.schedule(now_ms + CLAIM_RETRY_MS, item))
+                continue
+            if event == FINAL_RANKING:
+                self._timers.pop(challenge_id, None)
+                self._challenges.pop(challenge_id, None)
+            if not claimed:
+                continue
+            fired += 1
+            logger.info(f"Challenge {challenge_id}: {event}")
+            for hook in self.hooks[event]:
+                try:
+                    await hook(challenge)
+                except Exception as e:
+                    logger.error(f"Lifecycle hook {event} failed for challenge {challenge_id}: {str(e)}")
+        return fired
+
+    # Running
+
+    async def step(self) -> None:
+        """Check the lease, then fire what is due if we are the leader"""
+        leader = await asyncio.to_thread(self._acquire_lease)
+        if leader and self.wheel is None:
+            await asyncio.to_thread(self._load)
+        elif not leader and self.wheel is not None:
+            logger.warning("Lost the lifecycle scheduler lease; another worker took over")
+            self.wheel = None
+        if self.wheel is not None:
+            await self.fire_due()
+
+    async def run(self) -> None:
+        renew_every = self.lease_seconds / 3
+        last_renew = last_rescan = 0.0
+        while True:
+            try:
+                now = time.monotonic()
+                if now - last_renew >= renew_every:
+                    await self.step()
+                    last_renew = now
+                elif self.wheel is not None:
+                    await self.fire_due()
+                if self.wheel is not None and now - last_rescan >= self.rescan_seconds:
+                    if last_rescan:
+                        await asyncio.to_thread(self._rescan)
+                    last_rescan = now
+            except Exception as e:
+                logger.error(f"Lifecycle scheduler error: {str(e)}")
+            await asyncio.sleep(self.tick_ms / 1000)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.wheel is not None:
+            self.wheel = None
+            await asyncio.to_thread(self._release_lease)
+
+lifecycle_scheduler = LifecycleScheduler()
+
+@lifecycle_scheduler.on(OPEN_ENROLLMENTS)
+async def refresh_catalog_on_open(challenge: dict) -> None:
+    challenge_catalog.invalidate()
+
+@lifecycle_scheduler.on(FREEZE_SCORES)
+async def freeze_leaderboard(challenge: dict) -> None:
+    LeaderboardService.freeze(str(challenge['id']))
+
+@lifecycle_scheduler.on(FINAL_RANKING)
+async def publish_final_ranking(challenge: dict) -> None:
+    challenge_catalog.invalidate()
+    ranking = await LeaderboardService.get_challenge_leaderboard(str(challenge['id']))
+    logger.info(f"Final ranking of challenge {challenge['id']}: {len(ranking.data.scores)} participants")
+
+@lifecycle_scheduler.on(FINAL_RANKING)
+async def snapshot_final_ranking(challenge: dict) -> None:
+    await leaderboard_snapshots.snapshot_final(challenge)
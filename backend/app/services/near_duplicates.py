@@ -0,0 +1,87 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Mersenne prime; hashes are reduced below it so a * hash + b fits in 64 bits
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+
+def shingles(text: str, size: int = 3) -> Set[int]:
+    """Hashed word n-grams of a text, lowercased and stripped of punctuation"""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode()) % _PRIME
+        for i in range(len(words) - size + 1)
+    }
+
+class MinHashLSH:
+    """Near-duplicate lookup over MinHash signatures with banded LSH.
+
+    A signature keeps, for each of ``bands * rows`` random hash functions,
+    the smallest hash of the text's shingles; two signatures agree in a slot
+    with probability equal to the Jaccard similarity of the shingle sets.
+    Signatures are cut into ``bands`` bands of ``rows`` slots and each band is
+    a bucket key, so only texts sharing a whole band are compared. With the
+    defaults (16 x 8) a pair at similarity 0.8 becomes a candidate with
+    probability ~0.95 and one at 0.4 with ~0.01. Candidates are then kept
+    only if their estimated similarity reaches ``threshold``.
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 8, threshold: float = 0.8, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        permutations = bands * rows
+        self._a = rng.integers(1, _PRIME, permutations, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, permutations, dtype=np.uint64)
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [defaultdict(set) for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> List[int]:
+        hashes = np.fromiter(shingles(text), dtype=np.uint64)
+        values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(_PRIME)
+        return values.min(axis=1).tolist()
+
+    def _bands(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: str, signature: List[int]) -> None:
+        signature = np.asarray(signature, dtype=np.uint64)
+        self.remove(key)
+        self._signatures[key] = signature
+        for band, bucket in self._bands(signature):
+            self._buckets[band][bucket].add(key)
+
+    def remove(self, key: str) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, bucket in self._bands(signature):
+            keys = self._buckets[band].get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[band][bucket]
+
+    def nearest(self, signature: List[int]) -> Optional[Tuple[str, float]]:
+        """The most similar indexed key at or above the threshold, with its estimated similarity"""
+        signature = np.asarray(signature, dtype=np.uint64)
+        candidates = set()
+        for band, bucket in self._bands(signature):
+            candidates.update(self._buckets[band].get(bucket, ()))
+        best = None
+        for key in candidates:
+            similarity = float((self._signatures[key] == signature).mean())
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
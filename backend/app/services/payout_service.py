@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import math
+from typing import List, Tuple
+
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+from ..schemas.payout import PayoutResult, PayoutSchedule
+from ..schemas.wallet import TransactionCreate, TransactionType
+from .leaderboard_service import LeaderboardService
+from .wallet_ledger import wallet_ledger
+
+logger = logging.getLogger(__name__)
+
+def position_amounts(participants: int, schedule: PayoutSchedule) -> List[int]:
+    """Prize for each position 1..participants, from the first tier covering it"""
+    amounts = [0] * participants
+    assigned = [False] * participants
+    for tier in schedule.tiers:
+        if tier.top_percent is not None:
+            first, last = 1, math.ceil(participants * tier.top_percent / 100)
+        else:
+            first, last = tier.rank_from, tier.rank_to or tier.rank_from
+        for position in range(first - 1, min(last, participants)):
+            if not assigned[position]:
+                amounts[position] = tier.amount
+                assigned[position] = True
+    return amounts
+
+def compute_payouts(ranking: List[Tuple[str, int]], schedule: PayoutSchedule) -> List[Tuple[str, int]]:
+    """Credits per user for a final ranking of (user_id, score), best first.
+
+    Tied participants share the prizes of the positions they occupy equally;
+    the leftover minor units go one each to the first of them in ranking order.
+    """
+    amounts = position_amounts(len(ranking), schedule)
+    payouts = []
+    start = 0
+    while start < len(ranking):
+        end = start
+        while end < len(ranking) and ranking[end][1] == ranking[start][1]:
+            end += 1
+        share, remainder = divmod(sum(amounts[start:end]), end - start)
+        for offset, (user_id, _) in enumerate(ranking[start:end]):
+            amount = share + (1 if offset < remainder else 0)
+            if amount:
+                payouts.append((user_id, amount))
+        start = end
+    return payouts
+
+class PayoutService:
+    """End-of-challenge prize payout as one idempotent, resumable batch.
+
+    The first run computes the payouts from the final ranking and stores the
+    whole list, with its schedule, in ``payout_runs``; every later run pays
+    from that stored list, so new scores cannot shift a resumed run, and a
+    rerun with a different schedule is rejected. Every credit carries the
+    reference ``payout:<challenge>:<user>``, so re-posting is a no-op in the
+    ledger. Progress is checkpointed after each batch of
+    ``PAYOUT_BATCH_SIZE`` credits, and a completed run is never paid twice.
+    """
+
+    def __init__(self, ledger=None, leaderboard=None, storage=None, batch_size: int = settings.PAYOUT_BATCH_SIZE):
+        self.ledger = ledger or wallet_ledger
+        self.leaderboard = leaderboard or LeaderboardService
+        self.storage = storage or supabase
+        self.batch_size = batch_size
+
+    async def final_ranking(self, challenge_id: str) -> List[Tuple[str, int]]:
+        response = await self.leaderboard.get_challenge_leaderboard(challenge_id)
+        entries = [entry for entry in response.data.scores if entry.user_id]
+        # Deterministic order, so the same scores always give the same payouts
+        return sorted(((str(entry.user_id), entry.score) for entry in entries), key=lambda item: (-item[1], item[0]))
+
+    async def _start(self, challenge_id: str, schedule: PayoutSchedule) -> dict:
+        """The stored run for the challenge, computing and storing it on the first call"""
+        checkpoint = await asyncio.to_thread(self.storage.select, 'payout_runs', '*', {'challenge_id': challenge_id})
+        if checkpoint.data:
+            return checkpoint.data[0]
+
+        ranking = await self.final_ranking(challenge_id)
+        payouts = compute_payouts(ranking, schedule)
+        run = {
+            'challenge_id': challenge_id,
+            'status': "running",
+            'winners': len(payouts),
+            'posted': 0,
+            'total_amount': sum(amount for _, amount in payouts),
+            'participants': len(ranking),
+            'schedule': schedule.model_dump(mode="json"),
+            'payouts': [[user_id, amount] for user_id, amount in payouts],
+        }
+        created = await asyncio.to_thread(self.storage.insert_ignore, 'payout_runs', run)
+        if created.data:
+            return run
+        # Another run started at the same time; use the one it stored
+        checkpoint = await asyncio.to_thread(self.storage.select, 'payout_runs', '*', {'challenge_id': challenge_id})
+        return checkpoint.data[0]
+
+    async def run(self, challenge_id: str, schedule: PayoutSchedule) -> PayoutResult:
+        run = await self._start(challenge_id, schedule)
+        if run['schedule'] != schedule.model_dump(mode="json"):
+            raise HTTPException(
+                status_code=409,
+                detail="A payout with a different schedule was already started for this challenge"
+            )
+        result = PayoutResult(
+            challenge_id=challenge_id,
+            participants=run['participants'],
+            winners=run['winners'],
+            total_amount=run['total_amount'],
+            posted=run['posted'],
+            resumed_from=run['posted'] if run['status'] == "running" else 0,
+            status=run['status']
+        )
+        if run['status'] == "completed":
+            return result
+
+        payouts = [(user_id, amount) for user_id, amount in run['payouts']]
+        for start in range(run['posted'], len(payouts), self.batch_size):
+            batch = payouts[start:start + self.batch_size]
+            wallets = await self._wallets_for([user_id for user_id, _ in batch])
+            await self.ledger.post_many([
+                TransactionCreate(
+                    wallet_id=wallets[user_id],
+                    amount=amount,
+                    type=TransactionType.credit,
+                    reference=f"payout:{challenge_id}:{user_id}"
+                )
+                for user_id, amount in batch
+            ])
+            result.posted = start + len(batch)
+            await asyncio.to_thread(
+                self.storage.update, 'payout_runs', {'posted': result.posted}, {'challenge_id': challenge_id}
+            )
+            logger.info(f"Payout for challenge {challenge_id}: {result.posted}/{len(payouts)} credits posted")
+
+        await asyncio.to_thread(
+            self.storage.update, 'payout_runs', {'status': "completed"}, {'challenge_id': challenge_id}
+        )
+        result.status = "completed"
+        return result
+
+    async def _wallets_for(self, user_ids: List[str]) -> dict:
+        """Wallet id per user, creating missing wallets in one insert"""
+        wallets = {}
+        for start in range(0, len(user_ids), IN_FILTER_CHUNK):
+            response = await asyncio.to_thread(
+                self.storage.select,
+                'wallets',
+                'id,user_id',
+                {'user_id': {'in': user_ids[start:start + IN_FILTER_CHUNK]}}
+            )
+            wallets.update({row['user_id']: row['id'] for row in (response.data or [])})
+        missing = [user_id for user_id in user_ids if user_id not in wallets]
+        if missing:
+            created = await asyncio.to_thread(
+                self.storage.insert, 'wallets', [{'user_id': user_id} for user_id in missing]
+            )
+            wallets.update({row['user_id']: row['id'] for row in (created.data or [])})
+        if len(wallets) < len(set(user_ids)):
+            raise HTTPException(status_code=500, detail="Failed to resolve wallets for payout")
+        return wallets
+
+payout_service = PayoutService()
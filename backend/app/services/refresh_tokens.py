@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Tuple
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+
+from ..core.config import settings
+from ..db.supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+# Value of the `typ` claim; access tokens must not carry it
+REFRESH = "refresh"
+# Families revoked in this worker, remembered so their tokens are refused without a storage call
+REVOKED_CACHE_SIZE = 10000
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+class RefreshTokenStore:
+    """Rotating refresh tokens, renewed without calling Supabase auth.
+
+    A refresh token is a JWT signed like access tokens, with ``typ``
+    "refresh", naming its family (one per sign-in) and its own id. Renewal
+    checks the signature and expiry locally, then swaps the family's
+    ``current_jti`` for a new id in one conditional update, so each token
+    works exactly once. A token that was already rotated away has leaked or
+    been replayed: its whole family is revoked. A family lives
+    ``REFRESH_TOKEN_EXPIRE_DAYS`` from sign-in however often it is rotated.
+    """
+
+    def __init__(
+        self,
+        expire_days: int = settings.REFRESH_TOKEN_EXPIRE_DAYS,
+        storage=None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.expire_days = expire_days
+        self.storage = storage or supabase
+        self.clock = clock
+        self._revoked: "OrderedDict[str, None]" = OrderedDict()
+
+    def _encode(self, user_id: str, family: str, jti: str, expires_at: datetime) -> str:
+        claims = {'sub': user_id, 'fam': family, 'jti': jti, 'typ': REFRESH, 'exp': expires_at}
+        return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+    def _decode(self, token: str) -> dict:
+        try:
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            raise _unauthorized("Invalid refresh token")
+        if claims.get('typ') != REFRESH or not all(claims.get(key) for key in ('sub', 'fam', 'jti')):
+            raise _unauthorized("Invalid refresh token")
+        return claims
+
+    def _forget(self, family: str) -> None:
+        self._revoked[family] = None
+        while len(self._revoked) > REVOKED_CACHE_SIZE:
+            self._revoked.popitem(last=False)
+
+    async def issue(self, user_id: str) -> str:
+        """Start a family for a new sign-in and return its first refresh token"""
+        now = datetime.fromtimestamp(self.clock(), tz=timezone.utc)
+        family, jti = str(uuid.uuid4()), str(uuid.uuid4())
+        expires_at = now + timedelta(days=self.expire_days)
+        # The user's expired families are no longer needed
+        await asyncio.to_thread(
+            self.storage.delete, 'refresh_token_families', {'user_id': str(user_id), 'expires_at': {'lt': now.isoformat()}}
+        )
+        await asyncio.to_thread(self.storage.insert, 'refresh_token_families', {
+            'id': family,
+            'user_id': str(user_id),
+            'current_jti': jti,
+            'expires_at': expires_at.isoformat(),
+            'revoked': False,
+        })
+        return self._encode(str(user_id), family, jti, expires_at)
+
+    async def rotate(self, token: str) -> Tuple[str, str]:
+        """Spend a refresh token; returns its user id and the family's next refresh token"""
+        claims = self._decode(token)
+        family = claims['fam']
+        if family in self._revoked:
+            raise _unauthorized("Refresh token revoked")
+
+        next_jti = str(uuid.uuid4())
+        swapped = await asyncio.to_thread(
+            self.storage.update,
+            'refresh_token_families',
+            {'current_jti': next_jti},
+            {'id': family, 'current_jti': claims['jti'], 'revoked': False}
+        )
+        if swapped.data:
+            expires_at = datetime.fromtimestamp(claims['exp'], tz=timezone.utc)
+            return claims['sub'], self._encode(claims['sub'], family, next_jti, expires_at)
+
+        current = await asyncio.to_thread(
+            self.storage.select, 'refresh_token_families', 'current_jti,revoked', {'id': family}
+        )
+        if current.data and not current.data[0]['revoked']:
+            logger.warning(f"Refresh token reuse for family {family}; revoking it")
+            await asyncio.to_thread(self.storage.update, 'refresh_token_families', {'revoked': True}, {'id': family})
+        self._forget(family)
+        raise _unauthorized("Refresh token revoked")
+
+    async def revoke(self, token: str) -> None:
+        """End a sign-in: none of its refresh tokens work any more"""
+        claims = self._decode(token)
+        await asyncio.to_thread(
+            self.storage.update, 'refresh_token_families', {'revoked': True}, {'id': claims['fam']}
+        )
+        self._forget(claims['fam'])
+
+refresh_tokens = RefreshTokenStore()
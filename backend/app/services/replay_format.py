@@ -0,0 +1,259 @@
+"""Compact binary replay format with a keyframe seek index.
+
+A replay is a time-ordered list of events. In the text form each event is a
+JSON object with a millisecond timestamp ``t`` and the state fields that
+changed at that moment, e.g. ``{"t": 1200, "file": "main.py", "line": 12}``;
+the state at time T is every event up to T folded together.
+
+Binary layout (little-endian)::
+
+    header   magic "AHLR", version, keyframe interval, event count,
+             segment count, duration                          (24 bytes)
+    index    per segment: start time, byte offset, byte length  (20 bytes each)
+    segments zlib-compressed, each holding
+               keyframe  full state before the segment's first event
+               events    varint time delta + changed fields only
+
+Seeking to T reads the header and index, picks the segment whose start time
+is the last one <= T, and decodes that keyframe plus the deltas up to T.
+"""
+import bisect
+import struct
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+MAGIC = b"AHLR"
+VERSION = 1
+DEFAULT_KEYFRAME_INTERVAL = 256
+COMPRESSION_LEVEL = 6
+
+HEADER = struct.Struct("<4sBBHIIQ")
+INDEX_ENTRY = struct.Struct("<QQI")
+
+class ReplayFormatError(ValueError):
+    """Raised when bytes are not a valid binary replay"""
+
+class ReplayHeader:
+    def __init__(
+        self,
+        keyframe_interval: int,
+        event_count: int,
+        duration: int,
+        index: List[Tuple[int, int, int]]
+    ):
+        self.keyframe_interval = keyframe_interval
+        self.event_count = event_count
+        self.duration = duration
+        # (start time, offset, length) per segment, sorted by start time
+        self.index = index
+        self._starts = [start for start, _, _ in index]
+
+    @property
+    def size(self) -> int:
+        """Bytes taken by the header and index, i.e. where segment data begins"""
+        return HEADER.size + INDEX_ENTRY.size * len(self.index)
+
+    def segment_for(self, t: int) -> Optional[int]:
+        """Index of the segment holding time ``t``, or None if ``t`` is before the first event"""
+        position = bisect.bisect_right(self._starts, t) - 1
+        return position if position >= 0 else None
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+def _write_blob(out: bytearray, value: Dict[str, Any]) -> None:
+    if not value:
+        _write_varint(out, 0)
+        return
+    encoded = orjson.dumps(value)
+    _write_varint(out, len(encoded))
+    out += encoded
+
+def _read_blob(data: bytes, pos: int) -> Tuple[Dict[str, Any], int]:
+    length, pos = _read_varint(data, pos)
+    if not length:
+        return {}, pos
+    return orjson.loads(data[pos:pos + length]), pos + length
+
+def encode_replay(
+    events: List[Dict[str, Any]],
+    keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL
+) -> bytes:
+    """Encode time-ordered events (dicts with an integer ``t``) into the binary format"""
+    if not 0 < keyframe_interval <= 0xFFFF:
+        raise ValueError("keyframe_interval must be between 1 and 65535")
+
+    state: Dict[str, Any] = {}
+    segments: List[Tuple[int, bytes]] = []
+    previous_t = 0
+
+    for first in range(0, len(events), keyframe_interval):
+        body = bytearray()
+        segment_events = events[first:first + keyframe_interval]
+        segment_start = int(segment_events[0]['t'])
+        if segment_start < previous_t:
+            raise ValueError("Events must be ordered by 't'")
+        _write_blob(body, state)
+        _write_varint(body, len(segment_events))
+
+        previous_t = segment_start
+        for event in segment_events:
+            t = int(event['t'])
+            if t < previous_t:
+                raise ValueError("Events must be ordered by 't'")
+            delta = {
+                key: value for key, value in event.items()
+                if key != 't' and (key not in state or state[key] != value)
+            }
+            state.update(delta)
+            _write_varint(body, t - previous_t)
+            _write_blob(body, delta)
+            previous_t = t
+        segments.append((segment_start, zlib.compress(bytes(body), COMPRESSION_LEVEL)))
+
+    offset = HEADER.size + INDEX_ENTRY.size * len(segments)
+    index = bytearray()
+    for start, blob in segments:
+        index += INDEX_ENTRY.pack(start, offset, len(blob))
+        offset += len(blob)
+
+    duration = int(events[-1]['t']) if events else 0
+    header = HEADER.pack(MAGIC, VERSION, 0, keyframe_interval, len(events), len(segments), duration)
+    return b"".join([header, bytes(index)] + [blob for _, blob in segments])
+
+def is_binary_replay(data: bytes) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+def decode_header(data: bytes) -> ReplayHeader:
+    """Parse the header and seek index from the first bytes of a replay.
+
+    ``data`` must hold at least ``HEADER.size`` bytes; if it is shorter than
+    the full index a ReplayFormatError tells how many bytes are needed.
+    """
+    if len(data) < HEADER.size:
+        raise ReplayFormatError(f"Need {HEADER.size} bytes to read the header")
+    magic, version, _, keyframe_interval, event_count, segment_count, duration = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ReplayFormatError("Not a binary replay")
+    if version != VERSION:
+        raise ReplayFormatError(f"Unsupported replay version {version}")
+
+    needed = HEADER.size + INDEX_ENTRY.size * segment_count
+    if len(data) < needed:
+        raise ReplayFormatError(f"Need {needed} bytes to read the seek index")
+    index = [
+        INDEX_ENTRY.unpack_from(data, HEADER.size + i * INDEX_ENTRY.size)
+        for i in range(segment_count)
+    ]
+    return ReplayHeader(keyframe_interval, event_count, duration, index)
+
+def index_size(data: bytes) -> int:
+    """Total header + index size, read from the fixed-size header alone"""
+    if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+        raise ReplayFormatError("Not a binary replay")
+    segment_count = HEADER.unpack_from(data)[5]
+    return HEADER.size + INDEX_ENTRY.size * segment_count
+
+def iter_segment(blob: bytes, start: int) -> Iterator[Tuple[int, Dict[str, Any], Dict[str, Any]]]:
+    """Yield (time, delta, state after delta) for each event of a compressed segment.
+
+    The state dict is updated in place; copy it to keep a snapshot.
+    """
+    data = zlib.decompress(blob)
+    state, pos = _read_blob(data, 0)
+    count, pos = _read_varint(data, pos)
+    t = start
+    for _ in range(count):
+        dt, pos = _read_varint(data, pos)
+        delta, pos = _read_blob(data, pos)
+        t += dt
+        state.update(delta)
+        yield t, delta, state
+
+def segment_state_at(blob: bytes, start: int, t: int) -> Dict[str, Any]:
+    """State at time ``t`` from one segment: its keyframe plus the deltas up to ``t``"""
+    data = zlib.decompress(blob)
+    state, pos = _read_blob(data, 0)
+    count, pos = _read_varint(data, pos)
+    current = start
+    for _ in range(count):
+        dt, pos = _read_varint(data, pos)
+        current += dt
+        if current > t:
+            break
+        delta, pos = _read_blob(data, pos)
+        state.update(delta)
+    return state
+
+class ReplayReader:
+    """Random access into a binary replay through a ``read(offset, length)`` callable.
+
+    Only the header, the index and the one segment a seek lands in are read,
+    so the replay can sit in the chunked blob store and be fetched by range.
+    The last decoded segment is kept for scrubbing around the same moment.
+    """
+
+    def __init__(self, read: Callable[[int, int], bytes]):
+        self._read = read
+        self.header = decode_header(read(0, index_size(read(0, HEADER.size))))
+        self._cached: Tuple[Optional[int], bytes] = (None, b"")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ReplayReader":
+        return cls(lambda offset, length: data[offset:offset + length])
+
+    def _segment(self, position: int) -> bytes:
+        if self._cached[0] != position:
+            _, offset, length = self.header.index[position]
+            self._cached = (position, self._read(offset, length))
+        return self._cached[1]
+
+    def state_at(self, t: int) -> Dict[str, Any]:
+        position = self.header.segment_for(t)
+        if position is None:
+            return {}
+        start = self.header.index[position][0]
+        return segment_state_at(self._segment(position), start, t)
+
+    def events(self, start_t: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield events (time plus changed fields) from ``start_t`` onwards"""
+        first = self.header.segment_for(start_t) or 0
+        for position in range(first, len(self.header.index)):
+            segment_start = self.header.index[position][0]
+            for t, delta, _ in iter_segment(self._segment(position), segment_start):
+                if t >= start_t:
+                    yield {'t': t, **delta}
+
+def parse_text_replay(text: str) -> List[Dict[str, Any]]:
+    """Parse the text replay form: a JSON array of events, or one JSON event per line"""
+    text = text.strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        events = orjson.loads(text)
+    else:
+        events = [orjson.loads(line) for line in text.splitlines() if line.strip()]
+    for event in events:
+        if not isinstance(event, dict) or 't' not in event:
+            raise ReplayFormatError("Every replay event needs a 't' timestamp")
+    # Stable sort keeps same-timestamp events in their recorded order
+    return sorted(events, key=lambda event: int(event['t']))
+
+def convert_text_replay(text: str, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> bytes:
+    """Convert a text ``replay_data`` payload into the binary format"""
+    return encode_replay(parse_text_replay(text), keyframe_interval)
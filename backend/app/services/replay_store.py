@@ -0,0 +1,375 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+from .replay_format import (
+    HEADER,
+    ReplayFormatError,
+    decode_header,
+    index_size,
+    segment_state_at,
+)
+
+logger = logging.getLogger(__name__)
+
+class BlobBackend:
+    """Minimal key/value blob interface the replay store is written against.
+
+    Keys are slash-separated paths. An object-store backend only needs to map
+    these calls onto its client.
+    """
+
+    def put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def touch(self, key: str) -> None:
+        """Mark an existing blob as just written, so a sweep treats it as new"""
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        """(key, last modified epoch seconds) of every blob under ``prefix``"""
+        raise NotImplementedError
+
+class LocalBlobBackend(BlobBackend):
+    """Blobs as files under a root directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def touch(self, key: str) -> None:
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def list(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        for directory, _, names in os.walk(self._path(prefix)):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    modified = os.path.getmtime(path)
+                except FileNotFoundError:
+                    continue
+                yield os.path.relpath(path, self.root).replace(os.sep, "/"), modified
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range ``Range: bytes=...`` header into an inclusive (start, end).
+
+    Returns None when there is no usable header (serve the whole replay) and
+    raises a 416 when the range cannot be satisfied.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec:
+        # Multipart ranges are not supported; fall back to the full body
+        return None
+
+    unsatisfiable = HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"}
+    )
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            suffix = int(end_text)
+            if suffix == 0:
+                raise unsatisfiable
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise unsatisfiable
+    return start, end
+
+class ReplayStore:
+    """Content-addressed, compressed chunk storage for replays.
+
+    An upload is cut into fixed-size chunks of ``REPLAY_CHUNK_SIZE`` bytes.
+    Each chunk is zlib-compressed and stored once under the SHA-256 of its raw
+    bytes, so identical chunks across replays are shared. A per-replay
+    manifest lists the chunk hashes in order; because chunks are fixed-size, a
+    byte range maps straight to the chunks that cover it, and a ranged read
+    decompresses only those. Neither uploads nor downloads hold more than one
+    chunk in memory.
+
+    Deleting a replay removes only its record and manifest. Chunks no manifest
+    references, and manifests left behind by failed uploads, are reclaimed by
+    ``sweep`` once they are older than ``REPLAY_SWEEP_GRACE_SECONDS``; reusing
+    a stored chunk refreshes its age, so an upload in progress never loses one.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BlobBackend] = None,
+        chunk_size: int = settings.REPLAY_CHUNK_SIZE,
+        compression_level: int = settings.REPLAY_COMPRESSION_LEVEL,
+        max_bytes: int = settings.REPLAY_MAX_BYTES,
+        sweep_interval: float = settings.REPLAY_SWEEP_INTERVAL_SECONDS,
+        sweep_grace: float = settings.REPLAY_SWEEP_GRACE_SECONDS,
+        storage=None
+    ):
+        self.backend = backend or LocalBlobBackend(settings.REPLAY_STORE_PATH)
+        self.chunk_size = chunk_size
+        self.compression_level = compression_level
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.sweep_grace = sweep_grace
+        self.storage = storage or supabase
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _chunk_key(chunk_hash: str) -> str:
+        return f"chunks/{chunk_hash[:2]}/{chunk_hash}"
+
+    @staticmethod
+    def _manifest_key(replay_id: str) -> str:
+        return f"manifests/{replay_id}.json"
+
+    def _put_chunk(self, chunk: bytes) -> dict:
+        chunk_hash = hashlib.sha256(chunk).hexdigest()
+        key = self._chunk_key(chunk_hash)
+        if self.backend.exists(key):
+            try:
+                self.backend.touch(key)
+            except KeyError:
+                # Swept between the two calls
+                self.backend.put(key, zlib.compress(chunk, self.compression_level))
+        else:
+            self.backend.put(key, zlib.compress(chunk, self.compression_level))
+        return {'hash': chunk_hash, 'size': len(chunk)}
+
+    def _get_chunk(self, chunk_hash: str) -> bytes:
+        return zlib.decompress(self.backend.get(self._chunk_key(chunk_hash)))
+
+    async def store(self, challenge_id, user_id, stream: AsyncIterator[bytes]) -> dict:
+        """Store an uploaded replay from a byte stream and record its metadata"""
+        replay_id = str(uuid.uuid4())
+        content_hash = hashlib.sha256()
+        chunks = []
+        size = 0
+        buffer = bytearray()
+
+        async for data in stream:
+            if not data:
+                continue
+            size += len(data)
+            if size > self.max_bytes:
+                # Chunks already written are left for the sweep
+                raise HTTPException(status_code=413, detail=f"Replay exceeds {self.max_bytes} bytes")
+            content_hash.update(data)
+            buffer.extend(data)
+            while len(buffer) >= self.chunk_size:
+                chunk = bytes(buffer[:self.chunk_size])
+                del buffer[:self.chunk_size]
+                chunks.append(await asyncio.to_thread(self._put_chunk, chunk))
+        if buffer:
+            chunks.append(await asyncio.to_thread(self._put_chunk, bytes(buffer)))
+
+        manifest = {
+            'id': replay_id,
+            'size': size,
+            'chunk_size': self.chunk_size,
+            'chunks': chunks,
+        }
+        await asyncio.to_thread(self.backend.put, self._manifest_key(replay_id), json.dumps(manifest).encode())
+
+        record = {
+            'id': replay_id,
+            'challenge_id': str(challenge_id),
+            'user_id': str(user_id),
+            'size': size,
+            'chunk_count': len(chunks),
+            'content_hash': content_hash.hexdigest(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+        response = await asyncio.to_thread(self.storage.insert, 'replays', record)
+        return response.data[0] if response.data else record
+
+    async def get(self, replay_id: str) -> dict:
+        response = await asyncio.to_thread(self.storage.select, 'replays', '*', {'id': replay_id})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Replay not found")
+        return response.data[0]
+
+    async def list_replays(self, challenge_id: Optional[str] = None, user_id: Optional[str] = None) -> list:
+        filters = {}
+        if challenge_id:
+            filters['challenge_id'] = challenge_id
+        if user_id:
+            filters['user_id'] = user_id
+        response = await asyncio.to_thread(self.storage.select, 'replays', '*', filters)
+        return response.data or []
+
+    async def load_manifest(self, replay_id: str) -> dict:
+        try:
+            data = await asyncio.to_thread(self.backend.get, self._manifest_key(replay_id))
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Replay data not found")
+        return json.loads(data)
+
+    async def iter_range(self, manifest: dict, start: int, end: int) -> AsyncIterator[bytes]:
+        """Yield the bytes in [start, end] (inclusive), decompressing only the chunks that cover them"""
+        chunk_size = manifest['chunk_size']
+        for index in range(start // chunk_size, end // chunk_size + 1):
+            chunk = await asyncio.to_thread(self._get_chunk, manifest['chunks'][index]['hash'])
+            chunk_start = index * chunk_size
+            yield chunk[max(start - chunk_start, 0):end - chunk_start + 1]
+
+    async def read(self, manifest: dict, offset: int, length: int) -> bytes:
+        end = min(offset + length, manifest['size']) - 1
+        if end < offset:
+            return b""
+        return b"".join([part async for part in self.iter_range(manifest, offset, end)])
+
+    async def state_at(self, replay_id: str, t: int) -> dict:
+        """Replay state at time ``t`` for replays in the binary format.
+
+        Reads the header and seek index, then only the segment holding ``t``.
+        """
+        manifest = await self.load_manifest(replay_id)
+        try:
+            head = await self.read(manifest, 0, HEADER.size)
+            header = decode_header(await self.read(manifest, 0, index_size(head)))
+        except ReplayFormatError as e:
+            raise HTTPException(status_code=415, detail=f"Replay is not seekable: {str(e)}")
+
+        position = header.segment_for(t)
+        if position is None:
+            return {}
+        start, offset, length = header.index[position]
+        return segment_state_at(await self.read(manifest, offset, length), start, t)
+
+    async def delete(self, replay_id: str) -> None:
+        """Delete a replay's record and manifest. Chunks may be shared with other replays and are kept."""
+        response = await asyncio.to_thread(self.storage.delete, 'replays', {'id': replay_id})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Replay not found")
+        await asyncio.to_thread(self.backend.delete, self._manifest_key(replay_id))
+
+    # Garbage collection
+
+    def _recorded(self, replay_ids: list) -> Set[str]:
+        recorded = set()
+        for start in range(0, len(replay_ids), IN_FILTER_CHUNK):
+            response = self.storage.select(
+                'replays', 'id', {'id': {'in': replay_ids[start:start + IN_FILTER_CHUNK]}}
+            )
+            recorded.update(str(row['id']) for row in (response.data or []))
+        return recorded
+
+    def _sweep(self) -> dict:
+        cutoff = time.time() - self.sweep_grace
+        manifests = {
+            key[len("manifests/"):-len(".json")]: modified
+            for key, modified in self.backend.list("manifests")
+        }
+        recorded = self._recorded(list(manifests))
+
+        # Mark: chunks of every manifest that has a record or may still get one
+        live: Set[str] = set()
+        orphaned_manifests = 0
+        for replay_id, modified in manifests.items():
+            if replay_id not in recorded and modified < cutoff:
+                self.backend.delete(self._manifest_key(replay_id))
+                orphaned_manifests += 1
+                continue
+            try:
+                manifest = json.loads(self.backend.get(self._manifest_key(replay_id)))
+            except KeyError:
+                continue
+            live.update(chunk['hash'] for chunk in manifest['chunks'])
+
+        # Sweep: old chunks nobody references
+        chunks = 0
+        for key, modified in self.backend.list("chunks"):
+            if modified < cutoff and key.rsplit("/", 1)[-1] not in live:
+                self.backend.delete(key)
+                chunks += 1
+        return {'manifests': orphaned_manifests, 'chunks': chunks}
+
+    async def sweep(self) -> dict:
+        """Delete unreferenced chunks and orphaned manifests; returns how many of each"""
+        swept = await asyncio.to_thread(self._sweep)
+        if swept['manifests'] or swept['chunks']:
+            logger.info(f"Replay sweep removed {swept['chunks']} chunks and {swept['manifests']} manifests")
+        return swept
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Replay sweep failed: {str(e)}")
+
+    def start(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+replay_store = ReplayStore()
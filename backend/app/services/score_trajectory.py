@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indexes of the points Largest-Triangle-Three-Buckets keeps, first and last included.
+
+    The points between the ends are cut into ``threshold - 2`` buckets and
+    each bucket keeps the point forming the largest triangle with the point
+    kept before it and the average of the next bucket, which preserves
+    peaks and dips that plain decimation drops.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        kept[bucket + 1] = previous
+    return kept
+
+class ScoreTrajectoryStore:
+    """Every accepted score per (challenge, user), for progress charts.
+
+    Scores are appended to ``score_points`` as they are accepted. Once a
+    user's oldest points are ``TRAJECTORY_COMPACT_LAG_SECONDS`` old (so none
+    still in flight can land between them), every ``TRAJECTORY_CHUNK_POINTS``
+    of them are packed into one ``score_trajectory_chunks`` row of columns
+    (time offsets and scores) plus an LTTB preview of the chunk, and the
+    point rows are deleted. Compaction happens on read, like wallet
+    snapshots; chunk numbers make a concurrent compaction of the same points
+    a no-op.
+
+    A history is the chunks followed by the remaining points, downsampled
+    with LTTB. Past ``TRAJECTORY_MAX_LOAD_POINTS`` the chunk previews are
+    read instead of the full columns, so the load stays bounded.
+    """
+
+    def __init__(
+        self,
+        chunk_points: int = settings.TRAJECTORY_CHUNK_POINTS,
+        preview_points: int = settings.TRAJECTORY_PREVIEW_POINTS,
+        max_load_points: int = settings.TRAJECTORY_MAX_LOAD_POINTS,
+        compact_lag: float = settings.TRAJECTORY_COMPACT_LAG_SECONDS,
+        storage=None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.chunk_points = chunk_points
+        self.preview_points = preview_points
+        self.max_load_points = max_load_points
+        self.compact_lag = compact_lag
+        self.storage = storage or supabase
+        self.clock = clock
+
+    async def record(self, challenge_id: str, user_id: str, score: int) -> None:
+        """Append an accepted score; a failure is logged, never raised, since charts are best effort"""
+        point = {
+            'id': str(uuid.uuid4()),
+            'challenge_id': str(challenge_id),
+            'user_id': str(user_id),
+            'score': score,
+            'recorded_at': int(self.clock() * 1000),
+        }
+        try:
+            await asyncio.to_thread(self.storage.insert, 'score_points', point)
+        except Exception as e:
+            logger.error(f"Failed to record score trajectory point: {str(e)}")
+
+    async def history(self, challenge_id: str, user_id: str, points: int) -> dict:
+        """The user's scores over time, downsampled to at most `points` points"""
+        timestamps, scores, total = await asyncio.to_thread(self._read, str(challenge_id), str(user_id))
+        kept = lttb(timestamps.astype(np.float64), scores, points)
+        return {
+            'challenge_id': str(challenge_id),
+            'user_id': str(user_id),
+            'total_points': total,
+            'timestamps': timestamps[kept].tolist(),
+            'scores': scores[kept].tolist(),
+        }
+
+    def _read(self, challenge_id: str, user_id: str) -> Tuple[np.ndarray, np.ndarray, int]:
+        key = {'challenge_id': challenge_id, 'user_id': user_id}
+        chunks = self.storage.select(
+            'score_trajectory_chunks', 'chunk,count,last_at,last_point_id', key, order='chunk'
+        ).data or []
+        watermark = (chunks[-1]['last_at'], chunks[-1]['last_point_id']) if chunks else None
+
+        filters = dict(key)
+        if watermark is not None:
+            filters['recorded_at'] = {'gte': watermark[0]}
+        tail = sorted(
+            self.storage.select('score_points', 'id,score,recorded_at', filters).data or [],
+            key=lambda point: (point['recorded_at'], str(point['id']))
+        )
+        if watermark is not None:
+            # Points already in a chunk whose delete has not happened yet
+            tail = [point for point in tail if (point['recorded_at'], str(point['id'])) > watermark]
+
+        chunked = sum(chunk['count'] for chunk in chunks)
+        total = chunked + len(tail)
+        timestamps, scores = [], []
+        if chunks:
+            preview = total > self.max_load_points
+            columns = 'chunk,first_at,preview_offsets,preview_scores' if preview else 'chunk,first_at,offsets,scores'
+            for row in self.storage.select('score_trajectory_chunks', columns, key, order='chunk').data or []:
+                offsets = row['preview_offsets'] if preview else row['offsets']
+                timestamps.append(row['first_at'] + np.asarray(offsets, dtype=np.int64))
+                scores.append(np.asarray(row['preview_scores'] if preview else row['scores'], dtype=np.float64))
+        timestamps.append(np.asarray([point['recorded_at'] for point in tail], dtype=np.int64))
+        scores.append(np.asarray([point['score'] for point in tail], dtype=np.float64))
+
+        try:
+            self._compact(challenge_id, user_id, chunks[-1]['chunk'] + 1 if chunks else 0, tail)
+        except Exception as e:
+            logger.error(f"Failed to compact score trajectory of {user_id} in {challenge_id}: {str(e)}")
+        return np.concatenate(timestamps), np.concatenate(scores), total
+
+    def _compact(self, challenge_id: str, user_id: str, next_chunk: int, tail: List[dict]) -> None:
+        """Pack every full chunk's worth of settled tail points into chunk rows"""
+        settled_before = int((self.clock() - self.compact_lag) * 1000)
+        settled = 0
+        while settled < len(tail) and tail[settled]['recorded_at'] <= settled_before:
+            settled += 1
+
+        for start in range(0, settled - self.chunk_points + 1, self.chunk_points):
+            points = tail[start:start + self.chunk_points]
+            timestamps = np.asarray([point['recorded_at'] for point in points], dtype=np.int64)
+            scores = np.asarray([point['score'] for point in points])
+            preview = lttb(timestamps.astype(np.float64), scores.astype(np.float64), self.preview_points)
+            first_at = int(timestamps[0])
+            # Another reader compacting the same points writes the same chunk number, which is then skipped
+            self.storage.insert_ignore('score_trajectory_chunks', {
+                'challenge_id': challenge_id,
+                'user_id': user_id,
+                'chunk': next_chunk,
+                'count': len(points),
+                'first_at': first_at,
+                'last_at': int(timestamps[-1]),
+                'last_point_id': str(points[-1]['id']),
+                'offsets': (timestamps - first_at).tolist(),
+                'scores': scores.tolist(),
+                'preview_offsets': (timestamps[preview] - first_at).tolist(),
+                'preview_scores': scores[preview].tolist(),
+            })
+            ids = [str(point['id']) for point in points]
+            for id_start in range(0, len(ids), IN_FILTER_CHUNK):
+                self.storage.delete('score_points', {'id': {'in': ids[id_start:id_start + IN_FILTER_CHUNK]}})
+            next_chunk += 1
+
+score_trajectory_store = ScoreTrajectoryStore()
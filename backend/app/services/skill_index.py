@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..db.supabase_client import supabase
+from ..schemas.skill_profile import SkillProfileCreate
+
+logger = logging.getLogger(__name__)
+
+def normalize_skill(name: str) -> str:
+    return name.strip().lower()
+
+class SkillIndex:
+    """Skill profiles as a dense float32 matrix over a shared skill vocabulary.
+
+    Row i holds user ``user_ids[i]``'s skill levels, column j the skill
+    ``vocabulary[j]``; a second matrix keeps the rows scaled to unit length,
+    so cosine similarity against every user is one matrix-vector product.
+    Both matrices grow by doubling and removals swap the last row in, so
+    rows ``[:size]`` are always dense.
+    """
+
+    def __init__(self, initial_rows: int = 1024, initial_skills: int = 32):
+        self.vocabulary: Dict[str, int] = {}
+        self.user_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.levels = np.zeros((initial_rows, initial_skills), dtype=np.float32)
+        self.unit = np.zeros_like(self.levels)
+
+    @property
+    def size(self) -> int:
+        return len(self.user_ids)
+
+    def _grow(self, rows: int, columns: int) -> None:
+        capacity_rows, capacity_columns = self.levels.shape
+        if rows <= capacity_rows and columns <= capacity_columns:
+            return
+        while capacity_rows < rows:
+            capacity_rows *= 2
+        while capacity_columns < columns:
+            capacity_columns *= 2
+        for name in ("levels", "unit"):
+            old = getattr(self, name)
+            new = np.zeros((capacity_rows, capacity_columns), dtype=np.float32)
+            new[:old.shape[0], :old.shape[1]] = old
+            setattr(self, name, new)
+
+    def _vector(self, skills: Dict[str, int]) -> np.ndarray:
+        for name in skills:
+            name = normalize_skill(name)
+            if name not in self.vocabulary:
+                self.vocabulary[name] = len(self.vocabulary)
+        self._grow(self.size, len(self.vocabulary))
+        vector = np.zeros(self.levels.shape[1], dtype=np.float32)
+        for name, level in skills.items():
+            vector[self.vocabulary[normalize_skill(name)]] = level
+        return vector
+
+    def upsert(self, user_id: str, skills: Dict[str, int]) -> None:
+        user_id = str(user_id)
+        vector = self._vector(skills)
+        row = self.rows.get(user_id)
+        if row is None:
+            row = self.size
+            self._grow(row + 1, len(self.vocabulary))
+            self.rows[user_id] = row
+            self.user_ids.append(user_id)
+        self.levels[row] = vector
+        norm = np.linalg.norm(vector)
+        self.unit[row] = vector / norm if norm else 0
+
+    def bulk_load(self, profiles: List[Tuple[str, Dict[str, int]]]) -> None:
+        """Build the matrices for many profiles at once"""
+        for _, skills in profiles:
+            for name in skills:
+                self.vocabulary.setdefault(normalize_skill(name), len(self.vocabulary))
+        self._grow(self.size + len(profiles), len(self.vocabulary))
+        for user_id, skills in profiles:
+            self.upsert(user_id, skills)
+
+    def remove(self, user_id: str) -> None:
+        row = self.rows.pop(str(user_id), None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            moved = self.user_ids[last]
+            self.levels[row] = self.levels[last]
+            self.unit[row] = self.unit[last]
+            self.user_ids[row] = moved
+            self.rows[moved] = row
+        self.levels[last] = 0
+        self.unit[last] = 0
+        self.user_ids.pop()
+
+    def skills_of(self, user_ids: List[str]) -> np.ndarray:
+        """Skill-level rows for the given users (zeros for unknown users)"""
+        out = np.zeros((len(user_ids), len(self.vocabulary)), dtype=np.float32)
+        for i, user_id in enumerate(user_ids):
+            row = self.rows.get(str(user_id))
+            if row is not None:
+                out[i] = self.levels[row, :len(self.vocabulary)]
+        return out
+
+    def similar(self, user_id: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k users by cosine similarity of skill vectors, best first"""
+        row = self.rows.get(str(user_id))
+        if row is None:
+            raise KeyError(user_id)
+        size = self.size
+        columns = len(self.vocabulary)
+        scores = self.unit[:size, :columns] @ self.unit[row, :columns]
+        scores[row] = -np.inf
+        k = min(k, size - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(self.user_ids[i], float(scores[i])) for i in top]
+
+class SkillProfileService:
+    """Skill profile storage, with the similarity index kept current on every write.
+
+    The index is built from storage on first use and then updated in place by
+    create, update and delete; in a multi-worker deployment each worker
+    reloads it at startup.
+    """
+
+    def __init__(self, index: Optional[SkillIndex] = None, storage=None):
+        self.index = index or SkillIndex()
+        self.storage = storage or supabase
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    async def ensure_loaded(self) -> SkillIndex:
+        if not self._loaded:
+            async with self._load_lock:
+                if not self._loaded:
+                    response = await asyncio.to_thread(self.storage.select, 'skill_profiles', 'user_id,skills')
+                    self.index.bulk_load([(row['user_id'], row['skills']) for row in (response.data or [])])
+                    self._loaded = True
+                    logger.info(f"Loaded {self.index.size} skill profiles into the similarity index")
+        return self.index
+
+    async def create(self, profile: SkillProfileCreate) -> dict:
+        existing = await asyncio.to_thread(self.storage.select, 'skill_profiles', 'id', {'user_id': str(profile.user_id)})
+        if existing.data:
+            raise HTTPException(status_code=400, detail="Skill profile already exists")
+        response = await asyncio.to_thread(
+            self.storage.insert, 'skill_profiles', {'user_id': str(profile.user_id), 'skills': profile.skills}
+        )
+        (await self.ensure_loaded()).upsert(str(profile.user_id), profile.skills)
+        return response.data[0]
+
+    async def get(self, user_id: str) -> dict:
+        response = await asyncio.to_thread(self.storage.select, 'skill_profiles', '*', {'user_id': user_id})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Skill profile not found")
+        return response.data[0]
+
+    async def update(self, user_id: str, skills: Dict[str, int]) -> dict:
+        response = await asyncio.to_thread(
+            self.storage.update, 'skill_profiles', {'skills': skills}, {'user_id': user_id}
+        )
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Skill profile not found")
+        (await self.ensure_loaded()).upsert(user_id, skills)
+        return response.data[0]
+
+    async def delete(self, user_id: str) -> None:
+        response = await asyncio.to_thread(self.storage.delete, 'skill_profiles', {'user_id': user_id})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Skill profile not found")
+        (await self.ensure_loaded()).remove(user_id)
+
+    async def similar(self, user_id: str, k: int) -> List[dict]:
+        index = await self.ensure_loaded()
+        try:
+            matches = index.similar(user_id, k)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Skill profile not found")
+        return [{'user_id': match, 'similarity': score} for match, score in matches]
+
+skill_profile_service = SkillProfileService()
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+from .enrollment_admission import ENROLLED
+from .skill_index import skill_profile_service
+from .team_leaderboard import team_leaderboard
+
+logger = logging.getLogger(__name__)
+
+# Teams per insert when writing team assignments back
+WRITE_BATCH_SIZE = 1000
+
+class TeamBalancer:
+    """Split players into teams of at most ``team_size`` with balanced, complementary skills.
+
+    ``skills`` is one row of skill levels per player. A team's strength is the
+    sum of its members' levels and its coverage is, per skill, the best level
+    any member has, summed. The cost to minimize is
+
+        sum((strength - mean strength) ** 2) - complementarity * sum(coverage)
+
+    The start is a snake draft by player strength, which already balances
+    totals well. Local search then runs in vectorized rounds: teams are paired
+    up at random, one member slot is picked in each team, and every pair's
+    swap is scored at once; since the pairs are disjoint, all improving swaps
+    of a round are applied together.
+    """
+
+    def __init__(
+        self,
+        skills: np.ndarray,
+        team_size: int,
+        complementarity: float = 1.0,
+        seed: Optional[int] = None
+    ):
+        if team_size < 1:
+            raise ValueError("team_size must be at least 1")
+        self.players = skills.shape[0]
+        # An all-zero row at index `players` marks empty slots in short teams
+        self.skills = np.vstack([skills.astype(np.float32), np.zeros((1, skills.shape[1]), dtype=np.float32)])
+        self.strength = self.skills.sum(axis=1)
+        self.team_count = max(1, -(-self.players // team_size))
+        self.team_size = team_size
+        self.complementarity = complementarity
+        self.rng = np.random.default_rng(seed)
+        self.members = self._snake_draft()
+
+    def _snake_draft(self) -> np.ndarray:
+        members = np.full((self.team_count, self.team_size), self.players, dtype=np.int64)
+        order = np.argsort(-self.strength[:self.players], kind="stable")
+        for position, player in enumerate(order):
+            draft_round, pick = divmod(position, self.team_count)
+            team = pick if draft_round % 2 == 0 else self.team_count - 1 - pick
+            members[team, draft_round] = player
+        return members
+
+    def team_strength(self) -> np.ndarray:
+        return self.strength[self.members].sum(axis=1)
+
+    def team_coverage(self) -> np.ndarray:
+        return self.skills[self.members].max(axis=1).sum(axis=1)
+
+    def cost(self) -> float:
+        strength = self.team_strength()
+        deviation = strength - strength.mean()
+        return float((deviation ** 2).sum() - self.complementarity * self.team_coverage().sum())
+
+    def _round(self, strength: np.ndarray) -> int:
+        """One round of disjoint pairwise swaps; returns how many were applied"""
+        shuffled = self.rng.permutation(self.team_count)
+        pairs = len(shuffled) // 2
+        a, b = shuffled[:pairs], shuffled[pairs:2 * pairs]
+        slot_a = self.rng.integers(0, self.team_size, pairs)
+        slot_b = self.rng.integers(0, self.team_size, pairs)
+        player_a = self.members[a, slot_a]
+        player_b = self.members[b, slot_b]
+        # Moving an empty slot would change team sizes
+        valid = (player_a != self.players) & (player_b != self.players)
+
+        delta = self.strength[player_b] - self.strength[player_a]
+        balance_change = 2 * delta * (strength[a] - strength[b]) + 2 * delta ** 2
+
+        rows = np.arange(pairs)
+        skills_a = self.skills[self.members[a]]
+        skills_b = self.skills[self.members[b]]
+        old_coverage = skills_a.max(axis=1).sum(axis=1) + skills_b.max(axis=1).sum(axis=1)
+        skills_a[rows, slot_a] = self.skills[player_b]
+        skills_b[rows, slot_b] = self.skills[player_a]
+        new_coverage = skills_a.max(axis=1).sum(axis=1) + skills_b.max(axis=1).sum(axis=1)
+
+        gain = balance_change - self.complementarity * (new_coverage - old_coverage)
+        accept = valid & (gain < -1e-6)
+        if not accept.any():
+            return 0
+
+        a, b = a[accept], b[accept]
+        slot_a, slot_b = slot_a[accept], slot_b[accept]
+        player_a, player_b, delta = player_a[accept], player_b[accept], delta[accept]
+        self.members[a, slot_a] = player_b
+        self.members[b, slot_b] = player_a
+        strength[a] += delta
+        strength[b] -= delta
+        return int(accept.sum())
+
+    def optimize(
+        self,
+        max_rounds: int = settings.TEAM_FORMATION_MAX_ROUNDS,
+        time_limit: float = settings.TEAM_FORMATION_TIME_LIMIT_MS / 1000,
+        patience: int = 50
+    ) -> List[List[int]]:
+        """Improve the draft until the round or time budget runs out, or swaps stop helping.
+
+        Returns the player indexes of each team.
+        """
+        if self.team_count > 1:
+            deadline = time.monotonic() + time_limit
+            strength = self.team_strength()
+            idle = 0
+            for _ in range(max_rounds):
+                idle = 0 if self._round(strength) else idle + 1
+                if idle >= patience or time.monotonic() > deadline:
+                    break
+        return [[int(player) for player in team if player != self.players] for team in self.members]
+
+def balance_teams(skills: np.ndarray, team_size: int, seed: Optional[int] = None, **options) -> List[List[int]]:
+    """Player indexes per team, see TeamBalancer"""
+    if skills.shape[0] == 0:
+        return []
+    return TeamBalancer(skills, team_size, seed=seed).optimize(**options)
+
+class TeamFormationService:
+    """Places a challenge's unteamed enrollees into new teams, written back in bulk"""
+
+    def __init__(self, profiles=None, storage=None, standings=None):
+        self.profiles = profiles or skill_profile_service
+        self.storage = storage or supabase
+        self.standings = standings or team_leaderboard
+
+    async def form_teams(self, challenge_id: str, team_size: int) -> dict:
+        # Waitlisted users hold no slot yet, so they are not placed
+        response = await asyncio.to_thread(
+            self.storage.select, 'enrollments', '*', {'challenge_id': challenge_id, 'status': ENROLLED}
+        )
+        enrollees = [row for row in (response.data or []) if row['team_id'] is None]
+        if not enrollees:
+            raise HTTPException(status_code=404, detail="No unteamed enrollees for this challenge")
+
+        index = await self.profiles.ensure_loaded()
+        skills = index.skills_of([row['user_id'] for row in enrollees])
+
+        started = time.monotonic()
+        assignment = await asyncio.to_thread(balance_teams, skills, team_size)
+        logger.info(
+            f"Formed {len(assignment)} teams from {len(enrollees)} enrollees of challenge {challenge_id} "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+
+        teams = []
+        placements = {}
+        for members in assignment:
+            team_id = str(uuid.uuid4())
+            teams.append({
+                'id': team_id,
+                'name': f"team-{team_id[:8]}",
+                'description': f"Formed for challenge {challenge_id}",
+            })
+            placements[team_id] = [enrollees[member]['id'] for member in members]
+
+        await asyncio.to_thread(self._write, teams, placements)
+        # Enrollees may have scored before they had a team
+        await self.standings.rebuild(challenge_id)
+
+        strength = skills.sum(axis=1)
+        team_strength = [float(strength[members].sum()) for members in assignment]
+        return {
+            'challenge_id': challenge_id,
+            'enrollees': len(enrollees),
+            'strength_spread': max(team_strength) - min(team_strength),
+            'teams': [
+                {
+                    'team_id': team['id'],
+                    'name': team['name'],
+                    'user_ids': [enrollees[member]['user_id'] for member in members],
+                    'total_skill': total,
+                }
+                for team, members, total in zip(teams, assignment, team_strength)
+            ],
+        }
+
+    def _write(self, teams: List[dict], placements: Dict[str, List[str]]) -> None:
+        """Insert the teams, then point each member's enrollment at its team.
+
+        Only ``team_id`` is written, so concurrent changes to the rest of an
+        enrollment are kept. If any write fails, the teams and assignments
+        made so far are undone: the enrollees are unteamed again and a rerun
+        starts from scratch rather than leaving orphaned teams behind.
+        """
+        try:
+            for start in range(0, len(teams), WRITE_BATCH_SIZE):
+                self.storage.insert('teams', teams[start:start + WRITE_BATCH_SIZE])
+            for team_id, enrollment_ids in placements.items():
+                for start in range(0, len(enrollment_ids), IN_FILTER_CHUNK):
+                    self.storage.update(
+                        'enrollments',
+                        {'team_id': team_id},
+                        {'id': {'in': enrollment_ids[start:start + IN_FILTER_CHUNK]}}
+                    )
+        except Exception:
+            self._undo([team['id'] for team in teams])
+            raise
+
+    def _undo(self, team_ids: List[str]) -> None:
+        for start in range(0, len(team_ids), IN_FILTER_CHUNK):
+            chunk = team_ids[start:start + IN_FILTER_CHUNK]
+            try:
+                self.storage.update('enrollments', {'team_id': None}, {'team_id': {'in': chunk}})
+                self.storage.delete('teams', {'id': {'in': chunk}})
+            except Exception as e:
+                logger.error(f"Failed to undo {len(chunk)} partly formed teams: {str(e)}")
+
+team_formation_service = TeamFormationService()
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+
+logger = logging.getLogger(__name__)
+
+SUM = "sum"
+BEST_K = "best_k"
+MEAN = "mean"
+AGGREGATIONS = (SUM, BEST_K, MEAN)
+
+class TeamLeaderboard:
+    """Team standings per challenge and overall, kept up to date one score at a time.
+
+    Every accepted score of a teamed member is written to
+    ``team_member_scores``, and only that member's team is re-aggregated
+    into ``team_scores``: member count, total and the best
+    ``TEAM_LEADERBOARD_MAX_K`` scores. Those are enough to rank teams by
+    sum, mean or best-k at read time, so boards never join enrollments and
+    scores. A challenge is rebuilt from scratch after teams are formed or
+    scores rolled back.
+
+    Re-aggregations of the same team are serialized within a worker; a race
+    between workers leaves at most one stale team row, which the team's next
+    score repairs.
+    """
+
+    def __init__(
+        self,
+        storage=None,
+        aggregation: str = settings.TEAM_LEADERBOARD_AGGREGATION,
+        best_k: int = settings.TEAM_LEADERBOARD_BEST_K,
+        max_k: int = settings.TEAM_LEADERBOARD_MAX_K
+    ):
+        self.storage = storage or supabase
+        self.aggregation = aggregation
+        self.best_k = best_k
+        self.max_k = max_k
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    # Updates
+
+    async def record(self, challenge_id: str, user_id: str, score: int) -> None:
+        """Apply a member's new score to their team; a failure is logged, never raised"""
+        try:
+            enrollment = await asyncio.to_thread(
+                self.storage.select, 'enrollments', 'team_id', {'challenge_id': str(challenge_id), 'user_id': str(user_id)}
+            )
+            team_id = enrollment.data[0]['team_id'] if enrollment.data else None
+            if team_id is None:
+                return
+            key = (str(challenge_id), str(team_id))
+            async with self._locks[key]:
+                await asyncio.to_thread(self.storage.upsert, 'team_member_scores', {
+                    'challenge_id': str(challenge_id),
+                    'user_id': str(user_id),
+                    'team_id': str(team_id),
+                    'score': score,
+                })
+                await asyncio.to_thread(self._aggregate_team, *key)
+        except Exception as e:
+            logger.error(f"Failed to update team standings for {user_id} in {challenge_id}: {str(e)}")
+
+    def _summary(self, challenge_id: str, team_id: str, scores: List[int]) -> dict:
+        scores = sorted(scores, reverse=True)
+        return {
+            'challenge_id': challenge_id,
+            'team_id': team_id,
+            'members': len(scores),
+            'total': sum(scores),
+            'top_scores': scores[:self.max_k],
+        }
+
+    def _aggregate_team(self, challenge_id: str, team_id: str) -> None:
+        members = self.storage.select(
+            'team_member_scores', 'score', {'challenge_id': challenge_id, 'team_id': team_id}
+        ).data or []
+        self.storage.upsert('team_scores', self._summary(challenge_id, team_id, [row['score'] for row in members]))
+
+    async def rebuild(self, challenge_id: str) -> int:
+        """Recompute a challenge's team standings from enrollments and scores; returns the teams ranked, 0 on failure"""
+        try:
+            return await asyncio.to_thread(self._rebuild, str(challenge_id))
+        except Exception as e:
+            logger.error(f"Failed to rebuild team standings of {challenge_id}: {str(e)}")
+            return 0
+
+    def _rebuild(self, challenge_id: str) -> int:
+        enrollments = self.storage.select('enrollments', 'user_id,team_id', {'challenge_id': challenge_id}).data or []
+        teams = {str(row['user_id']): str(row['team_id']) for row in enrollments if row['team_id']}
+        latest = self.storage.get_challenge_leaderboard(challenge_id).data or []
+        members = [
+            {'challenge_id': challenge_id, 'user_id': str(row['user_id']), 'team_id': teams[str(row['user_id'])], 'score': row['score']}
+            for row in latest if str(row['user_id']) in teams
+        ]
+        by_team: Dict[str, List[int]] = defaultdict(list)
+        for member in members:
+            by_team[member['team_id']].append(member['score'])
+
+        self.storage.delete('team_member_scores', {'challenge_id': challenge_id})
+        self.storage.delete('team_scores', {'challenge_id': challenge_id})
+        if members:
+            self.storage.upsert('team_member_scores', members)
+            self.storage.upsert('team_scores', [
+                self._summary(challenge_id, team_id, scores) for team_id, scores in by_team.items()
+            ])
+        return len(by_team)
+
+    # Boards
+
+    def _score(self, row: dict, aggregation: str, k: int) -> float:
+        if aggregation == SUM:
+            return row['total']
+        if aggregation == MEAN:
+            return row['total'] / row['members'] if row['members'] else 0
+        return sum(row['top_scores'][:k])
+
+    def _options(self, aggregation: Optional[str], k: Optional[int]) -> Tuple[str, int]:
+        aggregation = aggregation or self.aggregation
+        if aggregation not in AGGREGATIONS:
+            raise HTTPException(status_code=400, detail=f"Unknown aggregation: {aggregation}")
+        k = k or self.best_k
+        if aggregation == BEST_K and not 1 <= k <= self.max_k:
+            raise HTTPException(status_code=400, detail=f"k must be between 1 and {self.max_k}")
+        return aggregation, k
+
+    def _names(self, team_ids: Iterable[str]) -> Dict[str, str]:
+        team_ids = sorted(set(team_ids))
+        names = {}
+        for start in range(0, len(team_ids), IN_FILTER_CHUNK):
+            rows = self.storage.select('teams', 'id,name', {'id': {'in': team_ids[start:start + IN_FILTER_CHUNK]}}).data or []
+            names.update({str(row['id']): row['name'] for row in rows})
+        return names
+
+    def _ranked(self, scores: Dict[str, float], members: Dict[str, int]) -> List[dict]:
+        """Teams best first, tied teams by name; tied teams share a rank, as in the user rankings"""
+        names = self._names(scores)
+        ordered = sorted(scores.items(), key=lambda item: (-item[1], names.get(item[0]) or "", item[0]))
+        board = []
+        for position, (team_id, score) in enumerate(ordered):
+            rank = board[-1]['rank'] if board and board[-1]['score'] == score else position + 1
+            board.append({
+                'team_id': team_id,
+                'name': names.get(team_id),
+                'score': score,
+                'members': members[team_id],
+                'rank': rank,
+            })
+        return board
+
+    def _challenge_scores(self, challenge_id: str, aggregation: str, k: int) -> Tuple[Dict[str, float], Dict[str, int]]:
+        rows = self.storage.select('team_scores', 'team_id,members,total,top_scores', {'challenge_id': challenge_id}).data or []
+        return (
+            {str(row['team_id']): self._score(row, aggregation, k) for row in rows},
+            {str(row['team_id']): row['members'] for row in rows},
+        )
+
+    async def challenge_board(self, challenge_id: str, aggregation: Optional[str] = None, k: Optional[int] = None) -> dict:
+        aggregation, k = self._options(aggregation, k)
+
+        def build() -> List[dict]:
+            return self._ranked(*self._challenge_scores(str(challenge_id), aggregation, k))
+
+        return {'challenge_id': str(challenge_id), 'aggregation': aggregation, 'teams': await asyncio.to_thread(build)}
+
+    async def global_board(self, aggregation: Optional[str] = None, k: Optional[int] = None) -> dict:
+        """Each team's per-challenge aggregates, summed over challenges"""
+        aggregation, k = self._options(aggregation, k)
+
+        def build() -> List[dict]:
+            rows = self.storage.select('team_scores', 'team_id,members,total,top_scores').data or []
+            scores: Dict[str, float] = defaultdict(float)
+            members: Dict[str, int] = defaultdict(int)
+            for row in rows:
+                team_id = str(row['team_id'])
+                scores[team_id] += self._score(row, aggregation, k)
+                members[team_id] = max(members[team_id], row['members'])
+            return self._ranked(scores, members)
+
+        return {'challenge_id': None, 'aggregation': aggregation, 'teams': await asyncio.to_thread(build)}
+
+    async def team_standing(
+        self,
+        challenge_id: str,
+        team_id: str,
+        aggregation: Optional[str] = None,
+        k: Optional[int] = None
+    ) -> dict:
+        """A team's rank and score in a challenge, with its members' scores"""
+        aggregation, k = self._options(aggregation, k)
+        challenge_id, team_id = str(challenge_id), str(team_id)
+
+        def build() -> dict:
+            scores, members = self._challenge_scores(challenge_id, aggregation, k)
+            if team_id not in scores:
+                raise HTTPException(status_code=404, detail="Team has no scores in this challenge")
+            score = scores[team_id]
+            member_scores = self.storage.select(
+                'team_member_scores', 'user_id,score', {'challenge_id': challenge_id, 'team_id': team_id}
+            ).data or []
+            return {
+                'challenge_id': challenge_id,
+                'team_id': team_id,
+                'name': self._names([team_id]).get(team_id),
+                'aggregation': aggregation,
+                'score': score,
+                'rank': 1 + sum(1 for other in scores.values() if other > score),
+                'teams': len(scores),
+                'members': sorted(member_scores, key=lambda row: -row['score']),
+            }
+
+        return await asyncio.to_thread(build)
+
+team_leaderboard = TeamLeaderboard()
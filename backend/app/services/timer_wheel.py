@@ -0,0 +1,93 @@
+import heapq
+import itertools
+from typing import Any, List
+
+class Timer:
+    __slots__ = ("tick", "item", "cancelled")
+
+    def __init__(self, tick: int, item: Any):
+        self.tick = tick
+        self.item = item
+        self.cancelled = False
+
+class TimerWheel:
+    """Hierarchical timer wheel (Varghese & Lauck).
+
+    Level 0 has one slot per tick; each level above covers ``slots`` times
+    the span of the one below. A timer goes into the lowest level whose span
+    reaches its deadline and moves down a level ("cascades") when the wheel
+    below wraps around to it, so scheduling, cancelling and expiring are all
+    O(1) however many timers are pending. Deadlines beyond the top level wait
+    in a heap until they come within range.
+    """
+
+    def __init__(self, now_ms: int, tick_ms: int = 1000, slots: int = 64, levels: int = 4):
+        self.tick_ms = tick_ms
+        self.slots = slots
+        self.levels = levels
+        self.current = now_ms // tick_ms
+        self.wheels: List[List[List[Timer]]] = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.span = slots ** levels
+        self._overflow: List[tuple] = []
+        self._sequence = itertools.count()
+        self._ready: List[Timer] = []
+        self.pending = 0
+
+    def schedule(self, deadline_ms: int, item: Any) -> Timer:
+        """Schedule ``item`` for ``deadline_ms``; a deadline in the past fires on the next advance"""
+        timer = Timer(-(-deadline_ms // self.tick_ms), item)
+        self._place(timer)
+        self.pending += 1
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        if not timer.cancelled:
+            timer.cancelled = True
+            self.pending -= 1
+
+    def _place(self, timer: Timer) -> None:
+        delta = timer.tick - self.current
+        if delta <= 0:
+            self._ready.append(timer)
+            return
+        if delta >= self.span:
+            heapq.heappush(self._overflow, (timer.tick, next(self._sequence), timer))
+            return
+        level = 0
+        while delta >= self.slots ** (level + 1):
+            level += 1
+        self.wheels[level][(timer.tick // self.slots ** level) % self.slots].append(timer)
+
+    def _cascade(self) -> None:
+        """Move timers down from every level whose slot boundary the current tick crosses"""
+        if self.current % self.slots ** (self.levels - 1) == 0:
+            while self._overflow and self._overflow[0][0] - self.current < self.span:
+                self._place(heapq.heappop(self._overflow)[2])
+        for level in range(self.levels - 1, 0, -1):
+            size = self.slots ** level
+            if self.current % size == 0:
+                bucket = self.wheels[level][(self.current // size) % self.slots]
+                self.wheels[level][(self.current // size) % self.slots] = []
+                for timer in bucket:
+                    if not timer.cancelled:
+                        self._place(timer)
+
+    def advance(self, now_ms: int) -> List[Any]:
+        """Move the wheel up to ``now_ms`` and return the items that came due, in deadline order"""
+        target = now_ms // self.tick_ms
+        due = [timer for timer in self._ready if not timer.cancelled]
+        self._ready = []
+        if self.pending == len(due):
+            # Nothing live left in the wheels; skip the idle ticks
+            self.current = max(self.current, target)
+        while self.current < target:
+            self.current += 1
+            self._cascade()
+            slot = self.current % self.slots
+            bucket, self.wheels[0][slot] = self.wheels[0][slot], []
+            due.extend(timer for timer in bucket if not timer.cancelled)
+            due.extend(timer for timer in self._ready if not timer.cancelled)
+            self._ready = []
+        self.pending -= len(due)
+        due.sort(key=lambda timer: timer.tick)
+        return [timer.item for timer in due]
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from pydantic import TypeAdapter
+
+from ..core.config import settings
+from ..db.client_base import IN_FILTER_CHUNK
+from ..db.supabase_client import supabase
+from ..schemas.wallet import TransactionCreate, TransactionType
+
+logger = logging.getLogger(__name__)
+
+_datetime = TypeAdapter(datetime)
+
+def signed_amount(row: dict) -> int:
+    return row['amount'] if row['type'] == TransactionType.credit.value else -row['amount']
+
+def _as_utc(value) -> datetime:
+    value = _datetime.validate_python(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class WalletLedger:
+    """Append-only wallet ledger with snapshot balances and group commit.
+
+    Transactions are only ever inserted into ``wallet_transactions``; a
+    wallet's balance is its latest row in ``wallet_snapshots`` plus the
+    transactions after it. A new snapshot is written once a wallet has
+    ``WALLET_SNAPSHOT_INTERVAL`` transactions past the last one, so a balance
+    read is always two small queries.
+
+    ``seq`` is handed out when a row is inserted, not when it commits, so on
+    Postgres a row from another worker can become visible below a ``seq``
+    that is already visible. A snapshot therefore stops at the last row
+    stamped (by the database, at insert) more than
+    ``WALLET_SNAPSHOT_LAG_SECONDS`` ago: anything below it that was still in
+    flight has committed or rolled back by then.
+
+    ``post`` does not write directly. It queues the transaction for a single
+    committer task, which inserts everything queued since its last write in
+    one statement (group commit). Callers still wait for their own row to be
+    committed, so a returned transaction is durable. If the batch fails, its
+    rows are retried one at a time, so only the callers whose own row is bad
+    get an error.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.WALLET_BATCH_SIZE,
+        flush_interval: float = settings.WALLET_FLUSH_INTERVAL_MS / 1000,
+        snapshot_interval: int = settings.WALLET_SNAPSHOT_INTERVAL,
+        snapshot_lag: float = settings.WALLET_SNAPSHOT_LAG_SECONDS,
+        storage=None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_lag = snapshot_lag
+        self.storage = storage or supabase
+        self._queue: Optional[asyncio.Queue] = None
+        self._committer: Optional[asyncio.Task] = None
+        # Transactions committed by this process since each wallet's last snapshot
+        self._unsnapshotted: Dict[str, int] = defaultdict(int)
+
+    # Wallets
+
+    async def create_wallet(self, user_id) -> dict:
+        existing = await asyncio.to_thread(self.storage.select, 'wallets', '*', {'user_id': str(user_id)})
+        if existing.data:
+            raise HTTPException(status_code=400, detail="User already has a wallet")
+        response = await asyncio.to_thread(self.storage.insert, 'wallets', {'user_id': str(user_id)})
+        return {**response.data[0], 'balance': 0}
+
+    async def get_wallet(self, user_id) -> dict:
+        response = await asyncio.to_thread(self.storage.select, 'wallets', '*', {'user_id': str(user_id)})
+        if not response.data:
+            raise HTTPException(status_code=404, detail="Wallet not found")
+        wallet = response.data[0]
+        return {**wallet, 'balance': await self.get_balance(wallet['id'])}
+
+    async def get_balance(self, wallet_id) -> int:
+        balance, _ = await asyncio.to_thread(self._read_balance, str(wallet_id))
+        return balance
+
+    def _read_balance(self, wallet_id: str) -> Tuple[int, int]:
+        """Latest snapshot plus the transactions after it; snapshots again if that tail got long"""
+        snapshot = self.storage.select(
+            'wallet_snapshots',
+            'seq,balance',
+            {'wallet_id': wallet_id},
+            order='seq',
+            desc=True,
+            limit=1
+        )
+        seq, balance = (snapshot.data[0]['seq'], snapshot.data[0]['balance']) if snapshot.data else (0, 0)
+
+        tail = self.storage.select(
+            'wallet_transactions',
+            'seq,amount,type,timestamp',
+            {'wallet_id': wallet_id, 'seq': {'gt': seq}},
+            order='seq'
+        ).data or []
+
+        # Only the leading rows old enough that nothing below them can still commit
+        settled_before = datetime.now(timezone.utc) - timedelta(seconds=self.snapshot_lag)
+        settled = 0
+        while settled < len(tail) and _as_utc(tail[settled]['timestamp']) <= settled_before:
+            settled += 1
+        settled_balance = balance + sum(signed_amount(row) for row in tail[:settled])
+        balance = settled_balance + sum(signed_amount(row) for row in tail[settled:])
+
+        if settled >= self.snapshot_interval:
+            self._write_snapshots([{'wallet_id': wallet_id, 'seq': tail[settled - 1]['seq'], 'balance': settled_balance}])
+        return balance, tail[-1]['seq'] if tail else seq
+
+    def _write_snapshots(self, snapshots: List[dict]) -> None:
+        try:
+            self.storage.insert('wallet_snapshots', snapshots)
+        except Exception as e:
+            # Another writer snapshotted the same point first; the balance is the same
+            logger.debug(f"Skipped wallet snapshots: {str(e)}")
+        for snapshot in snapshots:
+            self._unsnapshotted.pop(snapshot['wallet_id'], None)
+
+    # Transactions
+
+    async def post(self, transaction: TransactionCreate) -> dict:
+        """Append one transaction; returns the committed row"""
+        return (await self.post_many([transaction]))[0]
+
+    async def post_many(self, transactions: List[TransactionCreate]) -> List[dict]:
+        """Append transactions through the group committer; returns committed rows in order"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.create_task(self._commit_loop())
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for transaction in transactions:
+            future = loop.create_future()
+            self._queue.put_nowait((self._to_row(transaction), future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    @staticmethod
+    def _to_row(transaction: TransactionCreate) -> dict:
+        # No timestamp: the database stamps the row at insert, which snapshots rely on
+        return {
+            'id': str(uuid.uuid4()),
+            'wallet_id': str(transaction.wallet_id),
+            'amount': transaction.amount,
+            'type': TransactionType(transaction.type).value,
+            'reference': transaction.reference,
+        }
+
+    async def _commit_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if self.flush_interval:
+                await asyncio.sleep(self.flush_interval)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            results = await asyncio.to_thread(self._commit, [row for row, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+            committed = [result for result in results if not isinstance(result, Exception)]
+            try:
+                await asyncio.to_thread(self._snapshot_due, committed)
+            except Exception as e:
+                logger.error(f"Failed to snapshot wallet balances: {str(e)}")
+
+    def _commit(self, rows: List[dict]) -> List[Union[dict, Exception]]:
+        """Commit a batch in one go, or row by row if that fails; each row gets its stored row or its error"""
+        try:
+            return self._insert(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                return [e]
+            logger.warning(f"Failed to commit {len(rows)} wallet transactions together, retrying one by one: {str(e)}")
+
+        results: List[Union[dict, Exception]] = []
+        for row in rows:
+            try:
+                results.extend(self._insert([row]))
+            except Exception as e:
+                logger.error(f"Failed to commit wallet transaction {row['id']}: {str(e)}")
+                results.append(e)
+        return results
+
+    def _insert(self, rows: List[dict]) -> List[dict]:
+        """Insert rows, skipping references that were already posted; returns the stored row for each"""
+        keyed: Dict[str, dict] = {}
+        unkeyed = []
+        for row in rows:
+            if row['reference']:
+                keyed.setdefault(row['reference'], row)
+            else:
+                unkeyed.append(row)
+
+        stored = []
+        if keyed:
+            # ON CONFLICT (reference) DO NOTHING also covers a concurrent post from another worker
+            stored += self.storage.insert_ignore('wallet_transactions', list(keyed.values()), on_conflict='reference').data or []
+        if unkeyed:
+            stored += self.storage.insert('wallet_transactions', unkeyed).data or []
+        for row in stored:
+            self._unsnapshotted[row['wallet_id']] += 1
+
+        by_reference = {row['reference']: row for row in stored if row['reference']}
+        existing = sorted(set(keyed) - set(by_reference))
+        for start in range(0, len(existing), IN_FILTER_CHUNK):
+            response = self.storage.select(
+                'wallet_transactions', '*', {'reference': {'in': existing[start:start + IN_FILTER_CHUNK]}}
+            )
+            by_reference.update({row['reference']: row for row in (response.data or [])})
+
+        by_id = {row['id']: row for row in stored}
+        return [by_reference[row['reference']] if row['reference'] else by_id[row['id']] for row in rows]
+
+    def _snapshot_due(self, committed: List[dict]) -> None:
+        """Snapshot wallets this batch pushed past the snapshot interval"""
+        due = {
+            row['wallet_id'] for row in committed
+            if self._unsnapshotted.get(row['wallet_id'], 0) >= self.snapshot_interval
+        }
+        for wallet_id in due:
+            # Reading the balance writes the snapshot once the tail is long enough
+            self._read_balance(wallet_id)
+            self._unsnapshotted.pop(wallet_id, None)
+
+    async def list_transactions(self, wallet_id, before: Optional[int] = None, limit: int = 100) -> List[dict]:
+        """Newest transactions first; pass the last `seq` as `before` for the next page"""
+        filters = {'wallet_id': str(wallet_id)}
+        if before is not None:
+            filters['seq'] = {'lt': before}
+        response = await asyncio.to_thread(
+            self.storage.select, 'wallet_transactions', '*', filters, order='seq', desc=True, limit=limit
+        )
+        return response.data or []
+
+wallet_ledger = WalletLedger()
@@ -0,0 +1,85 @@
+"""Serialization time of a large leaderboard: the fast JSON path against FastAPI's default.
+
+The default path builds a ``LeaderboardEntry`` per row, validates the
+response against ``response_model`` and runs ``jsonable_encoder`` before
+``json.dumps``, as FastAPI does for an endpoint returning models. The fast
+path projects rows with ``RowEncoder`` and encodes once with orjson.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_fast_json [row_count]
+"""
+import gzip
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.fast_json import EncodedPayload, RowEncoder
+from app.schemas.leaderboard import ChallengeLeaderboard, LeaderboardEntry, LeaderboardResponse
+
+def synthetic_rows(count: int, seed: int = 7) -> list:
+    """Rows as storage returns them for get_challenge_leaderboard, best first"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    scores = sorted((rng.randint(0, 100000) for _ in range(count)), reverse=True)
+    return [
+        {
+            'user_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'username': f"player_{i}",
+            'score': score,
+            'last_updated': (start + timedelta(seconds=rng.randint(0, 86400 * 30))).isoformat(),
+        }
+        for i, score in enumerate(scores)
+    ]
+
+def model_path(rows: list) -> bytes:
+    entries = [
+        LeaderboardEntry(
+            user_id=row['user_id'],
+            username=row['username'],
+            score=row['score'],
+            rank=idx + 1,
+            last_updated=row['last_updated']
+        )
+        for idx, row in enumerate(rows)
+    ]
+    response = LeaderboardResponse(success=True, data=ChallengeLeaderboard(challenge_id="c1", scores=entries))
+    # FastAPI re-validates the returned object against response_model, then encodes it
+    validated = LeaderboardResponse.model_validate(response.model_dump())
+    content = jsonable_encoder(validated)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def fast_path(rows: list, encoder: RowEncoder) -> bytes:
+    ranked = [{**row, 'rank': idx + 1} for idx, row in enumerate(rows)]
+    data = {'challenge_id': "c1", 'scores': encoder.rows(ranked), 'as_of': None}
+    return EncodedPayload.of({'success': True, 'data': data}).body
+
+def timed(fn, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+def main(count: int) -> None:
+    rows = synthetic_rows(count)
+    encoder = RowEncoder(LeaderboardEntry)
+    slow, fast = model_path(rows), fast_path(rows, encoder)
+    assert len(json.loads(fast)['data']['scores']) == len(json.loads(slow)['data']['scores']) == count
+
+    runs = max(1, min(50, 500000 // count))
+    print(f"rows:                {count}")
+    print(f"model path:          {timed(lambda: model_path(rows), runs):>12.2f} ms")
+    print(f"fast path:           {timed(lambda: fast_path(rows, encoder), runs):>12.2f} ms")
+    cached = EncodedPayload(fast)
+    cached.encoded("gzip")
+    print(f"cached gzip payload: {timed(lambda: cached.encoded('gzip'), runs):>12.4f} ms")
+    print(f"body size:           {len(fast):>12,} bytes")
+    print(f"gzip size:           {len(gzip.compress(fast, 6)):>12,} bytes")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
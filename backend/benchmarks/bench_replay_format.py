@@ -0,0 +1,77 @@
+"""Size and seek latency of the binary replay format against the text form.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_replay_format [event_count]
+"""
+import json
+import random
+import sys
+import time
+import zlib
+
+from app.services.replay_format import ReplayReader, convert_text_replay, parse_text_replay
+
+def synthetic_events(count: int, seed: int = 7) -> list:
+    """Editor-like session: cursor moves often, file switches and test runs rarely"""
+    rng = random.Random(seed)
+    files = [f"src/module_{i}.py" for i in range(20)]
+    t = 0
+    line, column, current = 1, 0, files[0]
+    events = []
+    for _ in range(count):
+        t += rng.randint(5, 400)
+        event = {'t': t}
+        roll = rng.random()
+        if roll < 0.02:
+            current = rng.choice(files)
+            event['file'] = current
+        if roll < 0.9:
+            line = max(1, line + rng.randint(-3, 3))
+            column = rng.randint(0, 80)
+            event.update(line=line, column=column)
+        else:
+            event['tests'] = {'passed': rng.randint(0, 50), 'failed': rng.randint(0, 5)}
+        events.append(event)
+    return events
+
+def text_state_at(text: str, t: int) -> dict:
+    """Seek in the text form: parse everything, fold events up to t"""
+    state = {}
+    for event in parse_text_replay(text):
+        if event['t'] > t:
+            break
+        state.update({key: value for key, value in event.items() if key != 't'})
+    return state
+
+def timed(fn, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+def main(count: int) -> None:
+    events = synthetic_events(count)
+    text = "\n".join(json.dumps(event) for event in events)
+    binary = convert_text_replay(text)
+    reader = ReplayReader.from_bytes(binary)
+    duration = events[-1]['t']
+    rng = random.Random(1)
+    targets = [rng.randint(0, duration) for _ in range(200)]
+
+    assert reader.state_at(targets[0]) == text_state_at(text, targets[0])
+
+    print(f"events:              {count}")
+    print(f"text size:           {len(text.encode()):>12,} bytes")
+    print(f"text + zlib size:    {len(zlib.compress(text.encode(), 6)):>12,} bytes")
+    print(f"binary size:         {len(binary):>12,} bytes")
+
+    text_runs = max(1, min(20, 200000 // count))
+    text_ms = timed(lambda: text_state_at(text, rng.choice(targets)), text_runs)
+    # A fresh reader per seek, so the segment cache does not flatter the numbers
+    binary_ms = timed(lambda: ReplayReader.from_bytes(binary).state_at(rng.choice(targets)), len(targets))
+    print(f"text seek:           {text_ms:>12.3f} ms")
+    print(f"binary seek:         {binary_ms:>12.3f} ms")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -23,39 +23,77 @@ CREATE POLICY "Allow public insert for registration" ON users
 
 
 -- Leaderboard statement and functions
--- Function to get global leaderboard with materialized view
-CREATE MATERIALIZED VIEW global_leaderboard_view AS
-SELECT 
-    u.username,
-    COALESCE(SUM(sh.score), 0) as total_score,
-    MAX(sh.last_updated) as last_updated
-FROM 
-    public.users u
-LEFT JOIN 
-    score_history sh ON u.id = sh.user_id
-GROUP BY 
-    u.username
-ORDER BY 
-    total_score DESC;
-
--- Create index for better performance
-CREATE INDEX idx_global_leaderboard_score 
-ON global_leaderboard_view (total_score DESC);
-
--- Function to refresh materialized view
-CREATE OR REPLACE FUNCTION refresh_global_leaderboard()
+-- Global totals per user, kept up to date incrementally: each statement on
+-- score_history adds or subtracts only the rows it touched (see the triggers
+-- below) instead of re-aggregating every score
+DROP TRIGGER IF EXISTS refresh_global_leaderboard_trigger ON score_history;
+DROP FUNCTION IF EXISTS refresh_global_leaderboard();
+DROP MATERIALIZED VIEW IF EXISTS global_leaderboard_view;
+
+CREATE TABLE IF NOT EXISTS global_leaderboard_totals (
+    user_id uuid PRIMARY KEY,
+    total_score bigint NOT NULL DEFAULT 0,
+    last_updated timestamp with time zone
+);
+
+CREATE INDEX IF NOT EXISTS idx_global_leaderboard_score
+ON global_leaderboard_totals (total_score DESC);
+
+-- Backfill once from existing scores
+INSERT INTO global_leaderboard_totals (user_id, total_score, last_updated)
+SELECT user_id, SUM(score), MAX(last_updated)
+FROM score_history
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
+
+-- Apply one statement's changes to the totals, using its transition tables
+CREATE OR REPLACE FUNCTION apply_score_history_changes()
 RETURNS trigger AS $$
 BEGIN
-    REFRESH MATERIALIZED VIEW CONCURRENTLY global_leaderboard_view;
-    RETURN NEW;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE global_leaderboard_totals t
+        SET total_score = t.total_score - removed.score
+        FROM (SELECT user_id, SUM(score) AS score FROM old_rows GROUP BY user_id) removed
+        WHERE t.user_id = removed.user_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO global_leaderboard_totals AS t (user_id, total_score, last_updated)
+        SELECT user_id, SUM(score), MAX(last_updated) FROM new_rows GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE
+            SET total_score = t.total_score + EXCLUDED.total_score,
+                last_updated = GREATEST(t.last_updated, EXCLUDED.last_updated);
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        -- Only the affected users' latest remaining score is looked up
+        UPDATE global_leaderboard_totals t
+        SET last_updated = (SELECT MAX(sh.last_updated) FROM score_history sh WHERE sh.user_id = t.user_id)
+        WHERE t.user_id IN (SELECT DISTINCT user_id FROM old_rows);
+    END IF;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger to refresh view when scores change
-CREATE TRIGGER refresh_global_leaderboard_trigger
-AFTER INSERT OR UPDATE OR DELETE ON score_history
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS score_history_totals_insert ON score_history;
+CREATE TRIGGER score_history_totals_insert
+AFTER INSERT ON score_history
+REFERENCING NEW TABLE AS new_rows
 FOR EACH STATEMENT
-EXECUTE FUNCTION refresh_global_leaderboard();
+EXECUTE FUNCTION apply_score_history_changes();
+
+DROP TRIGGER IF EXISTS score_history_totals_update ON score_history;
+CREATE TRIGGER score_history_totals_update
+AFTER UPDATE ON score_history
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_score_history_changes();
+
+DROP TRIGGER IF EXISTS score_history_totals_delete ON score_history;
+CREATE TRIGGER score_history_totals_delete
+AFTER DELETE ON score_history
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_score_history_changes();
 
 -- Function to get global leaderboard
 CREATE OR REPLACE FUNCTION get_global_leaderboard()
@@ -65,18 +103,49 @@ RETURNS TABLE (
     last_updated timestamp with time zone
 ) LANGUAGE sql STABLE AS $$
     SELECT 
-        username,
-        total_score as score,
-        last_updated
+        u.username,
+        COALESCE(t.total_score, 0) as score,
+        t.last_updated
     FROM 
-        global_leaderboard_view
+        public.users u
+    LEFT JOIN 
+        global_leaderboard_totals t ON t.user_id = u.id
     ORDER BY 
-        total_score DESC;
+        score DESC;
+$$;
+
+-- Roll back many users' scores after a moment in one statement, optionally
+-- in one challenge; the delete trigger subtracts just those rows from the
+-- totals. Returns what was removed per user and challenge
+CREATE OR REPLACE FUNCTION rollback_scores(
+    user_ids uuid[],
+    after timestamp with time zone,
+    challenge_id_param text DEFAULT NULL
+)
+RETURNS TABLE (
+    user_id uuid,
+    challenge_id text,
+    removed_rows bigint,
+    removed_score bigint
+) LANGUAGE sql AS $$
+    WITH removed AS (
+        DELETE FROM score_history sh
+        WHERE sh.user_id = ANY(user_ids)
+          AND sh.last_updated > after
+          AND (challenge_id_param IS NULL OR sh.challenge_id = challenge_id_param)
+        RETURNING sh.user_id, sh.challenge_id, sh.score
+    )
+    SELECT r.user_id, r.challenge_id, COUNT(*), SUM(r.score)
+    FROM removed r
+    GROUP BY r.user_id, r.challenge_id;
 $$;
 
 -- Function to get challenge leaderboard
+-- user_id is returned so jobs such as prize payouts can act on the ranking
+DROP FUNCTION IF EXISTS get_challenge_leaderboard(text);
 CREATE OR REPLACE FUNCTION get_challenge_leaderboard(challenge_id_param text)
 RETURNS TABLE (
+    user_id uuid,
     username text,
     score int,
     last_updated timestamp with time zone
@@ -94,6 +163,7 @@ RETURNS TABLE (
             user_id, last_updated DESC
     )
     SELECT 
+        ls.user_id,
         u.username,
         ls.score,
         ls.last_updated
@@ -101,6 +171,222 @@ RETURNS TABLE (
         latest_scores ls
     JOIN 
         users u ON u.id = ls.user_id
+    -- user_id breaks ties, so pages of the ranking (.range()) never overlap
     ORDER BY 
-        ls.score DESC;
-$$;
\ No newline at end of file
+        ls.score DESC, ls.user_id;
+$$;
+
+-- Tables added alongside the SQLAlchemy models in app/models; the SQL backend
+-- creates the same tables with create_all
+
+-- Chat
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    room_type text NOT NULL,
+    room_id uuid NOT NULL,
+    user_id uuid NOT NULL,
+    content text NOT NULL,
+    timestamp timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_chat_messages_room_timestamp
+ON chat_messages (room_type, room_id, timestamp DESC);
+
+-- Replays
+CREATE TABLE IF NOT EXISTS replays (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    challenge_id uuid NOT NULL,
+    user_id uuid NOT NULL,
+    size bigint NOT NULL,
+    chunk_count int NOT NULL,
+    content_hash text NOT NULL,
+    created_at timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_replays_challenge_user ON replays (challenge_id, user_id);
+
+-- Wallets
+CREATE TABLE IF NOT EXISTS wallets (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id uuid NOT NULL,
+    created_at timestamp with time zone DEFAULT now(),
+    updated_at timestamp with time zone DEFAULT now()
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_wallets_user_id ON wallets (user_id);
+
+CREATE TABLE IF NOT EXISTS wallet_transactions (
+    seq bigserial PRIMARY KEY,
+    id uuid NOT NULL UNIQUE DEFAULT gen_random_uuid(),
+    wallet_id uuid NOT NULL,
+    amount bigint NOT NULL,
+    type text NOT NULL,
+    reference text UNIQUE,
+    timestamp timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_wallet_transactions_wallet_seq ON wallet_transactions (wallet_id, seq);
+
+CREATE TABLE IF NOT EXISTS wallet_snapshots (
+    wallet_id uuid NOT NULL,
+    seq bigint NOT NULL,
+    balance bigint NOT NULL,
+    created_at timestamp with time zone DEFAULT now(),
+    PRIMARY KEY (wallet_id, seq)
+);
+
+-- Prize payouts
+CREATE TABLE IF NOT EXISTS payout_runs (
+    challenge_id text PRIMARY KEY,
+    status text NOT NULL DEFAULT 'running',
+    winners int NOT NULL DEFAULT 0,
+    posted int NOT NULL DEFAULT 0,
+    total_amount bigint NOT NULL DEFAULT 0,
+    participants int NOT NULL DEFAULT 0,
+    schedule jsonb NOT NULL,
+    payouts jsonb NOT NULL,
+    created_at timestamp with time zone DEFAULT now(),
+    updated_at timestamp with time zone DEFAULT now()
+);
+
+-- Skill profiles
+CREATE TABLE IF NOT EXISTS skill_profiles (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id uuid NOT NULL,
+    skills json NOT NULL DEFAULT '{}',
+    updated_at timestamp with time zone DEFAULT now()
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_skill_profiles_user_id ON skill_profiles (user_id);
+
+-- Enrollments
+CREATE TABLE IF NOT EXISTS enrollments (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id uuid NOT NULL REFERENCES users (id),
+    challenge_id uuid NOT NULL REFERENCES challenges (id),
+    team_id uuid REFERENCES teams (id),
+    status text NOT NULL DEFAULT 'enrolled',
+    score float,
+    submitted_at timestamp with time zone,
+    created_at timestamp with time zone DEFAULT now(),
+    updated_at timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_enrollments_challenge_team ON enrollments (challenge_id, team_id);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_enrollments_challenge_user ON enrollments (challenge_id, user_id);
+
+-- Challenge lifecycle scheduler
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name text PRIMARY KEY,
+    holder text NOT NULL,
+    expires_at timestamp with time zone NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS challenge_lifecycle_events (
+    challenge_id uuid NOT NULL,
+    event text NOT NULL,
+    fired_at timestamp with time zone DEFAULT now(),
+    PRIMARY KEY (challenge_id, event)
+);
+
+-- Achievements
+CREATE TABLE IF NOT EXISTS user_achievements (
+    user_id uuid NOT NULL,
+    code text NOT NULL,
+    awarded_at timestamp with time zone DEFAULT now(),
+    PRIMARY KEY (user_id, code)
+);
+
+CREATE TABLE IF NOT EXISTS achievement_counters (
+    user_id uuid NOT NULL,
+    name text NOT NULL,
+    value bigint NOT NULL DEFAULT 0,
+    updated_at timestamp with time zone DEFAULT now(),
+    PRIMARY KEY (user_id, name)
+);
+
+-- AI-generated challenges
+CREATE TABLE IF NOT EXISTS ai_generated_challenges (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    title text NOT NULL,
+    description text NOT NULL,
+    difficulty text NOT NULL,
+    ai_prompt text NOT NULL,
+    model text,
+    signature json NOT NULL,
+    created_at timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_ai_generated_challenges_created_at ON ai_generated_challenges (created_at);
+
+CREATE TABLE IF NOT EXISTS ai_prompt_cache (
+    prompt_hash text PRIMARY KEY,
+    challenge_id uuid NOT NULL,
+    created_at timestamp with time zone DEFAULT now()
+);
+
+-- Score trajectories: accepted scores, appended, then compacted into columnar chunks
+CREATE TABLE IF NOT EXISTS score_points (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    challenge_id text NOT NULL,
+    user_id uuid NOT NULL,
+    score integer NOT NULL,
+    recorded_at bigint NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_score_points_challenge_user_recorded ON score_points (challenge_id, user_id, recorded_at);
+
+CREATE TABLE IF NOT EXISTS score_trajectory_chunks (
+    challenge_id text NOT NULL,
+    user_id uuid NOT NULL,
+    chunk integer NOT NULL,
+    count integer NOT NULL,
+    first_at bigint NOT NULL,
+    last_at bigint NOT NULL,
+    last_point_id text NOT NULL,
+    offsets json NOT NULL,
+    scores json NOT NULL,
+    preview_offsets json NOT NULL,
+    preview_scores json NOT NULL,
+    created_at timestamp with time zone DEFAULT now(),
+    PRIMARY KEY (challenge_id, user_id, chunk)
+);
+
+-- Refresh tokens: one row per sign-in; rotating a token swaps current_jti
+CREATE TABLE IF NOT EXISTS refresh_token_families (
+    id uuid PRIMARY KEY,
+    user_id uuid NOT NULL,
+    current_jti text NOT NULL,
+    expires_at timestamp with time zone NOT NULL,
+    revoked boolean NOT NULL DEFAULT false,
+    created_at timestamp with time zone DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_refresh_token_families_user_id ON refresh_token_families (user_id);
+
+-- Team standings: members' current scores and per-team aggregates, updated per accepted score
+CREATE TABLE IF NOT EXISTS team_member_scores (
+    challenge_id text NOT NULL,
+    user_id uuid NOT NULL,
+    team_id uuid NOT NULL,
+    score integer NOT NULL,
+    updated_at timestamp with time zone DEFAULT now(),
+    PRIMARY KEY (challenge_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS ix_team_member_scores_team_id ON team_member_scores (team_id);
+
+CREATE TABLE IF NOT EXISTS team_scores (
+    challenge_id text NOT NULL,
+    team_id uuid NOT NULL,
+    members integer NOT NULL,
+    total bigint NOT NULL,
+    top_scores jsonb NOT NULL,
+    updated_at timestamp with time zone DEFAULT now(),
+    PRIMARY KEY (challenge_id, team_id)
+);
+
+-- Add to per-user achievement counters atomically, so workers never overwrite each other's counts
+CREATE OR REPLACE FUNCTION increment_achievement_counters(counters jsonb)
+RETURNS TABLE (
+    user_id uuid,
+    name text,
+    value bigint
+) LANGUAGE sql AS $$
+    INSERT INTO achievement_counters AS ac (user_id, name, value)
+    SELECT (c->>'user_id')::uuid, c->>'name', (c->>'value')::bigint
+    FROM jsonb_array_elements(counters) c
+    ON CONFLICT (user_id, name) DO UPDATE
+        SET value = ac.value + EXCLUDED.value, updated_at = now()
+    RETURNING ac.user_id, ac.name, ac.value;
+$$;
@@ -1,3 +1,32 @@
+import os
 import pytest
 
+# Run the app against an in-process database; never the Supabase project or ./test.db
+os.environ.setdefault("DATABASE_BACKEND", "sql")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Nor the host's shared cache file, which would carry entries between runs
+os.environ.setdefault("SHARED_CACHE_ENABLED", "false")
+
+from sqlalchemy import create_engine
+
 # Define fixtures for testing
+
+@pytest.fixture
+def sql_client(tmp_path):
+    """SQL storage backend on a fresh database file.
+
+    A file rather than one shared in-memory connection, so services that
+    write from several worker threads at once each get their own connection.
+    Foreign keys stay unenforced, as SQLite's default, so tests can insert
+    rows without their parents.
+    """
+    from app.db.sql_client import SQLClient
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    client = SQLClient(engine)
+    client.create_tables()
+    yield client
+    engine.dispose()
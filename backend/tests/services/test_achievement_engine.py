@@ -0,0 +1,42 @@
+import asyncio
+import uuid
+from app.services.achievement_engine import (
+    AchievementEngine, ENROLLMENT_ADMITTED, JUDGE_EVALUATED, SCORE_IMPROVED
+)
+
+
+def test_events_award_once_and_only_matching_rules(sql_client):
+    async def scenario():
+        engine = AchievementEngine(storage=sql_client)
+        user_id = str(uuid.uuid4())
+
+        awards = await engine.emit(SCORE_IMPROVED, user_id, challenge_id="c1", score=40, previous=None, rank=5)
+        assert [award['code'] for award in awards] == ["first_score"]
+        awards = await engine.emit(SCORE_IMPROVED, user_id, challenge_id="c1", score=80, previous=40, rank=1)
+        assert sorted(award['code'] for award in awards) == ["champion", "podium"]
+        assert await engine.emit(SCORE_IMPROVED, user_id, challenge_id="c1", score=90, previous=80, rank=1) == []
+
+        # Only enrollment rules are evaluated for an enrollment event
+        awards = await engine.emit(ENROLLMENT_ADMITTED, user_id, challenge_id="c2")
+        assert [award['code'] for award in awards] == ["first_enrollment"]
+
+        # Two workers handling the same user's events add to the same counters
+        other = AchievementEngine(storage=sql_client)
+        for _ in range(3):
+            await asyncio.gather(*(
+                worker.emit(SCORE_IMPROVED, user_id, challenge_id=f"x{i}", score=10, previous=None, rank=9)
+                for i, worker in enumerate((engine, other))
+            ))
+        # A restarted engine continues from the stored counters
+        fresh = AchievementEngine(storage=sql_client)
+        awards = await fresh.emit(JUDGE_EVALUATED, user_id, score=95)
+        assert sorted(award['code'] for award in awards) == ["first_submission", "top_marks"]
+        response = await asyncio.to_thread(sql_client.select, 'achievement_counters', 'name,value', {'user_id': user_id})
+        counters = {row['name']: row['value'] for row in response.data}
+        assert counters['challenges_scored'] == 7 and counters['improvements'] == 2
+
+        codes = [award['code'] for award in await fresh.user_achievements(user_id)]
+        assert sorted(codes) == ["champion", "first_enrollment", "first_score", "first_submission",
+                                 "five_challenges", "podium", "top_marks"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.admission import AdmissionControlMiddleware
+from app.core.security import create_access_token
+
+
+def _app(release, **limits):
+    app = FastAPI()
+    clock = {'now': 0.0}
+
+    @app.get("/items/{item_id}")
+    async def read(item_id: str):
+        await release.wait()
+        return {'item_id': item_id}
+
+    @app.post("/judge/submit")
+    async def judge():
+        await release.wait()
+        return {'score': 1}
+
+    app.add_middleware(AdmissionControlMiddleware, routes=app.routes, clock=lambda: clock['now'], **limits)
+    return app, clock
+
+
+def _client(app, ip="10.0.0.1"):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, client=(ip, 1234)), base_url="http://test")
+
+
+def test_buckets_limit_each_user_and_ip():
+    async def scenario():
+        release = asyncio.Event()
+        release.set()
+        app, clock = _app(release, user_rate=1, user_burst=3, ip_rate=10, ip_burst=10)
+        token = create_access_token({'sub': "user-1"})
+        async with _client(app) as client, _client(app, ip="10.0.0.2") as other:
+            signed_in = {'Authorization': f"Bearer {token}"}
+            codes = [(await client.get(f"/items/{i}", headers=signed_in)).status_code for i in range(4)]
+            assert codes == [200, 200, 200, 429]
+            rejected = await client.get("/items/x", headers=signed_in)
+            assert rejected.headers["Retry-After"] == "1"
+
+            # Judge submissions cost 5 tokens: the anonymous IP bucket has 10, 4 of them spent above
+            assert (await client.post("/judge/submit")).status_code == 200
+            response = await client.post("/judge/submit")
+            assert response.status_code == 429 and response.headers["Retry-After"] == "1"
+            # Another IP has its own bucket, and a forged token only counts against the IP
+            forged = {'Authorization': "Bearer not-a-token"}
+            assert (await other.post("/judge/submit", headers=forged)).status_code == 200
+
+            clock['now'] += 1
+            assert (await client.get("/items/y", headers=signed_in)).status_code == 200
+
+    asyncio.run(scenario())
+
+
+def test_judge_submissions_are_shed_before_reads():
+    async def scenario():
+        release = asyncio.Event()
+        app, _ = _app(release, max_in_flight=4, ip_rate=1000, ip_burst=1000)
+        async with _client(app) as client:
+            # Judge submissions may fill half of the in-flight slots
+            judging = [asyncio.create_task(client.post("/judge/submit")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            shed = await client.post("/judge/submit")
+            assert shed.status_code == 503 and shed.headers["Retry-After"] == "1"
+
+            # Reads may fill the rest
+            reading = [asyncio.create_task(client.get(f"/items/{i}")) for i in range(2)]
+            await asyncio.sleep(0.05)
+            assert (await client.get("/items/full")).status_code == 503
+
+            release.set()
+            responses = await asyncio.gather(*judging, *reading)
+            assert [response.status_code for response in responses] == [200] * 4
+            assert (await client.post("/judge/submit")).status_code == 200
+
+    asyncio.run(scenario())
+
+
+def test_in_flight_limit_is_per_route_template():
+    async def scenario():
+        release = asyncio.Event()
+        app, _ = _app(release, route_max_in_flight=1, ip_rate=1000, ip_burst=1000)
+        async with _client(app) as client:
+            reading = asyncio.create_task(client.get("/items/1"))
+            await asyncio.sleep(0.05)
+            # Same route, another id
+            assert (await client.get("/items/2")).status_code == 503
+            judging = asyncio.create_task(client.post("/judge/submit"))
+            await asyncio.sleep(0.05)
+            assert not judging.done()
+
+            release.set()
+            assert [(await task).status_code for task in (reading, judging)] == [200, 200]
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import asyncio
+import random
+import pytest
+from fastapi import HTTPException
+from app.schemas.ai_generated_challenge import AIGeneratedChallengeCreate
+from app.services.ai_challenge_generator import AIChallengeGenerator
+from app.services.near_duplicates import MinHashLSH
+
+WORDS = [f"word{i}" for i in range(500)]
+
+
+def text(seed, length=120):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def paraphrase(description, changes, seed=0):
+    rng = random.Random(seed)
+    words = description.split()
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def test_lsh_finds_near_duplicates_only():
+    index = MinHashLSH(threshold=0.7)
+    originals = {str(i): text(i) for i in range(200)}
+    for key, description in originals.items():
+        index.add(key, index.signature(description))
+
+    found = index.nearest(index.signature(paraphrase(originals["17"], 3)))
+    assert found is not None and found[0] == "17"
+    assert index.nearest(index.signature(text(1000))) is None
+    index.remove("17")
+    assert index.nearest(index.signature(originals["17"])) is None
+
+
+class FakeModel:
+    def __init__(self, descriptions):
+        self.descriptions = descriptions
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, prompt, difficulty, model):
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return {'title': prompt[:20], 'description': self.descriptions[prompt.strip().lower()]}
+
+
+async def finish(generator):
+    while generator._tasks:
+        await asyncio.gather(*list(generator._tasks))
+
+
+def test_repeat_prompts_are_free_and_paraphrases_are_caught(sql_client):
+    async def scenario():
+        base = text(1)
+        model = FakeModel({
+            **{f"prompt {i}": text(100 + i) for i in range(6)},
+            "same idea": paraphrase(base, 2),
+            "original idea": base,
+        })
+        generator = AIChallengeGenerator(generate=model, storage=sql_client, concurrency=2, model="test")
+
+        jobs = [generator.submit(f"prompt {i}", "Easy") for i in range(6)]
+        # A second request while the first is running joins it
+        assert generator.submit("  PROMPT 0 ", "Easy") is jobs[0]
+        await finish(generator)
+        assert model.calls == 6 and model.peak == 2
+        assert all(job['status'] == "done" and not job['duplicate'] for job in jobs)
+
+        # Served from the prompt cache once done, also by a fresh worker
+        again = AIChallengeGenerator(generate=model, storage=sql_client, model="test")
+        cached = again.submit("Prompt 3", "Easy")
+        await finish(again)
+        assert cached['cached'] and cached['challenge_id'] == jobs[3]['challenge_id'] and model.calls == 6
+        # A different difficulty is a different prompt (here the model wrote the same challenge anyway)
+        hard = again.submit("Prompt 3", "Hard")
+        await finish(again)
+        assert model.calls == 7 and hard['duplicate'] and hard['challenge_id'] == jobs[3]['challenge_id']
+
+        first = generator.submit("original idea", "Medium")
+        await finish(generator)
+        second = generator.submit("same idea", "Medium")
+        await finish(generator)
+        assert second['duplicate'] and second['challenge_id'] == first['challenge_id']
+        assert len(sql_client.select('ai_generated_challenges').data) == 7
+
+        with pytest.raises(HTTPException) as duplicate:
+            await generator.create_challenge(AIGeneratedChallengeCreate(
+                title="Copy", description=paraphrase(base, 1, seed=3), difficulty="Medium", ai_prompt="by hand"
+            ))
+        assert duplicate.value.status_code == 409
+
+        # Deleting a challenge lets its prompt be generated again
+        await generator.delete_challenge(first['challenge_id'])
+        regenerated = generator.submit("same idea", "Medium")
+        await finish(generator)
+        assert not regenerated['duplicate'] and not regenerated['cached']
+
+    asyncio.run(scenario())
@@ -0,0 +1,103 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from app.schemas.challenge import ChallengeCreate, ChallengeUpdate, DifficultyEnum
+from app.services.challenge_catalog import ChallengeCatalog
+
+NOW = datetime(2024, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def seed(sql_client, count=300):
+    rng = random.Random(5)
+    rows = []
+    for i in range(count):
+        start = NOW + timedelta(hours=rng.randint(-24 * 14, 24 * 14))
+        rows.append({
+            'title': f"Challenge {i}",
+            'description': "",
+            'difficulty': rng.choice(list(DifficultyEnum)).value,
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(hours=rng.randint(1, 24 * 7))).isoformat(),
+            'max_participants': 100,
+            'current_participants': 0,
+        })
+    return sql_client.insert('challenges', rows).data
+
+
+def parse(value):
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def test_queries_match_a_scan_and_page_by_cursor(sql_client):
+    async def scenario():
+        rows = seed(sql_client)
+        catalog = ChallengeCatalog(storage=sql_client)
+
+        async def collect(**filters):
+            found, cursor = [], None
+            while True:
+                page, cursor = await catalog.list_challenges(cursor=cursor, limit=7, **filters)
+                found += [row['id'] for row in page]
+                if cursor is None:
+                    return found
+
+        def expected(predicate):
+            matching = [row for row in rows if predicate(row)]
+            return [row['id'] for row in sorted(matching, key=lambda row: (parse(row['start_time']), row['id']))]
+
+        assert await collect(active_at=NOW) == expected(
+            lambda row: parse(row['start_time']) <= NOW < parse(row['end_time'])
+        )
+        assert await collect(starts_after=NOW, starts_before=NOW + timedelta(days=1)) == expected(
+            lambda row: NOW <= parse(row['start_time']) < NOW + timedelta(days=1)
+        )
+        week_end = NOW + timedelta(days=7)
+        assert await collect(difficulty=DifficultyEnum.Hard, ends_after=NOW, ends_before=week_end) == expected(
+            lambda row: row['difficulty'] == "Hard" and NOW <= parse(row['end_time']) < week_end
+        )
+
+    asyncio.run(scenario())
+
+
+def test_writes_invalidate_the_cache(sql_client):
+    async def scenario():
+        catalog = ChallengeCatalog(storage=sql_client, ttl=3600)
+        assert (await catalog.list_challenges())[0] == []
+
+        created = await catalog.create_challenge(ChallengeCreate(
+            title="New", description="", difficulty=DifficultyEnum.Easy,
+            start_time=NOW, end_time=NOW + timedelta(days=1), max_participants=10
+        ))
+        assert [row['id'] for row in (await catalog.list_challenges(active_at=NOW))[0]] == [created['id']]
+
+        await catalog.update_challenge(created['id'], ChallengeUpdate(difficulty=DifficultyEnum.Expert))
+        assert (await catalog.list_challenges(difficulty=DifficultyEnum.Easy))[0] == []
+        assert (await catalog.get_challenge(created['id']))['difficulty'] == "Expert"
+
+    asyncio.run(scenario())
+
+
+def test_challenges_without_difficulty_are_listed_once(sql_client):
+    async def scenario():
+        rows = sql_client.insert('challenges', [
+            {
+                'title': f"Challenge {i}",
+                'difficulty': None if i % 2 else "Easy",
+                'start_time': (NOW + timedelta(hours=i)).isoformat(),
+                'end_time': (NOW + timedelta(days=1)).isoformat(),
+            }
+            for i in range(9)
+        ]).data
+        catalog = ChallengeCatalog(storage=sql_client)
+
+        found, cursor = [], None
+        while True:
+            page, cursor = await catalog.list_challenges(cursor=cursor, limit=2)
+            found += [row['id'] for row in page]
+            if cursor is None:
+                break
+        assert found == [row['id'] for row in rows]
+        easy, _ = await catalog.list_challenges(difficulty=DifficultyEnum.Easy)
+        assert [row['id'] for row in easy] == [row['id'] for row in rows[::2]]
+
+    asyncio.run(scenario())
@@ -0,0 +1,97 @@
+import asyncio
+import uuid
+from app.schemas.chat import ChatMessageCreate
+from app.services.chat_service import ChatService
+
+
+class FakeViewer:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, payload):
+        self.frames.append(payload)
+
+
+def _message(room_id, content):
+    return ChatMessageCreate(user_id=uuid.uuid4(), content=content, room_type="challenge", room_id=room_id)
+
+
+def test_history_pages_from_buffer_then_storage(sql_client):
+    async def scenario():
+        room_id = uuid.uuid4()
+        writer = ChatService(history_size=5, flush_interval=0, storage=sql_client)
+        for i in range(12):
+            await writer.post_message(_message(room_id, f"m{i}"))
+        await asyncio.sleep(0.05)  # let the broadcaster persist
+
+        reader = ChatService(history_size=5, storage=sql_client)
+        page, cursor = await reader.list_messages("challenge", room_id, limit=4)
+        assert [m['content'] for m in page] == ["m8", "m9", "m10", "m11"]
+
+        page, cursor = await reader.list_messages("challenge", room_id, before=cursor, limit=4)
+        assert [m['content'] for m in page] == ["m4", "m5", "m6", "m7"]
+
+        page, cursor = await reader.list_messages("challenge", room_id, before=cursor, limit=10)
+        assert [m['content'] for m in page] == ["m0", "m1", "m2", "m3"]
+        assert cursor is None
+
+    asyncio.run(scenario())
+
+
+def test_broadcaster_batches_fan_out_and_writes(sql_client):
+    async def scenario():
+        inserts = []
+        original_insert = sql_client.insert_ignore
+
+        def counting_insert(table, data):
+            inserts.append(len(data))
+            return original_insert(table, data)
+
+        sql_client.insert_ignore = counting_insert
+        service = ChatService(flush_interval=0.02, storage=sql_client)
+        room_id = uuid.uuid4()
+        viewers = [FakeViewer() for _ in range(3)]
+        for viewer in viewers:
+            await service.subscribe(viewer, "team", room_id)
+
+        for i in range(10):
+            await service.post_message(ChatMessageCreate(
+                user_id=uuid.uuid4(), content=f"m{i}", room_type="team", room_id=room_id
+            ))
+        await asyncio.sleep(0.1)
+
+        assert inserts == [10]
+        assert all(len(viewer.frames) == 1 for viewer in viewers)
+
+    asyncio.run(scenario())
+
+
+def test_eviction_and_shutdown_keep_queued_messages(sql_client):
+    async def scenario():
+        failures = []
+        original_insert = sql_client.insert_ignore
+
+        def flaky_insert(table, data):
+            if not failures:
+                failures.append(table)
+                raise RuntimeError("connection reset")
+            return original_insert(table, data)
+
+        sql_client.insert_ignore = flaky_insert
+        service = ChatService(max_rooms=1, flush_interval=0.02, storage=sql_client)
+        first, second = uuid.uuid4(), uuid.uuid4()
+        await service.post_message(_message(first, "kept"))
+        # Opening a second room must not evict the first while its batch is unsaved
+        await service.post_message(_message(second, "also kept"))
+        assert len(service.rooms) == 2
+
+        await service.close()
+        rows = sql_client.select('chat_messages', 'content', order='content').data
+        assert [row['content'] for row in rows] == ["also kept", "kept"]
+        assert failures == ['chat_messages']
+
+        # Both rooms are idle now, so the next room evicts the older ones
+        await service.list_messages("challenge", uuid.uuid4())
+        assert len(service.rooms) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+from app.services.achievement_engine import AchievementEngine
+from app.services.enrollment_admission import EnrollmentAdmission
+
+
+def make_challenge(sql_client, capacity):
+    return sql_client.insert('challenges', {'title': "Rush", 'max_participants': capacity}).data[0]['id']
+
+
+def test_rush_never_oversubscribes(sql_client):
+    async def scenario():
+        challenge_id = make_challenge(sql_client, 50)
+        admission = EnrollmentAdmission(
+            batch_size=64, flush_interval=0.01, storage=sql_client, achievements=AchievementEngine(storage=sql_client)
+        )
+        users = [str(uuid.uuid4()) for _ in range(300)]
+
+        results = await asyncio.gather(*(admission.admit(challenge_id, user) for user in users))
+        assert sum(row['status'] == "enrolled" for row in results) == 50
+        waitlisted = [row for row in results if row['status'] == "waitlisted"]
+        assert [row['waitlist_position'] for row in waitlisted] == list(range(1, 251))
+
+        await admission.close()
+        await admission.achievements.drain()
+        rows = sql_client.select('enrollments', 'status', {'challenge_id': challenge_id}).data
+        assert len(rows) == 300 and sum(row['status'] == "enrolled" for row in rows) == 50
+        challenge = sql_client.select('challenges', '*', {'id': challenge_id}).data[0]
+        assert challenge['current_participants'] == 50
+
+    asyncio.run(scenario())
+
+
+def test_withdrawal_promotes_the_waitlist(sql_client):
+    async def scenario():
+        challenge_id = make_challenge(sql_client, 2)
+        admission = EnrollmentAdmission(
+            flush_interval=0, storage=sql_client, achievements=AchievementEngine(storage=sql_client)
+        )
+        first = await admission.admit(challenge_id, uuid.uuid4())
+        await admission.admit(challenge_id, uuid.uuid4())
+        waiting = await admission.admit(challenge_id, uuid.uuid4())
+        await admission.close()
+
+        await admission.withdraw(first['id'])
+        await admission.close()
+        await admission.achievements.drain()
+        rows = {row['id']: row['status'] for row in sql_client.select('enrollments', 'id,status').data}
+        assert first['id'] not in rows
+        assert rows[waiting['id']] == "enrolled"
+        # The promoted user is credited once the promotion is stored
+        awarded = sql_client.select('user_achievements', 'code', {'user_id': waiting['user_id']}).data
+        assert [row['code'] for row in awarded] == ["first_enrollment"]
+
+        # A fresh process rebuilds the same counters from storage
+        status = await EnrollmentAdmission(storage=sql_client).status(challenge_id)
+        assert status['current_participants'] == 2 and status['waitlisted'] == 0
+
+    asyncio.run(scenario())
+
+
+class PoisonedStorage:
+    """Storage that rejects every insert containing one user's enrollment"""
+
+    def __init__(self, storage, poisoned_user):
+        self.storage = storage
+        self.poisoned_user = poisoned_user
+
+    def insert_ignore(self, table, data, on_conflict=None):
+        rows = data if isinstance(data, list) else [data]
+        if any(row['user_id'] == self.poisoned_user for row in rows):
+            raise Exception("violates check constraint")
+        return self.storage.insert_ignore(table, data, on_conflict)
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+
+def test_bad_row_is_dropped_and_its_slot_given_back(sql_client, monkeypatch):
+    monkeypatch.setattr("app.services.enrollment_admission.FLUSH_RETRY_DELAY", 0)
+
+    async def scenario():
+        challenge_id = make_challenge(sql_client, 3)
+        poisoned = str(uuid.uuid4())
+        admission = EnrollmentAdmission(
+            flush_interval=0.01, storage=PoisonedStorage(sql_client, poisoned),
+            achievements=AchievementEngine(storage=sql_client)
+        )
+        users = [str(uuid.uuid4()) for _ in range(2)] + [poisoned] + [str(uuid.uuid4()) for _ in range(2)]
+        for user in users:
+            await admission.admit(challenge_id, user)
+
+        await asyncio.wait_for(admission.close(), timeout=10)
+        await admission.achievements.drain()
+        rows = {row['user_id']: row['status'] for row in sql_client.select('enrollments', 'user_id,status').data}
+        assert poisoned not in rows
+        # The poisoned user's slot went to the head of the waitlist
+        assert rows == {users[0]: "enrolled", users[1]: "enrolled", users[3]: "enrolled", users[4]: "waitlisted"}
+        assert sql_client.select('challenges', '*', {'id': challenge_id}).data[0]['current_participants'] == 3
+        assert (await admission.status(challenge_id))['current_participants'] == 3
+
+    asyncio.run(scenario())
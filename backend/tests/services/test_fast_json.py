@@ -0,0 +1,52 @@
+import gzip
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+from starlette.requests import Request
+
+from app.core.fast_json import EncodedPayload, RowEncoder, fast_json_response
+from app.schemas.leaderboard import LeaderboardEntry
+from app.schemas.user import UserOut
+
+
+def _request(accept_encoding=None):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    return Request({'type': "http", 'method': "GET", 'path': "/", 'headers': headers})
+
+
+def test_rows_are_projected_onto_the_model():
+    user_id = uuid.uuid4()
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    row = {
+        'id': user_id, 'email': "a@example.com", 'username': "a", 'created_at': created,
+        'is_active': True, 'is_superuser': False, 'hashed_password': "secret",
+    }
+    encoded = orjson.loads(orjson.dumps(RowEncoder(UserOut).rows([row])))
+    assert encoded == [{
+        'username': "a", 'email': "a@example.com", 'id': str(user_id),
+        'created_at': "2024-01-01T00:00:00+00:00", 'is_active': True, 'is_superuser': False,
+    }]
+    # Optional fields missing from a row get the model's default
+    entry = RowEncoder(LeaderboardEntry).rows([{'username': "b", 'score': 3, 'rank': 1, 'last_updated': created}])
+    assert entry[0]['user_id'] is None
+
+
+def test_large_payloads_are_compressed_once_when_accepted(monkeypatch):
+    import app.core.fast_json as fast_json
+    monkeypatch.setattr(fast_json.settings, "FAST_RESPONSE_COMPRESS_MIN_BYTES", 100)
+    payload = EncodedPayload.of({'rows': [{'score': i} for i in range(50)]})
+
+    compressed = fast_json_response(_request("br;q=0, gzip, deflate"), payload)
+    if fast_json.brotli is None:
+        assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(compressed.body) == payload.body
+    # The compressed body is kept on the payload
+    assert fast_json_response(_request("gzip"), payload).body is compressed.body
+
+    plain = fast_json_response(_request("gzip;q=0"), payload)
+    assert "content-encoding" not in plain.headers and plain.body == payload.body
+    assert "content-encoding" not in fast_json_response(_request(), payload).headers
+    small = fast_json_response(_request("gzip"), {'ok': True})
+    assert small.body == b'{"ok":true}' and "vary" not in small.headers
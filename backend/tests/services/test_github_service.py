@@ -0,0 +1,129 @@
+import asyncio
+import uuid
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from app.services.challenge_catalog import ChallengeCatalog
+from app.services.github_service import GitHubClient, GitHubProvisioner
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def fake_github(clock, quota=5, window=60, failures=0):
+    """A GitHub API with repos in memory, a per-window rate limit and some 502s"""
+    app = FastAPI()
+    state = {'repos': {}, 'remaining': quota, 'reset': clock() + window, 'failures': failures, 'rejected': 0, 'sent': 0}
+
+    def limited(response):
+        response.headers["X-RateLimit-Remaining"] = str(state['remaining'])
+        response.headers["X-RateLimit-Reset"] = str(int(state['reset']))
+        return response
+
+    @app.middleware("http")
+    async def rate_limit(request: Request, call_next):
+        if clock() >= state['reset']:
+            state['remaining'], state['reset'] = quota, clock() + window
+        if state['remaining'] <= 0:
+            state['rejected'] += 1
+            return limited(JSONResponse({'message': "API rate limit exceeded"}, status_code=403))
+        state['remaining'] -= 1
+        response = await call_next(request)
+        if response.status_code == 304:
+            state['remaining'] += 1
+        else:
+            state['sent'] += 1
+        return limited(response)
+
+    @app.get("/repos/{org}/{name}")
+    async def get_repo(org: str, name: str, request: Request):
+        repo = state['repos'].get(name)
+        if repo is None:
+            return JSONResponse({'message': "Not Found"}, status_code=404)
+        etag = f'"{name}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        return JSONResponse(repo, headers={"ETag": etag})
+
+    @app.post("/orgs/{org}/repos")
+    async def create_repo(org: str, request: Request):
+        if state['failures']:
+            state['failures'] -= 1
+            return JSONResponse({'message': "Server Error"}, status_code=502)
+        body = await request.json()
+        if body['name'] in state['repos']:
+            return JSONResponse({'message': "name already exists on this account"}, status_code=422)
+        repo = {'name': body['name'], 'html_url': f"https://github.test/{org}/{body['name']}"}
+        state['repos'][body['name']] = repo
+        return JSONResponse(repo, status_code=201)
+
+    return app, state
+
+
+def provisioner(app, clock, **options):
+    client = GitHubClient(
+        token="t", base_url="http://github.test", transport=httpx.ASGITransport(app=app),
+        clock=clock, sleep=clock.sleep
+    )
+    return GitHubProvisioner(client=client, org="league", **options)
+
+
+def test_bulk_provisioning_waits_out_the_rate_limit():
+    async def scenario():
+        clock = Clock()
+        app, state = fake_github(clock, quota=5, failures=2)
+        github = provisioner(app, clock, concurrency=4)
+        started = clock()
+
+        results = await github.provision_many([{'name': f"repo-{i}"} for i in range(12)])
+        assert [result['error'] for result in results] == [None] * 12
+        assert sorted(state['repos']) == sorted(f"repo-{i}" for i in range(12))
+        # 12 lookups + 12 creates + 2 retried 502s, 5 per minute
+        assert state['sent'] == 26 and clock() - started >= 5 * 60
+        # Requests queue for the reset instead of piling onto an exhausted quota
+        assert state['rejected'] <= 4
+
+        # A repeat run finds the repos, and later ones only revalidate: 304s do not use quota
+        sent = state['sent']
+        again = await github.provision_many([{'name': f"repo-{i}"} for i in range(3)])
+        assert [result['html_url'] for result in again] == [result['html_url'] for result in results[:3]]
+        assert state['sent'] == sent + 3
+        await github.provision_many([{'name': f"repo-{i}"} for i in range(3)])
+        assert state['sent'] == sent + 3
+        await github.client.close()
+
+    asyncio.run(scenario())
+
+
+def test_challenge_and_team_repos(sql_client):
+    async def scenario():
+        clock = Clock()
+        app, state = fake_github(clock, quota=100)
+        catalog = ChallengeCatalog(storage=sql_client)
+        github = provisioner(app, clock, storage=sql_client, catalog=catalog)
+
+        challenge = sql_client.insert('challenges', {'title': "Prompt Golf!", 'description': "Shortest prompt wins"}).data[0]
+        teams = sql_client.insert('teams', [{'name': "Red Team"}, {'name': "Blue"}]).data
+        sql_client.insert('enrollments', [
+            {'user_id': str(uuid.uuid4()), 'challenge_id': challenge['id'], 'team_id': team['id']}
+            for team in teams for _ in range(2)
+        ])
+
+        result = await github.create_challenge_repo(challenge['id'], per_team=True)
+        prefix = f"prompt-golf-{str(challenge['id'])[:8]}"
+        assert sorted(state['repos']) == sorted([prefix, f"{prefix}-red-team", f"{prefix}-blue"])
+        assert result['github_repo_url'] == f"https://github.test/league/{prefix}"
+        stored = sql_client.select('challenges', '*', {'id': challenge['id']}).data[0]
+        assert stored['github_repo_url'] == result['github_repo_url']
+        await github.client.close()
+
+    asyncio.run(scenario())
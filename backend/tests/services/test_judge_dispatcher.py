@@ -0,0 +1,78 @@
+import asyncio
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.judge_dispatcher import CLOSED, OPEN, CircuitBreaker, JudgeBackend, JudgeDispatcher
+
+
+def simulated(latencies, chunks=("{", "}"), fail=False):
+    """A local backend whose first output comes after a delay drawn from `latencies()`"""
+    async def stream(prompt, model):
+        await asyncio.sleep(latencies())
+        if fail:
+            raise ConnectionError("backend down")
+        for chunk in chunks:
+            yield chunk
+    return stream
+
+
+async def _reply(dispatcher):
+    return "".join([chunk async for chunk in dispatcher.stream("prompt")])
+
+
+def test_slow_primary_is_hedged_and_the_first_answer_wins():
+    rng = random.Random(7)
+    # The primary usually answers in 10ms but one time in five takes a second
+    primary = JudgeBackend("primary", simulated(lambda: 1.0 if rng.random() < 0.2 else 0.01, ("a", "b")), "m")
+    secondary = JudgeBackend("secondary", simulated(lambda: 0.03, ("c",)), "m")
+    dispatcher = JudgeDispatcher([primary, secondary], percentile=50, min_samples=5, default_delay=0.05)
+
+    async def scenario():
+        replies = [await _reply(dispatcher) for _ in range(40)]
+        assert set(replies) == {"ab", "c"}
+        # The hedge delay follows the primary's median, not its slow tail
+        assert dispatcher.hedge_delay(primary) < 0.05
+        stats = dispatcher.stats()
+        assert 0 < stats['hedge_rate'] < 0.5
+        wins = {backend['name']: backend['wins'] for backend in stats['backends']}
+        assert wins['primary'] + wins['secondary'] == 40 and wins['secondary'] == replies.count("c")
+        # Losing attempts were cancelled rather than run to the end
+        await asyncio.sleep(0)
+        assert not [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    asyncio.run(scenario())
+
+
+def test_failing_backend_is_skipped_by_its_circuit_breaker():
+    now = [0.0]
+    breaker = CircuitBreaker(failures=2, reset_seconds=30, clock=lambda: now[0])
+    calls = []
+
+    def down():
+        calls.append(1)
+        return 0
+
+    broken = JudgeBackend("broken", simulated(down, fail=True), "m", breaker=breaker)
+    healthy = JudgeBackend("healthy", simulated(lambda: 0), "m")
+    dispatcher = JudgeDispatcher([broken, healthy], default_delay=10)
+
+    async def scenario():
+        # A failure hands over to the next backend without waiting for the hedge delay
+        for _ in range(3):
+            assert await _reply(dispatcher) == "{}"
+        assert breaker.state == OPEN and len(calls) == 2
+        # After the reset time one trial call goes through, and closes the breaker if it works
+        now[0] = 31
+        broken.stream = simulated(lambda: 0, ("ok",))
+        assert await _reply(dispatcher) == "ok"
+        assert breaker.state == CLOSED
+
+        healthy.stream = simulated(lambda: 0, fail=True)
+        broken.stream = simulated(lambda: 0, fail=True)
+        with pytest.raises(HTTPException) as error:
+            await _reply(dispatcher)
+        assert error.value.status_code == 502
+
+    asyncio.run(scenario())
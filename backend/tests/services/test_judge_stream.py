@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from app.services.ai_judge_service import ERROR, PARTIAL, RESULT, evaluate_code_submission, stream_evaluation
+from app.services.judge_output import PartialJSON, parse_evaluation
+
+REPLY = json.dumps({
+    'criteria': [
+        {'name': "functionality", 'score': 80, 'feedback': "Solves it"},
+        {'name': "innovation", 'score': 60, 'feedback': "Standard \"approach\""},
+        {'name': "efficiency", 'score': 70, 'feedback': "Linear"},
+        {'name': "code_quality", 'score': 90, 'feedback': "Clean"},
+    ],
+    'score': 73,
+    'summary': "Good",
+})
+
+
+def _stream(text, size=7, fail=False):
+    async def stream(prompt, model):
+        for start in range(0, len(text), size):
+            yield text[start:start + size]
+        if fail:
+            raise ConnectionError("stream dropped")
+    return stream
+
+
+def test_partial_json_reads_prefixes_and_repairs_replies():
+    parser = PartialJSON()
+    seen = []
+    for c in REPLY:
+        parser.feed(c)
+        seen.append(parser.value)
+    parser.close()
+    assert parser.value == json.loads(REPLY) and not parser.repaired
+    # A number is only read once it has ended; a string shows as far as it has arrived
+    assert {'criteria': [{'name': "functionality", 'score': 8}]} not in seen
+    assert {'criteria': [{'name': "functionality", 'score': 80, 'feedback': "Sol"}]} in seen
+
+    messy = 'Here you go:\n```json\n{"criteria": {"Functionality": "80/100", "innovation": 60, "efficiency": {"score": 70,},' \
+            ' "code quality": 90,}, "summary": "line\nbreak \\x", "score": None} ```'
+    evaluation = parse_evaluation(messy)
+    assert [criterion.name for criterion in evaluation.criteria] == ["functionality", "innovation", "efficiency", "code_quality"]
+    # The overall score is made up from the weights when the reply has none
+    assert evaluation.score == 73.0 and not evaluation.complete
+    assert evaluation.summary == "line\nbreak \\x"
+    assert parse_evaluation("I cannot evaluate this.") is None
+
+
+def test_stream_evaluation_sends_partials_then_the_result():
+    async def scenario():
+        events = [event async for event in stream_evaluation("print(1)", stream=_stream(REPLY))]
+        assert {event['event'] for event in events[:-1]} == {PARTIAL}
+        # The first criterion's score is out well before the reply ends
+        first = next(i for i, event in enumerate(events) if event['data']['criteria'] and event['data']['criteria'][0]['score'])
+        assert first < len(events) / 3
+        assert events[-1]['event'] == RESULT
+        assert events[-1]['data']['score'] == 73 and events[-1]['data']['complete']
+
+        # A reply cut short keeps what it said
+        cut = REPLY[:REPLY.index('"efficiency"') + 20]
+        result = await evaluate_code_submission("print(2)", stream=_stream(cut, fail=True))
+        assert [criterion['score'] for criterion in result['criteria']] == [80, 60, None]
+        assert result['score'] is None and not result['complete']
+
+        assert (await evaluate_code_submission("print(3)", stream=_stream("no json here")))['error']
+        events = [event async for event in stream_evaluation("print(4)", stream=_stream("", fail=True))]
+        assert [event['event'] for event in events] == [ERROR]
+
+    asyncio.run(scenario())
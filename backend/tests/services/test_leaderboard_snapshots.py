@@ -0,0 +1,73 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.leaderboard_snapshots import LeaderboardSnapshots
+
+HOUR_MS = 3600 * 1000
+
+
+def _at(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def test_rankings_are_answered_from_the_snapshot_before_a_time(sql_client, tmp_path):
+    now = [10 * 3600 + 5.0]
+    snapshots = LeaderboardSnapshots(path=str(tmp_path / "snapshots"), interval=3600, storage=sql_client, clock=lambda: now[0])
+    users = {name: str(uuid.uuid4()) for name in ("ann", "bob")}
+    for name, user_id in users.items():
+        sql_client.insert('users', {'id': user_id, 'username': name, 'email': f"{name}@example.com"})
+    sql_client.insert('challenges', [
+        {'id': str(uuid.uuid4()), 'title': "upcoming", 'start_time': "2030-01-01T00:00:00+00:00"},
+        {'id': str(uuid.uuid4()), 'title': "running", 'start_time': "1970-01-01T00:00:00+00:00"},
+    ])
+    running = next(row['id'] for row in sql_client.select('challenges', 'id', {'title': "running"}).data)
+
+    def score(name, points):
+        sql_client.insert('score_history', {
+            'challenge_id': running, 'user_id': users[name], 'score': points,
+            'last_updated': _at(now[0] * 1000).isoformat(),
+        })
+
+    async def scenario():
+        score("ann", 5)
+        score("bob", 3)
+        # Global board plus the running challenge; the upcoming one is skipped
+        assert snapshots.take_due() == 2
+        assert snapshots.take_due() == 0
+
+        now[0] += 3600
+        score("bob", 9)
+        assert snapshots.take_due() == 2
+
+        first = await snapshots.challenge_at(running, _at(10 * HOUR_MS + 30 * 60 * 1000))
+        assert first.data.as_of == _at(10 * HOUR_MS)
+        assert [(row.username, row.score, row.rank) for row in first.data.scores] == [("ann", 5, 1), ("bob", 3, 2)]
+        assert first.data.scores[0].user_id == users["ann"]
+
+        second = await snapshots.challenge_at(running, _at(12 * HOUR_MS))
+        assert [(row.username, row.score) for row in second.data.scores] == [("bob", 9), ("ann", 5)]
+        totals = await snapshots.global_at(_at(12 * HOUR_MS))
+        assert [(row.username, row.score, row.user_id) for row in totals.data.entries] == [("bob", 12, None), ("ann", 5, None)]
+
+        with pytest.raises(HTTPException) as error:
+            await snapshots.challenge_at(running, _at(9 * HOUR_MS))
+        assert error.value.status_code == 404
+        with pytest.raises(HTTPException):
+            await snapshots.challenge_at("../global", _at(12 * HOUR_MS))
+
+        # The final board is taken at the end and never rewritten
+        await snapshots.snapshot_final({'id': running, 'end_time': _at(11 * HOUR_MS + 1000).isoformat()})
+        score("ann", 50)
+        await snapshots.snapshot_final({'id': running, 'end_time': _at(11 * HOUR_MS + 1000).isoformat()})
+        final = await snapshots.challenge_at(running, _at(12 * HOUR_MS))
+        assert final.data.as_of == _at(11 * HOUR_MS + 1000)
+        assert final.data.scores[0].score == 9
+
+    asyncio.run(scenario())
+    leftovers = [name for _, _, names in os.walk(tmp_path / "snapshots") for name in names if not name.endswith(".parquet")]
+    assert leftovers == []
@@ -0,0 +1,131 @@
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from app.models.lifecycle import FREEZE_SCORES
+from app.schemas.leaderboard import ScoreHistoryCreate
+from app.services.leaderboard_service import LeaderboardService
+from app.services.lifecycle_scheduler import LifecycleScheduler, freeze_leaderboard
+from app.services.timer_wheel import TimerWheel
+
+
+def test_wheel_fires_in_order_across_levels():
+    rng = random.Random(2)
+    wheel = TimerWheel(now_ms=0, tick_ms=1, slots=8, levels=3)
+    deadlines = [rng.randint(0, 5000) for _ in range(2000)]
+    timers = [wheel.schedule(deadline, deadline) for deadline in deadlines]
+    for timer in timers[::3]:
+        wheel.cancel(timer)
+    live = sorted(deadline for i, deadline in enumerate(deadlines) if i % 3)
+
+    fired = []
+    for now in range(0, 5008, 7):
+        for deadline in wheel.advance(now):
+            assert deadline <= now and deadline > now - 7
+            fired.append(deadline)
+    assert fired == live and wheel.pending == 0
+
+
+class Clock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def test_lease_and_firing_survive_restart(sql_client):
+    async def scenario():
+        base = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        challenge = sql_client.insert('challenges', {
+            'title': "Timed",
+            'start_time': (base + timedelta(seconds=10)).isoformat(),
+            'end_time': (base + timedelta(minutes=90)).isoformat(),
+        }).data[0]
+        clock = Clock(base.timestamp())
+        fired = []
+
+        def scheduler():
+            s = LifecycleScheduler(storage=sql_client, lease_seconds=30, freeze_minutes=60, clock=clock)
+            for event in ("open_enrollments", "freeze_scores", "final_ranking"):
+                s.on(event, lambda c, event=event: asyncio.sleep(0, fired.append(event)))
+            return s
+
+        leader, standby = scheduler(), scheduler()
+        await leader.step()
+        await standby.step()
+        assert leader.is_leader and not standby.is_leader
+
+        clock.now += 40 * 60
+        await leader.step()
+        assert fired == ["open_enrollments", "freeze_scores"]
+
+        # The leader dies; once its lease lapses the standby loads and fires only what is left
+        clock.now += 60 * 60
+        await standby.step()
+        assert standby.is_leader
+        assert fired == ["open_enrollments", "freeze_scores", "final_ranking"]
+        events = sql_client.select('challenge_lifecycle_events', '*', {'challenge_id': challenge['id']}).data
+        assert len(events) == 3
+
+    asyncio.run(scenario())
+
+
+class FlakyClaims:
+    """Storage whose first lifecycle event insert fails like a dropped connection"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.failures = 1
+
+    def insert_ignore(self, table, data, on_conflict=None):
+        if table == 'challenge_lifecycle_events' and self.failures:
+            self.failures -= 1
+            raise Exception("connection reset")
+        return self.storage.insert_ignore(table, data, on_conflict)
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+
+def test_failed_claim_is_retried_and_freeze_stops_scores(sql_client, monkeypatch):
+    monkeypatch.setattr("app.services.leaderboard_service.supabase", sql_client)
+    monkeypatch.setattr("app.services.score_trajectory.score_trajectory_store.storage", sql_client)
+    monkeypatch.setattr("app.services.leaderboard_service._frozen_challenges", set())
+
+    async def scenario():
+        base = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        challenge = sql_client.insert('challenges', {
+            'title': "Frozen",
+            'start_time': (base - timedelta(hours=1)).isoformat(),
+            'end_time': (base + timedelta(minutes=90)).isoformat(),
+        }).data[0]
+        challenge_id = str(challenge['id'])
+        clock = Clock(base.timestamp())
+        scheduler = LifecycleScheduler(storage=FlakyClaims(sql_client), freeze_minutes=60, clock=clock)
+        scheduler.on(FREEZE_SCORES, freeze_leaderboard)
+
+        # The overdue open_enrollments claim fails and is put back on the wheel
+        await scheduler.step()
+        assert sql_client.select('challenge_lifecycle_events').data == []
+
+        score = ScoreHistoryCreate(challenge_id=challenge_id, user_id=str(uuid.uuid4()), score=5, last_updated=base)
+        assert (await LeaderboardService.update_score(score)).success
+
+        clock.now += 40 * 60
+        assert await scheduler.fire_due() == 2
+        events = sql_client.select('challenge_lifecycle_events', 'event', {'challenge_id': challenge_id}).data
+        assert sorted(row['event'] for row in events) == ["freeze_scores", "open_enrollments"]
+
+        with pytest.raises(HTTPException) as frozen:
+            await LeaderboardService.update_score(score.model_copy(update={'score': 9}))
+        assert frozen.value.status_code == 409
+        # Only the accepted score is on the user's trajectory
+        assert [row['score'] for row in sql_client.select('score_points').data] == [5]
+        # Another worker sees the stored freeze
+        monkeypatch.setattr("app.services.leaderboard_service._frozen_challenges", set())
+        assert LeaderboardService.is_frozen(challenge_id)
+
+    asyncio.run(scenario())
@@ -0,0 +1,82 @@
+import asyncio
+import uuid
+import pytest
+from fastapi import HTTPException
+from app.schemas.leaderboard import ChallengeLeaderboard, LeaderboardEntry, LeaderboardResponse
+from app.schemas.payout import PayoutSchedule, PayoutTier
+from app.services.payout_service import PayoutService, compute_payouts
+from app.services.wallet_ledger import WalletLedger
+
+
+class FakeLeaderboard:
+    def __init__(self, scores):
+        self.scores = scores
+
+    async def get_challenge_leaderboard(self, challenge_id):
+        entries = [
+            LeaderboardEntry(user_id=user_id, username=user_id[:8], score=score, rank=i + 1, last_updated="2024-01-01T00:00:00")
+            for i, (user_id, score) in enumerate(self.scores)
+        ]
+        return LeaderboardResponse(success=True, data=ChallengeLeaderboard(challenge_id=challenge_id, scores=entries))
+
+
+def test_schedule_tiers_and_ties():
+    schedule = PayoutSchedule(tiers=[
+        PayoutTier(rank_from=1, amount=1000),
+        PayoutTier(rank_from=2, rank_to=3, amount=500),
+        PayoutTier(top_percent=70, amount=100),
+    ])
+    ranking = [("a", 90), ("b", 80), ("c", 80), ("d", 80), ("e", 10), ("f", 5)]
+    # b, c and d share positions 2, 3 and 4: (500 + 500 + 100) / 3
+    assert compute_payouts(ranking, schedule) == [
+        ("a", 1000), ("b", 367), ("c", 367), ("d", 366), ("e", 100)
+    ]
+
+
+class CrashingLedger:
+    """Ledger that fails on its Nth batch, like a worker dying mid-run"""
+
+    def __init__(self, ledger, fail_on):
+        self.ledger = ledger
+        self.fail_on = fail_on
+        self.batches = 0
+
+    async def post_many(self, transactions):
+        self.batches += 1
+        if self.batches == self.fail_on:
+            raise RuntimeError("worker died")
+        return await self.ledger.post_many(transactions)
+
+
+def test_payout_is_batched_idempotent_and_resumable(sql_client):
+    async def scenario():
+        scores = [(str(uuid.uuid4()), 1000 - i) for i in range(250)]
+        schedule = PayoutSchedule(tiers=[PayoutTier(top_percent=100, amount=10)])
+        ledger = WalletLedger(storage=sql_client)
+        leaderboard = FakeLeaderboard(scores)
+
+        crashing = PayoutService(
+            ledger=CrashingLedger(ledger, fail_on=2), leaderboard=leaderboard, storage=sql_client, batch_size=100
+        )
+        with pytest.raises(RuntimeError):
+            await crashing.run("c1", schedule)
+        assert len(sql_client.select('wallet_transactions').data) == 100
+
+        # New scores arrive before the rerun; it still pays the stored list
+        leaderboard.scores = [(str(uuid.uuid4()), 5000)] + scores
+        service = PayoutService(ledger=ledger, leaderboard=leaderboard, storage=sql_client, batch_size=100)
+        result = await service.run("c1", schedule)
+        assert result.resumed_from == 100 and result.posted == 250 and result.participants == 250
+        paid = {row['reference'].split(":")[-1] for row in sql_client.select('wallet_transactions').data}
+        assert paid == {user_id for user_id, _ in scores}
+
+        again = await service.run("c1", schedule)
+        assert again.status == "completed" and again.resumed_from == 0
+        assert len(sql_client.select('wallet_transactions').data) == 250
+
+        # A different schedule must not be silently ignored
+        with pytest.raises(HTTPException) as exc_info:
+            await service.run("c1", PayoutSchedule(tiers=[PayoutTier(top_percent=50, amount=20)]))
+        assert exc_info.value.status_code == 409
+
+    asyncio.run(scenario())
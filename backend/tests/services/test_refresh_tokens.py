@@ -0,0 +1,44 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import get_current_user
+from app.services.refresh_tokens import RefreshTokenStore
+
+
+def test_refresh_tokens_rotate_and_reuse_revokes_the_sign_in(sql_client):
+    store = RefreshTokenStore(storage=sql_client)
+    user_id = str(uuid.uuid4())
+
+    async def scenario():
+        first = await store.issue(user_id)
+        owner, second = await store.rotate(first)
+        assert owner == user_id and second != first
+        owner, third = await store.rotate(second)
+        assert owner == user_id
+
+        # Replaying a rotated token revokes the whole sign-in, including its latest token
+        with pytest.raises(HTTPException) as error:
+            await store.rotate(first)
+        assert error.value.status_code == 401
+        assert sql_client.select('refresh_token_families', 'revoked', {'user_id': user_id}).data == [{'revoked': True}]
+        with pytest.raises(HTTPException):
+            await RefreshTokenStore(storage=sql_client).rotate(third)
+
+        # Sign-ins are independent; logging one out leaves the other
+        kept, ended = await store.issue(user_id), await store.issue(user_id)
+        await store.revoke(ended)
+        with pytest.raises(HTTPException):
+            await store.rotate(ended)
+        assert (await store.rotate(kept))[0] == user_id
+
+        # A refresh token is not an access token
+        with pytest.raises(HTTPException) as error:
+            await get_current_user(kept)
+        assert error.value.status_code == 401
+        with pytest.raises(HTTPException):
+            await store.rotate("not-a-token")
+
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import random
+import uuid
+import pytest
+from app.services.replay_format import (
+    ReplayFormatError,
+    ReplayReader,
+    convert_text_replay,
+    encode_replay,
+    parse_text_replay,
+)
+from app.services.replay_store import LocalBlobBackend, ReplayStore
+
+
+def _events(count):
+    rng = random.Random(3)
+    t, events = 0, []
+    for _ in range(count):
+        t += rng.randint(0, 50)
+        events.append({'t': t, 'line': rng.randint(1, 30), 'file': rng.choice(["a.py", "b.py"])})
+    return events
+
+
+def _fold(events, t):
+    state = {}
+    for event in events:
+        if event['t'] > t:
+            break
+        state.update({key: value for key, value in event.items() if key != 't'})
+    return state
+
+
+def test_state_at_matches_folding_the_events():
+    events = _events(1000)
+    reader = ReplayReader.from_bytes(encode_replay(events, keyframe_interval=64))
+
+    assert reader.header.event_count == 1000
+    assert len(reader.header.index) == 16
+    for t in range(0, events[-1]['t'] + 100, 97):
+        assert reader.state_at(t) == _fold(events, t)
+
+
+def test_events_round_trip_as_deltas():
+    events = _events(300)
+    reader = ReplayReader.from_bytes(encode_replay(events, keyframe_interval=32))
+    decoded_state, original_state = {}, {}
+    decoded_events = list(reader.events())
+    assert len(decoded_events) == len(events)
+    for decoded, original in zip(decoded_events, events):
+        assert decoded['t'] == original['t']
+        decoded_state.update(decoded)
+        original_state.update(original)
+        assert decoded_state == original_state
+
+
+def test_convert_text_forms():
+    events = [{'t': 20, 'x': 2}, {'t': 10, 'x': 1}]
+    as_lines = "\n".join(json.dumps(event) for event in events)
+    assert convert_text_replay(as_lines) == convert_text_replay(json.dumps(events))
+    assert parse_text_replay(as_lines)[0] == {'t': 10, 'x': 1}
+    with pytest.raises(ReplayFormatError):
+        parse_text_replay('[{"x": 1}]')
+
+
+def test_store_seeks_with_range_reads(tmp_path, sql_client):
+    events = _events(2000)
+    data = encode_replay(events, keyframe_interval=100)
+
+    async def stream():
+        yield data
+
+    async def scenario():
+        store = ReplayStore(LocalBlobBackend(str(tmp_path)), chunk_size=1024, storage=sql_client)
+        replay = await store.store(uuid.uuid4(), uuid.uuid4(), stream())
+        t = events[1234]['t']
+        assert await store.state_at(replay['id'], t) == _fold(events, t)
+
+    asyncio.run(scenario())
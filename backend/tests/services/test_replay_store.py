@@ -0,0 +1,71 @@
+import asyncio
+import os
+import uuid
+import pytest
+from fastapi import HTTPException
+from app.services.replay_store import LocalBlobBackend, ReplayStore, parse_range_header
+
+
+async def _stream(data, piece=1000):
+    for i in range(0, len(data), piece):
+        yield data[i:i + piece]
+
+
+async def _read(store, manifest, start, end):
+    return b"".join([part async for part in store.iter_range(manifest, start, end)])
+
+
+def test_store_and_read_ranges(tmp_path, sql_client):
+    async def scenario():
+        store = ReplayStore(LocalBlobBackend(str(tmp_path)), chunk_size=4096, storage=sql_client)
+        data = os.urandom(10000) + b"x" * 20000
+
+        replay = await store.store(uuid.uuid4(), uuid.uuid4(), _stream(data))
+        assert replay['size'] == len(data)
+        assert replay['chunk_count'] == 8
+
+        manifest = await store.load_manifest(replay['id'])
+        assert await _read(store, manifest, 0, len(data) - 1) == data
+        assert await _read(store, manifest, 4000, 4200) == data[4000:4201]
+        assert await _read(store, manifest, len(data) - 10, len(data) - 1) == data[-10:]
+
+        # The repeated 'x' chunks are stored once
+        chunk_files = [name for _, _, names in os.walk(tmp_path / "chunks") for name in names]
+        assert len(chunk_files) < replay['chunk_count']
+
+    asyncio.run(scenario())
+
+
+def test_parse_range_header():
+    assert parse_range_header(None, 100) is None
+    assert parse_range_header("bytes=0-9", 100) == (0, 9)
+    assert parse_range_header("bytes=90-", 100) == (90, 99)
+    assert parse_range_header("bytes=-10", 100) == (90, 99)
+    assert parse_range_header("bytes=50-500", 100) == (50, 99)
+    with pytest.raises(HTTPException) as exc_info:
+        parse_range_header("bytes=100-", 100)
+    assert exc_info.value.status_code == 416
+
+
+def test_size_limit_and_sweep(tmp_path, sql_client):
+    async def scenario():
+        store = ReplayStore(
+            LocalBlobBackend(str(tmp_path)), chunk_size=1024, max_bytes=8192, sweep_grace=0, storage=sql_client
+        )
+        shared = b"s" * 1024
+        kept = await store.store(uuid.uuid4(), uuid.uuid4(), _stream(shared + os.urandom(1024)))
+        dropped = await store.store(uuid.uuid4(), uuid.uuid4(), _stream(shared + os.urandom(1024)))
+
+        with pytest.raises(HTTPException) as exc_info:
+            await store.store(uuid.uuid4(), uuid.uuid4(), _stream(os.urandom(10000)))
+        assert exc_info.value.status_code == 413
+
+        await store.delete(dropped['id'])
+        swept = await store.sweep()
+        # The deleted replay's own chunk and the 7 full chunks of the aborted upload go; the shared chunk stays
+        assert swept == {'manifests': 0, 'chunks': 1 + 7}
+        manifest = await store.load_manifest(kept['id'])
+        assert (await _read(store, manifest, 0, kept['size'] - 1))[:1024] == shared
+        assert await store.sweep() == {'manifests': 0, 'chunks': 0}
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+import asyncio
+import math
+import uuid
+import numpy as np
+from app.services.score_trajectory import ScoreTrajectoryStore, lttb
+
+
+class Clock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def test_lttb_keeps_ends_and_spikes():
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[6_543] = 25
+    kept = lttb(x, y, 200)
+    assert len(kept) == 200 and kept[0] == 0 and kept[-1] == 9_999
+    assert 6_543 in kept and np.all(np.diff(kept) > 0)
+    assert list(lttb(x[:5], y[:5], 200)) == [0, 1, 2, 3, 4]
+
+
+def test_history_is_compacted_and_downsampled(sql_client):
+    async def scenario():
+        challenge_id, user_id = str(uuid.uuid4()), str(uuid.uuid4())
+        start = 1_700_000_000
+        clock = Clock(start)
+        store = ScoreTrajectoryStore(
+            chunk_points=1000, preview_points=50, max_load_points=10_000, compact_lag=60,
+            storage=sql_client, clock=clock
+        )
+        scores = [int(1000 + 500 * math.sin(i / 100)) for i in range(2_499)]
+        scores[1_234] = 9_999
+        sql_client.insert('score_points', [
+            {'challenge_id': challenge_id, 'user_id': user_id, 'score': score, 'recorded_at': (start + i) * 1000}
+            for i, score in enumerate(scores)
+        ])
+        clock.now = start + 2_499
+        await store.record(challenge_id, user_id, 42)
+
+        fresh = await store.history(challenge_id, user_id, 100)
+        assert fresh['total_points'] == 2_500 and len(fresh['timestamps']) == 100
+        assert fresh['scores'][-1] == 42 and 9_999 in fresh['scores']
+        # Only the first 2440 points are past the compaction lag: two full chunks
+        assert len(sql_client.select('score_trajectory_chunks').data) == 2
+        assert len(sql_client.select('score_points').data) == 500
+
+        compacted = await store.history(challenge_id, user_id, 100)
+        assert compacted == fresh
+        full = await store.history(challenge_id, user_id, 2_000)
+        assert full['total_points'] == 2_500 and len(full['timestamps']) == 2_000
+
+        # Past the load limit only the chunk previews are read
+        store.max_load_points = 1_000
+        preview = await store.history(challenge_id, user_id, 2_000)
+        assert preview['total_points'] == 2_500 and len(preview['timestamps']) == 2 * 50 + 500
+        assert 9_999 in preview['scores'] and preview['timestamps'] == sorted(preview['timestamps'])
+
+    asyncio.run(scenario())
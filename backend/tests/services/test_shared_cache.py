@@ -0,0 +1,66 @@
+import multiprocessing
+
+from app.core.shared_cache import SharedCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(path, clock=None, **kwargs):
+    options = {'sets': 4, 'ways': 2, 'data_bytes': 4096, 'enabled': True}
+    options.update(kwargs)
+    return SharedCache(path=str(path), clock=clock or Clock(), **options)
+
+
+def _store(path, key, value):
+    _cache(path).set(key, value, 60)
+
+
+def test_entries_expire_and_evict(tmp_path):
+    clock = Clock()
+    cache = _cache(tmp_path / "cache", clock)
+    assert cache.set_json("judge:a", {'score': 90}, 10)
+    assert cache.get_json("judge:a") == {'score': 90}
+    clock.now += 11
+    assert cache.get("judge:a") is None
+
+    # A single set of two ways: the least recently used entry goes first
+    lru = _cache(tmp_path / "lru", clock, sets=1)
+    lru.set("a", b"1", 60)
+    lru.set("b", b"2", 60)
+    clock.now += 1
+    assert lru.get("a") == b"1"
+    lru.set("c", b"3", 60)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (b"1", None, b"3")
+    lru.delete("a")
+    assert lru.get("a") is None
+    assert lru.stats() == {'hits': 3, 'misses': 2}
+
+    # Entries the ring has written over are gone; those read recently are copied forward
+    ring = _cache(tmp_path / "ring", clock, sets=64, ways=4, data_bytes=2048)
+    ring.set("kept", b"k" * 100, 60)
+    for i in range(40):
+        ring.set(f"filler{i}", b"f" * 100, 60)
+        assert ring.get("kept") == b"k" * 100
+    assert ring.get("filler0") is None
+    # Too large to share
+    assert not ring.set("big", b"x" * 1024, 60)
+
+
+def test_workers_share_one_cache(tmp_path):
+    path = tmp_path / "cache"
+    reader = _cache(path)
+    assert reader.get("leaderboard:global") is None
+
+    worker = multiprocessing.get_context("fork").Process(target=_store, args=(path, "leaderboard:global", b"[1,2,3]"))
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert reader.get("leaderboard:global") == b"[1,2,3]"
+    # A file laid out for other settings is started afresh
+    assert _cache(path, sets=8).get("leaderboard:global") is None
@@ -0,0 +1,59 @@
+import asyncio
+import uuid
+import numpy as np
+from app.schemas.skill_profile import SkillProfileCreate
+from app.services.skill_index import SkillIndex, SkillProfileService
+
+
+def test_similar_matches_brute_force_cosine():
+    rng = np.random.default_rng(0)
+    skills = [f"skill{i}" for i in range(40)]
+    index = SkillIndex(initial_rows=4, initial_skills=4)
+    profiles = {}
+    for i in range(500):
+        chosen = rng.choice(skills, size=5, replace=False)
+        profiles[f"u{i}"] = {name: int(rng.integers(1, 10)) for name in chosen}
+    index.bulk_load(list(profiles.items()))
+    index.remove("u7")
+    index.upsert("u3", {"Skill1": 9, "skill2 ": 9})
+
+    def vector(user_id):
+        v = np.zeros(len(index.vocabulary))
+        for name, level in index_profiles[user_id].items():
+            v[index.vocabulary[name.strip().lower()]] = level
+        return v / np.linalg.norm(v)
+
+    index_profiles = {**profiles, "u3": {"skill1": 9, "skill2": 9}}
+    del index_profiles["u7"]
+    query = vector("u3")
+    expected = sorted(
+        ((user_id, float(vector(user_id) @ query)) for user_id in index_profiles if user_id != "u3"),
+        key=lambda item: -item[1]
+    )[:5]
+
+    result = index.similar("u3", k=5)
+    assert [round(score, 5) for _, score in result] == [round(score, 5) for _, score in expected]
+    assert "u7" not in index.rows and index.size == 499
+
+
+def test_service_keeps_index_current(sql_client):
+    async def scenario():
+        service = SkillProfileService(storage=sql_client)
+        alice, bob, carol = (uuid.uuid4() for _ in range(3))
+        await service.create(SkillProfileCreate(user_id=alice, skills={"python": 9, "ml": 8}))
+        await service.create(SkillProfileCreate(user_id=bob, skills={"python": 8, "ml": 9}))
+        await service.create(SkillProfileCreate(user_id=carol, skills={"css": 9}))
+
+        similar = await service.similar(str(alice), k=2)
+        assert similar[0]['user_id'] == str(bob)
+
+        await service.update(str(carol), {"python": 9, "ml": 8})
+        similar = await service.similar(str(alice), k=1)
+        assert similar[0]['user_id'] == str(carol)
+        assert abs(similar[0]['similarity'] - 1.0) < 1e-6
+
+        # A fresh service rebuilds the same index from storage
+        fresh = SkillProfileService(storage=sql_client)
+        assert (await fresh.similar(str(alice), k=1))[0]['user_id'] == str(carol)
+
+    asyncio.run(scenario())
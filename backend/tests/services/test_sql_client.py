@@ -0,0 +1,133 @@
+import uuid
+import pytest
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def client(sql_client):
+    return sql_client
+
+
+def _add_user(client, username):
+    user_id = str(uuid.uuid4())
+    client.insert('users', {'id': user_id, 'username': username, 'email': f"{username}@example.com"})
+    return user_id
+
+
+def test_crud_round_trip(client):
+    user_id = _add_user(client, "alice")
+
+    response = client.select('users', 'id,username', {'id': user_id})
+    assert response.data == [{'id': user_id, 'username': "alice"}]
+
+    response = client.update('users', {'username': "alice2"}, {'id': user_id})
+    assert response.data[0]['username'] == "alice2"
+
+    response = client.delete('users', {'id': user_id})
+    assert len(response.data) == 1
+    assert client.select('users').data == []
+
+
+def test_bulk_insert(client):
+    user_id = _add_user(client, "bob")
+    rows = [
+        {'challenge_id': f"c{i}", 'user_id': user_id, 'score': i, 'last_updated': "2024-01-01T00:00:00+00:00"}
+        for i in range(5)
+    ]
+    assert len(client.insert('score_history', rows).data) == 5
+    assert len(client.get_user_scores(user_id).data) == 5
+
+
+def test_leaderboard_rpcs(client):
+    alice = _add_user(client, "alice")
+    bob = _add_user(client, "bob")
+    _add_user(client, "carol")
+
+    client.insert('score_history', [
+        {'challenge_id': "c1", 'user_id': alice, 'score': 10, 'last_updated': "2024-01-01T00:00:00"},
+        {'challenge_id': "c1", 'user_id': alice, 'score': 30, 'last_updated': "2024-01-02T00:00:00"},
+        {'challenge_id': "c1", 'user_id': bob, 'score': 20, 'last_updated': "2024-01-01T00:00:00"},
+        {'challenge_id': "c2", 'user_id': bob, 'score': 50, 'last_updated': "2024-01-03T00:00:00"},
+    ])
+
+    board = client.get_challenge_leaderboard("c1").data
+    assert [(row['username'], row['score']) for row in board] == [("alice", 30), ("bob", 20)]
+
+    assert client.get_user_challenge_rank("c1", bob).data == [{'rank': 2}]
+
+    board = client.get_global_leaderboard().data
+    assert [(row['username'], row['score']) for row in board] == [("bob", 70), ("alice", 40), ("carol", 0)]
+
+
+def test_errors_surface_as_http_errors(client):
+    with pytest.raises(HTTPException) as exc_info:
+        client.select('no_such_table')
+    assert exc_info.value.status_code == 500
+
+    with pytest.raises(HTTPException):
+        client.rpc('no_such_function')
+
+
+def test_operator_filters_order_and_limit(client):
+    user_id = _add_user(client, "dave")
+    client.insert('score_history', [
+        {'challenge_id': "c1", 'user_id': user_id, 'score': score, 'last_updated': f"2024-01-0{score}T00:00:00"}
+        for score in range(1, 6)
+    ])
+
+    response = client.select(
+        'score_history', 'score',
+        {'user_id': user_id, 'score': {'gte': 2, 'lt': 5}},
+        order='score', desc=True, limit=2
+    )
+    assert response.data == [{'score': 4}, {'score': 3}]
+
+    response = client.select('score_history', 'score', {'score': {'in': [1, 5]}}, order='score')
+    assert response.data == [{'score': 1}, {'score': 5}]
+
+
+def test_delete_scores_after_date(client):
+    user_id = _add_user(client, "erin")
+    other = _add_user(client, "frank")
+    client.insert('score_history', [
+        {'challenge_id': "c1", 'user_id': uid, 'score': day, 'last_updated': f"2024-01-0{day}T00:00:00+00:00"}
+        for uid in (user_id, other) for day in range(1, 5)
+    ])
+
+    response = client.delete_scores_after_date(user_id, "2024-01-02T00:00:00+00:00")
+    assert sorted(row['score'] for row in response.data) == [3, 4]
+    assert sorted(row['score'] for row in client.get_user_scores(user_id).data) == [1, 2]
+    assert len(client.get_user_scores(other).data) == 4
+
+
+
+def test_rollback_scores_removes_many_users_in_one_call(client):
+    users = [_add_user(client, name) for name in ("gina", "hal", "ivy")]
+    client.insert('score_history', [
+        {'challenge_id': challenge, 'user_id': uid, 'score': day, 'last_updated': f"2024-01-0{day}T00:00:00+00:00"}
+        for uid in users for challenge in ("c1", "c2") for day in range(1, 5)
+    ])
+
+    removed = client.rollback_scores(users[:2], "2024-01-02T00:00:00+00:00", "c1").data
+    assert sorted((row['user_id'], row['challenge_id'], row['removed_rows'], row['removed_score']) for row in removed) == \
+        sorted((uid, "c1", 2, 7) for uid in users[:2])
+    # Each rolled-back user falls back to their latest remaining score
+    board = {row['user_id']: row['score'] for row in client.get_challenge_leaderboard("c1").data}
+    assert board == {users[0]: 2, users[1]: 2, users[2]: 4}
+    assert len(client.get_challenge_scores("c2").data) == 12
+    totals = {row['username']: row['score'] for row in client.get_global_leaderboard().data}
+    assert totals == {"gina": 13, "hal": 13, "ivy": 20}
+    assert client.rollback_scores(users, "2024-02-01T00:00:00+00:00").data == []
+
+def test_challenge_leaderboard_pages_through_the_ranking(client, monkeypatch):
+    import app.db.client_base as client_base
+    monkeypatch.setattr(client_base, "RPC_PAGE_SIZE", 3)
+    users = [_add_user(client, f"user{i}") for i in range(7)]
+    client.insert('score_history', [
+        {'challenge_id': "c1", 'user_id': user_id, 'score': i // 2, 'last_updated': "2024-01-01T00:00:00"}
+        for i, user_id in enumerate(users)
+    ])
+
+    board = client.get_challenge_leaderboard("c1").data
+    assert len(board) == 7 and len({row['user_id'] for row in board}) == 7
+    assert [row['score'] for row in board] == [3, 2, 2, 1, 1, 0, 0]
@@ -0,0 +1,100 @@
+import asyncio
+import uuid
+import numpy as np
+import pytest
+from app.services.skill_index import SkillIndex, SkillProfileService
+from app.services.team_formation import TeamBalancer, TeamFormationService, balance_teams
+
+
+def test_teams_cover_everyone_and_beat_the_draft():
+    rng = np.random.default_rng(3)
+    skills = rng.integers(0, 10, size=(1003, 12)).astype(np.float32)
+    skills[rng.random(skills.shape) < 0.6] = 0
+
+    balancer = TeamBalancer(skills, team_size=4, seed=1)
+    draft_cost = balancer.cost()
+    teams = balancer.optimize()
+
+    members = sorted(player for team in teams for player in team)
+    assert members == list(range(1003))
+    assert max(len(team) for team in teams) == 4 and min(len(team) for team in teams) >= 3
+    assert balancer.cost() < draft_cost
+
+
+def test_small_inputs():
+    assert balance_teams(np.zeros((0, 3)), 4) == []
+    assert balance_teams(np.ones((2, 3)), 4) == [[0, 1]]
+
+
+def test_service_writes_assignments_back(sql_client):
+    async def scenario():
+        challenge_id = str(uuid.uuid4())
+        user_ids = [str(uuid.uuid4()) for _ in range(10)]
+        sql_client.insert('enrollments', [
+            {'user_id': user_id, 'challenge_id': challenge_id} for user_id in user_ids
+        ])
+        waiting = str(uuid.uuid4())
+        sql_client.insert('enrollments', {'user_id': waiting, 'challenge_id': challenge_id, 'status': "waitlisted"})
+        profiles = SkillProfileService(index=SkillIndex(), storage=sql_client)
+        for i, user_id in enumerate(user_ids):
+            profiles.index.upsert(user_id, {"python": i, "design": 9 - i})
+        profiles._loaded = True
+
+        result = await TeamFormationService(profiles=profiles, storage=sql_client).form_teams(challenge_id, 4)
+        assert len(result['teams']) == 3
+        assert sorted(u for team in result['teams'] for u in team['user_ids']) == sorted(user_ids)
+
+        enrollments = sql_client.select('enrollments', '*', {'challenge_id': challenge_id}).data
+        by_user = {row['user_id']: row['team_id'] for row in enrollments}
+        for team in result['teams']:
+            assert {by_user[user_id] for user_id in team['user_ids']} == {team['team_id']}
+        assert by_user[waiting] is None
+        assert len(sql_client.select('teams').data) == 3
+
+    asyncio.run(scenario())
+
+
+class FailingUpdates:
+    """Storage whose enrollment updates start failing after `allowed` calls"""
+
+    def __init__(self, storage, allowed):
+        self.storage = storage
+        self.allowed = allowed
+
+    def update(self, table, data, filters):
+        if table == 'enrollments' and data.get('team_id') is not None:
+            if self.allowed == 0:
+                raise Exception("connection reset")
+            self.allowed -= 1
+        return self.storage.update(table, data, filters)
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+
+def test_failed_write_leaves_no_orphans(sql_client):
+    async def scenario():
+        challenge_id = str(uuid.uuid4())
+        user_ids = [str(uuid.uuid4()) for _ in range(8)]
+        sql_client.insert('enrollments', [
+            {'user_id': user_id, 'challenge_id': challenge_id, 'score': 1.5} for user_id in user_ids
+        ])
+        profiles = SkillProfileService(index=SkillIndex(), storage=sql_client)
+        for i, user_id in enumerate(user_ids):
+            profiles.index.upsert(user_id, {"python": i})
+        profiles._loaded = True
+
+        failing = TeamFormationService(profiles=profiles, storage=FailingUpdates(sql_client, allowed=1))
+        with pytest.raises(Exception):
+            await failing.form_teams(challenge_id, 2)
+        assert sql_client.select('teams').data == []
+        enrollments = sql_client.select('enrollments', '*', {'challenge_id': challenge_id}).data
+        assert {row['team_id'] for row in enrollments} == {None}
+
+        result = await TeamFormationService(profiles=profiles, storage=sql_client).form_teams(challenge_id, 2)
+        assert len(result['teams']) == 4 and len(sql_client.select('teams').data) == 4
+        # Only team_id is written back
+        enrollments = sql_client.select('enrollments', '*', {'challenge_id': challenge_id}).data
+        assert {row['score'] for row in enrollments} == {1.5}
+
+    asyncio.run(scenario())
@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.team_leaderboard import TeamLeaderboard
+
+
+def _setup(sql_client, challenge_id, teams):
+    """Teams {name: [score, ...]}: a user per score, enrolled and teamed; returns team ids and user ids"""
+    team_ids, members = {}, {}
+    for name, scores in teams.items():
+        team_id = str(uuid.uuid4())
+        team_ids[name] = team_id
+        sql_client.insert('teams', {'id': team_id, 'name': name, 'description': ""})
+        members[name] = [str(uuid.uuid4()) for _ in scores]
+        sql_client.insert('enrollments', [
+            {'user_id': user_id, 'challenge_id': challenge_id, 'team_id': team_id} for user_id in members[name]
+        ])
+    return team_ids, members
+
+
+def test_team_standings_follow_member_scores(sql_client):
+    standings = TeamLeaderboard(storage=sql_client, best_k=2, max_k=3)
+    challenge_id = str(uuid.uuid4())
+    team_ids, members = _setup(sql_client, challenge_id, {'red': [10, 1, 1], 'blue': [6, 6]})
+    solo = str(uuid.uuid4())
+    sql_client.insert('enrollments', {'user_id': solo, 'challenge_id': challenge_id})
+
+    async def scenario():
+        for name, scores in (('red', [10, 1, 1]), ('blue', [6, 6])):
+            for user_id, score in zip(members[name], scores):
+                await standings.record(challenge_id, user_id, score)
+        # Users without a team are not on the team board
+        await standings.record(challenge_id, solo, 100)
+
+        def ranking(board):
+            return [(team['name'], team['score'], team['rank']) for team in board['teams']]
+
+        assert ranking(await standings.challenge_board(challenge_id)) == [("blue", 12, 1), ("red", 12, 1)]
+        assert ranking(await standings.challenge_board(challenge_id, "best_k", 1)) == [("red", 10, 1), ("blue", 6, 2)]
+        assert ranking(await standings.challenge_board(challenge_id, "mean")) == [("blue", 6, 1), ("red", 4, 2)]
+
+        # A member's improvement only re-aggregates their own team
+        await standings.record(challenge_id, members['red'][1], 5)
+        standing = await standings.team_standing(challenge_id, team_ids['red'], "best_k")
+        assert (standing['score'], standing['rank'], standing['teams']) == (15, 1, 2)
+        assert [member['score'] for member in standing['members']] == [10, 5, 1]
+
+        with pytest.raises(HTTPException) as error:
+            await standings.challenge_board(challenge_id, "median")
+        assert error.value.status_code == 400
+        with pytest.raises(HTTPException):
+            await standings.team_standing(challenge_id, str(uuid.uuid4()))
+
+        # The global board adds up each team's per-challenge aggregate
+        other = str(uuid.uuid4())
+        sql_client.insert('enrollments', {'user_id': members['blue'][0], 'challenge_id': other, 'team_id': team_ids['blue']})
+        await standings.record(other, members['blue'][0], 30)
+        assert ranking(await standings.global_board()) == [("blue", 42, 1), ("red", 16, 2)]
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_recomputes_from_scores(sql_client):
+    standings = TeamLeaderboard(storage=sql_client)
+    challenge_id = str(uuid.uuid4())
+    team_ids, members = _setup(sql_client, challenge_id, {'green': [3, 4]})
+    for user_id in members['green']:
+        sql_client.insert('users', {'id': user_id, 'username': user_id[:8], 'email': f"{user_id[:8]}@example.com"})
+    sql_client.insert('score_history', [
+        {'challenge_id': challenge_id, 'user_id': user_id, 'score': score, 'last_updated': "2024-01-01T00:00:00"}
+        for user_id, score in zip(members['green'], [3, 4])
+    ])
+
+    async def scenario():
+        assert (await standings.challenge_board(challenge_id))['teams'] == []
+        assert await standings.rebuild(challenge_id) == 1
+        board = await standings.challenge_board(challenge_id)
+        assert [(team['name'], team['score'], team['members']) for team in board['teams']] == [("green", 7, 2)]
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+import asyncio
+import uuid
+from fastapi import HTTPException
+from app.schemas.wallet import TransactionCreate
+from app.services.wallet_ledger import WalletLedger
+
+
+def _credit(wallet_id, amount, reference=None):
+    return TransactionCreate(wallet_id=wallet_id, amount=amount, type="credit", reference=reference)
+
+
+def test_group_commit_and_snapshot_balances(sql_client):
+    async def scenario():
+        inserts = []
+        original_insert = sql_client.insert
+
+        def counting_insert(table, data):
+            if table == 'wallet_transactions':
+                inserts.append(len(data))
+            return original_insert(table, data)
+
+        sql_client.insert = counting_insert
+        ledger = WalletLedger(snapshot_interval=10, snapshot_lag=0, storage=sql_client)
+        wallet = await ledger.create_wallet(uuid.uuid4())
+
+        await asyncio.gather(*(ledger.post(_credit(wallet['id'], 100)) for _ in range(25)))
+        await ledger.post(TransactionCreate(wallet_id=wallet['id'], amount=300, type="debit"))
+
+        # The 25 concurrent credits are queued before the committer runs, then the debit follows
+        assert inserts == [25, 1]
+        assert await ledger.get_balance(wallet['id']) == 2200
+        snapshots = sql_client.select('wallet_snapshots', 'seq,balance', {'wallet_id': wallet['id']}).data
+        assert snapshots == [{'seq': 25, 'balance': 2500}]
+
+        fresh = WalletLedger(snapshot_interval=10, storage=sql_client)
+        assert (await fresh.get_wallet(wallet['user_id']))['balance'] == 2200
+
+    asyncio.run(scenario())
+
+
+def test_references_are_idempotent(sql_client):
+    async def scenario():
+        ledger = WalletLedger(storage=sql_client)
+        wallet = await ledger.create_wallet(uuid.uuid4())
+
+        first = await ledger.post_many([_credit(wallet['id'], 500, "prize:1"), _credit(wallet['id'], 500, "prize:1")])
+        again = await ledger.post(_credit(wallet['id'], 500, "prize:1"))
+
+        assert first[0]['id'] == first[1]['id'] == again['id']
+        assert await ledger.get_balance(wallet['id']) == 500
+
+    asyncio.run(scenario())
+
+
+def test_recent_transactions_are_not_snapshotted(sql_client):
+    async def scenario():
+        ledger = WalletLedger(snapshot_interval=5, snapshot_lag=3600, storage=sql_client)
+        wallet = await ledger.create_wallet(uuid.uuid4())
+        await ledger.post_many([_credit(wallet['id'], 10) for _ in range(20)])
+
+        # Another worker's transaction below these seqs could still commit, so no snapshot yet
+        assert await ledger.get_balance(wallet['id']) == 200
+        assert sql_client.select('wallet_snapshots', '*', {'wallet_id': wallet['id']}).data == []
+
+    asyncio.run(scenario())
+
+
+def test_one_bad_row_fails_only_its_caller(sql_client):
+    async def scenario():
+        original_insert = sql_client.insert
+        bad_wallet = str(uuid.uuid4())
+
+        def insert(table, data):
+            rows = data if isinstance(data, list) else [data]
+            if table == 'wallet_transactions' and any(row['wallet_id'] == bad_wallet for row in rows):
+                raise HTTPException(status_code=500, detail="foreign key violation")
+            return original_insert(table, data)
+
+        sql_client.insert = insert
+        ledger = WalletLedger(storage=sql_client)
+        wallet = await ledger.create_wallet(uuid.uuid4())
+
+        results = await asyncio.gather(
+            ledger.post(_credit(wallet['id'], 100)),
+            ledger.post(_credit(bad_wallet, 100)),
+            ledger.post(_credit(wallet['id'], 200, "prize:2")),
+            ledger.post(_credit(wallet['id'], 300)),
+            return_exceptions=True
+        )
+        assert isinstance(results[1], HTTPException)
+        assert [row['amount'] for i, row in enumerate(results) if i != 1] == [100, 200, 300]
+        assert await ledger.get_balance(wallet['id']) == 600
+
+    asyncio.run(scenario())